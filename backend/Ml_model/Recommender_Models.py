@@ -11,6 +11,12 @@ from pathlib import Path
 from datetime import datetime, timedelta
 import logging
 
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from model_bundle import ModelBundle
+from metrics import stage_timer
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,40 +37,60 @@ class RecommendationService:
         self.article_features = None
         self.article_metadata = None
         self.mlb = None
+        self.model_dir = MODELS_DIR
+        self.model_version = None
+        self._metadata_records = None
+        self._metadata_by_id = None
         
     def load_models(self):
-        """Load pre-trained models from disk"""
+        """
+        Load pre-trained models from disk
+        Uses the current validated model bundle, or the flat models/ layout
+        written by older training runs
+        """
         try:
             logger.info("Loading recommendation models...")
             
+            bundle_dir, manifest = ModelBundle(MODELS_DIR).resolve()
+            if bundle_dir is not None:
+                self.model_dir = bundle_dir
+                self.model_version = manifest['version']
+                logger.info(f"Using model bundle version {self.model_version}")
+            else:
+                self.model_dir = MODELS_DIR
+                self.model_version = None
+            model_dir = self.model_dir
+            self._metadata_records = None
+            self._metadata_by_id = None
+            
             # Load content-based models
-            if (MODELS_DIR / 'tfidf_vectorizer.pkl').exists():
-                with open(MODELS_DIR / 'tfidf_vectorizer.pkl', 'rb') as f:
+            if (model_dir / 'tfidf_vectorizer.pkl').exists():
+                with open(model_dir / 'tfidf_vectorizer.pkl', 'rb') as f:
                     self.tfv = pickle.load(f)
                 
-                with open(MODELS_DIR / 'sigmoid_matrix.pkl', 'rb') as f:
+                with open(model_dir / 'sigmoid_matrix.pkl', 'rb') as f:
                     self.sig_matrix = pickle.load(f)
                 
-                with open(MODELS_DIR / 'article_indices.pkl', 'rb') as f:
+                with open(model_dir / 'article_indices.pkl', 'rb') as f:
                     self.indices = pickle.load(f)
                 
-                self.article_metadata = pd.read_csv(MODELS_DIR / 'article_metadata.csv')
+                self.article_metadata = pd.read_csv(model_dir / 'article_metadata.csv')
                 logger.info("Content-based models loaded")
             else:
                 logger.warning("Content-based models not found")
             
             # Load collaborative filtering models
-            if (MODELS_DIR / 'user_similarity_matrix.pkl').exists():
-                with open(MODELS_DIR / 'user_similarity_matrix.pkl', 'rb') as f:
+            if (model_dir / 'user_similarity_matrix.pkl').exists():
+                with open(model_dir / 'user_similarity_matrix.pkl', 'rb') as f:
                     self.user_sim_matrix = pickle.load(f)
                 
-                with open(MODELS_DIR / 'user_features.pkl', 'rb') as f:
+                with open(model_dir / 'user_features.pkl', 'rb') as f:
                     self.user_features = pickle.load(f)
                 
-                with open(MODELS_DIR / 'article_features.pkl', 'rb') as f:
+                with open(model_dir / 'article_features.pkl', 'rb') as f:
                     self.article_features = pickle.load(f)
                 
-                with open(MODELS_DIR / 'mlb_encoder.pkl', 'rb') as f:
+                with open(model_dir / 'mlb_encoder.pkl', 'rb') as f:
                     self.mlb = pickle.load(f)
                 
                 logger.info(" Collaborative filtering models loaded")
@@ -104,27 +130,32 @@ class RecommendationService:
                 logger.warning(f"Article {article_id} not found in index")
                 return []
             
-            idx = self.indices[article_id]
+            with stage_timer('neighbor_lookup'):
+                idx = self.indices[article_id]
+                row = self.sig_matrix[idx]
             
-            # Get similarity scores
-            sig_scores = list(enumerate(self.sig_matrix[idx]))
-            sig_scores = sorted(sig_scores, key=lambda x: x[1], reverse=True)
-            
-            # Filter out the article itself and excluded articles
-            recommendations = []
-            for i, score in sig_scores[1:]:  # Skip first (itself)
-                article_id_rec = self.article_metadata.iloc[i]['id']
-                
-                # Skip if in exclude list
-                if exclude_ids and article_id_rec in exclude_ids:
-                    continue
+            with stage_timer('top_k'):
+                # Get similarity scores
+                sig_scores = list(enumerate(row))
+                sig_scores = sorted(sig_scores, key=lambda x: x[1], reverse=True)
                 
-                article_info = self.article_metadata.iloc[i].to_dict()
-                article_info['similarity_score'] = float(score)
-                recommendations.append(article_info)
-                
-                if len(recommendations) >= top_n:
-                    break
+                # Filter out the article itself and excluded articles
+                # (records by position, not a pandas row per candidate)
+                records = self._metadata_record_list()
+                recommendations = []
+                for i, score in sig_scores[1:]:  # Skip first (itself)
+                    record = records[i]
+                    
+                    # Skip if in exclude list
+                    if exclude_ids and record['id'] in exclude_ids:
+                        continue
+                    
+                    article_info = dict(record)
+                    article_info['similarity_score'] = float(score)
+                    recommendations.append(article_info)
+                    
+                    if len(recommendations) >= top_n:
+                        break
             
             return recommendations
             
@@ -159,48 +190,51 @@ class RecommendationService:
                 return []
             
             # Get top-K similar users
-            similar_users = (
-                self.user_sim_matrix.loc[user_id]
-                .drop(user_id, errors='ignore')
-                .sort_values(ascending=False)
-                .head(top_k)
-            )
+            with stage_timer('neighbor_lookup'):
+                similar_users = (
+                    self.user_sim_matrix.loc[user_id]
+                    .drop(user_id, errors='ignore')
+                    .sort_values(ascending=False)
+                    .head(top_k)
+                )
             
             if len(similar_users) == 0:
                 logger.warning(f"No similar users found for {user_id}")
                 return []
             
-            # Aggregate preferences from similar users
-            agg_profile = np.zeros(self.article_features.shape[1])
-            for sim_user, sim_score in similar_users.items():
-                if sim_user in self.user_features.index:
-                    agg_profile += sim_score * self.user_features.loc[sim_user].values
-            
-            # Normalize
-            if np.linalg.norm(agg_profile) > 0:
-                agg_profile = agg_profile / np.linalg.norm(agg_profile)
-            
-            # Score all articles
-            scores = self.article_features.dot(agg_profile)
-            top_article_ids = scores.sort_values(ascending=False).head(top_n * 3).index
-            
-            # Get article details and filter
-            recommendations = []
-            for article_id in top_article_ids:
-                if exclude_ids and article_id in exclude_ids:
-                    continue
+            with stage_timer('scoring'):
+                # Aggregate preferences from similar users
+                agg_profile = np.zeros(self.article_features.shape[1])
+                for sim_user, sim_score in similar_users.items():
+                    if sim_user in self.user_features.index:
+                        agg_profile += sim_score * self.user_features.loc[sim_user].values
                 
-                article_row = self.article_metadata[
-                    self.article_metadata['id'] == article_id
-                ]
+                # Normalize
+                if np.linalg.norm(agg_profile) > 0:
+                    agg_profile = agg_profile / np.linalg.norm(agg_profile)
                 
-                if not article_row.empty:
-                    article_info = article_row.iloc[0].to_dict()
-                    article_info['relevance_score'] = float(scores[article_id])
-                    recommendations.append(article_info)
+                # Score all articles
+                scores = self.article_features.dot(agg_profile)
+            
+            with stage_timer('top_k'):
+                top_article_ids = scores.sort_values(ascending=False).head(top_n * 3).index
                 
-                if len(recommendations) >= top_n:
-                    break
+                # Get article details and filter (one dict lookup per
+                # candidate, not a scan of the metadata table)
+                metadata_by_id = self._metadata_index()
+                recommendations = []
+                for article_id in top_article_ids:
+                    if exclude_ids and article_id in exclude_ids:
+                        continue
+                    
+                    record = metadata_by_id.get(article_id)
+                    if record is not None:
+                        article_info = dict(record)
+                        article_info['relevance_score'] = float(scores[article_id])
+                        recommendations.append(article_info)
+                    
+                    if len(recommendations) >= top_n:
+                        break
             
             return recommendations
             
@@ -264,11 +298,12 @@ class RecommendationService:
                         }
         
         # Sort by hybrid score
-        sorted_recs = sorted(
-            recommendations.values(),
-            key=lambda x: x['hybrid_score'],
-            reverse=True
-        )
+        with stage_timer('top_k'):
+            sorted_recs = sorted(
+                recommendations.values(),
+                key=lambda x: x['hybrid_score'],
+                reverse=True
+            )
         
         return sorted_recs[:top_n]
     
@@ -287,14 +322,16 @@ class RecommendationService:
             # This would typically query the database for view counts
             # For now, return most recent articles
             if self.article_metadata is not None:
-                recent = self.article_metadata.copy()
-                recent['published_at'] = pd.to_datetime(recent['published_at'])
-                
-                cutoff_date = datetime.now() - timedelta(days=time_window_days)
-                recent = recent[recent['published_at'] >= cutoff_date]
-                recent = recent.sort_values('published_at', ascending=False)
+                with stage_timer('scoring'):
+                    recent = self.article_metadata.copy()
+                    recent['published_at'] = pd.to_datetime(recent['published_at'])
+                    
+                    cutoff_date = datetime.now() - timedelta(days=time_window_days)
+                    recent = recent[recent['published_at'] >= cutoff_date]
                 
-                return recent.head(top_n).to_dict('records')
+                with stage_timer('top_k'):
+                    recent = recent.sort_values('published_at', ascending=False)
+                    return recent.head(top_n).to_dict('records')
             
             return []
             
@@ -302,6 +339,57 @@ class RecommendationService:
             logger.error(f"Error getting trending articles: {e}")
             return []
 
+    def _metadata_record_list(self):
+        """Article metadata records by row position, built once per load"""
+        if self._metadata_records is None:
+            self._metadata_records = self.article_metadata.to_dict('records')
+        return self._metadata_records
+
+    def _metadata_index(self):
+        """Article metadata records by id (the first row wins), built once per load"""
+        if self._metadata_by_id is None:
+            metadata_by_id = {}
+            for record in self._metadata_record_list():
+                metadata_by_id.setdefault(record['id'], record)
+            self._metadata_by_id = metadata_by_id
+        return self._metadata_by_id
+
+    def compact_recommendations(self, recommendations):
+        """
+        Strip article metadata from results, keeping ids and scores, so
+        caches store only ranked id+score lists
+        """
+        if self.article_metadata is None:
+            return recommendations
+        metadata_columns = set(self.article_metadata.columns)
+        return [
+            {k: v for k, v in rec.items() if k == 'id' or k not in metadata_columns}
+            for rec in recommendations
+        ]
+    
+    def hydrate_recommendations(self, entries, parse_dates=False):
+        """
+        Inverse of compact_recommendations: merge article metadata back in
+        Entries whose id is unknown are returned unchanged
+        
+        Args:
+            parse_dates: Return published_at as a Timestamp, as
+                get_trending_articles does, instead of the raw metadata value
+        """
+        if self.article_metadata is None:
+            return entries
+        with stage_timer('hydration'):
+            metadata_by_id = self._metadata_index()
+            hydrated = [
+                {**metadata_by_id.get(entry.get('id'), {}), **entry}
+                for entry in entries
+            ]
+            if parse_dates:
+                for record in hydrated:
+                    if isinstance(record.get('published_at'), str):
+                        record['published_at'] = pd.to_datetime(record['published_at'])
+            return hydrated
+
 
 # Singleton instance
 _recommendation_service = None
@@ -14,7 +14,11 @@ import logging
 sys.path.append(str(Path(__file__).resolve().parent))
 
 from Train_modules import ModelTrainer
-from cache_manager import get_cache_manager
+from Recommender_Models import RecommendationService
+from cache_manager import (
+    get_cache_manager, recommendation_cache_key, trending_cache_key,
+    RECOMMENDATION_CACHE_TTL, TRENDING_CACHE_TTL, CACHE_COMPACT_RESULTS, RANKED_LIST_DEPTH
+)
 
 # Setup logging
 logging.basicConfig(
@@ -27,6 +31,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Trending articles whose similar-article lists are precomputed after a retrain
+CACHE_WARM_ARTICLES = int(os.getenv('CACHE_WARM_ARTICLES', 50))
+
 
 class RetrainingScheduler:
     def __init__(self):
@@ -46,13 +53,14 @@ class RetrainingScheduler:
             if success:
                 logger.info("✅ Model retraining completed successfully")
                 
-                # Clear all recommendation caches
-                logger.info("Clearing recommendation caches...")
-                self.cache_manager.delete_pattern("rec:*")
-                logger.info("✅ Caches cleared")
+                # Cache keys are namespaced by model version, so old entries
+                # simply expire; warm the new namespace before workers switch
+                logger.info("Warming recommendation caches for the new model...")
+                warmed = self.warm_cache()
+                logger.info(f"✅ Warmed {warmed} cache entries")
                 
-                # Reload models in running services (they will auto-reload on next request)
-                logger.info("Models will be reloaded on next API request")
+                # API workers check for a new bundle every MODEL_RELOAD_INTERVAL seconds
+                logger.info("API servers will switch to the new models on their next reload check")
                 
             else:
                 logger.error("❌ Model retraining failed")
@@ -62,6 +70,57 @@ class RetrainingScheduler:
             import traceback
             traceback.print_exc()
     
+    def warm_cache(self, days=7):
+        """
+        Precompute trending and popular similar-article ranked lists under
+        the newly published model version's cache namespace
+        
+        Returns:
+            Number of cache entries written
+        """
+        if not self.cache_manager.enabled:
+            return 0
+        
+        service = RecommendationService()
+        if not service.load_models():
+            return 0
+        version = service.model_version
+        warmed = 0
+        
+        trending = service.get_trending_articles(
+            top_n=max(RANKED_LIST_DEPTH, CACHE_WARM_ARTICLES),
+            time_window_days=days
+        )
+        ranked_trending = trending[:RANKED_LIST_DEPTH]
+        entries = [
+            (trending_cache_key(version, days=days), ranked_trending, TRENDING_CACHE_TTL, None),
+        ]
+        
+        for article in trending[:CACHE_WARM_ARTICLES]:
+            article_id = str(article['id'])
+            similar = service.get_similar_articles(
+                article_id=article_id, top_n=RANKED_LIST_DEPTH, exclude_ids=[]
+            )
+            if similar:
+                entries.append((
+                    recommendation_cache_key('content', version, article_id=article_id),
+                    similar,
+                    RECOMMENDATION_CACHE_TTL,
+                    [f"article:{article_id}"]
+                ))
+        
+        if CACHE_COMPACT_RESULTS:
+            entries = [
+                (key, service.compact_recommendations(value), ttl, tags)
+                for key, value, ttl, tags in entries
+            ]
+        
+        # One pipeline, with the same soft-TTL entries the API writes
+        if self.cache_manager.set_many(entries, stale_while_revalidate=True):
+            warmed = len(entries)
+        
+        return warmed
+    
     def run_daily(self, hour=2, minute=0):
         """Schedule daily retraining"""
         schedule_time = f"{hour:02d}:{minute:02d}"
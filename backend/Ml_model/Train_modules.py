@@ -9,11 +9,22 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import sigmoid_kernel, cosine_similarity
 from sklearn.preprocessing import MultiLabelBinarizer
+from scipy.sparse import csr_matrix
 import pickle
+import time
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
 from datetime import datetime
 import logging
 
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from snapshot_store import SnapshotStore
+from model_bundle import ModelBundle, describe_artifact
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,11 +42,270 @@ DATA_DIR = ML_DIR / 'data'
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Parallelism settings (TRAIN_WORKERS=1 keeps the old single-core behaviour)
+TRAIN_WORKERS = int(os.getenv('TRAIN_WORKERS', os.cpu_count() or 1))
+SIMILARITY_BLOCK_SIZE = int(os.getenv('SIMILARITY_BLOCK_SIZE', 1024))
+
+# Rows fetched per server-side cursor round trip (0 = load whole tables at once)
+TRAIN_FETCH_SIZE = int(os.getenv('TRAIN_FETCH_SIZE', 2000))
+
+ARTICLES_QUERY = """
+    SELECT 
+        id::text,
+        title,
+        summary,
+        actors,
+        place,
+        topic,
+        published_at,
+        source_id::text
+    FROM articles
+    WHERE summary IS NOT NULL AND summary != ''
+    ORDER BY published_at DESC
+"""
+
+USERS_QUERY = """
+    SELECT 
+        id::text as user_id,
+        auth_id::text,
+        actor,
+        place,
+        topic
+    FROM profiles
+    WHERE actor IS NOT NULL OR place IS NOT NULL OR topic IS NOT NULL
+"""
+
+
+def build_tfidf_vectorizer():
+    """Create the TF-IDF vectorizer used by the content-based model"""
+    return TfidfVectorizer(
+        min_df=2,
+        max_features=5000,
+        strip_accents='unicode',
+        analyzer='word',
+        token_pattern=r'\w{1,}',
+        ngram_range=(1, 3),
+        stop_words='english'
+    )
+
+
+def combined_article_text(articles):
+    """Text the vectorizer is trained on: title + summary + topic"""
+    return (
+        articles['title'].fillna('') + ' ' + 
+        articles['summary'].fillna('') + ' ' +
+        articles['topic'].fillna('')
+    )
+
+
+def _share_array(arr):
+    """Copy a NumPy array into a new shared memory segment"""
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    shared = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    shared[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _attach_array(spec):
+    """Attach to a shared array described by (name, shape, dtype)"""
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _sigmoid_kernel_block(task):
+    """
+    Worker: compute rows [start, stop) of the sigmoid kernel matrix.
+    Reads the CSR input from shared memory and writes straight into the
+    shared output matrix, so only the block bounds cross process boundaries.
+    """
+    data_spec, indices_spec, indptr_spec, out_spec, shape, start, stop, gamma, coef0 = task
+    segments = []
+    try:
+        arrays = []
+        for spec in (data_spec, indices_spec, indptr_spec, out_spec):
+            shm, arr = _attach_array(spec)
+            segments.append(shm)
+            arrays.append(arr)
+        data, indices, indptr, out = arrays
+
+        X = csr_matrix((data, indices, indptr), shape=shape)
+        # Same operations as sklearn's sigmoid_kernel, restricted to a row block
+        K = (X[start:stop] @ X.T).toarray()
+        K *= gamma
+        K += coef0
+        np.tanh(K, K)
+        out[start:stop] = K
+        del X, data, indices, indptr, out, arrays
+        return stop - start
+    finally:
+        for shm in segments:
+            shm.close()
+
+
+def parallel_sigmoid_kernel(X, workers=None, block_size=None, gamma=None, coef0=1):
+    """
+    Compute sigmoid_kernel(X, X) blockwise across a process pool
+
+    Args:
+        X: Sparse (or dense) feature matrix, one row per article
+        workers: Number of worker processes (default: TRAIN_WORKERS)
+        block_size: Rows per block (default: SIMILARITY_BLOCK_SIZE)
+        gamma: Kernel coefficient (default: 1 / n_features, as sklearn)
+        coef0: Kernel intercept
+
+    Returns:
+        Dense (n, n) similarity matrix identical to sklearn's sigmoid_kernel
+    """
+    workers = TRAIN_WORKERS if workers is None else workers
+    block_size = SIMILARITY_BLOCK_SIZE if block_size is None else block_size
+    X = csr_matrix(X, dtype=np.float64)
+    n_rows, n_features = X.shape
+    if gamma is None:
+        gamma = 1.0 / n_features
+
+    if workers <= 1 or n_rows <= block_size:
+        return sigmoid_kernel(X, X, gamma=gamma, coef0=coef0)
+
+    segments = []
+    try:
+        specs = []
+        for arr in (X.data, X.indices, X.indptr):
+            shm, spec = _share_array(arr)
+            segments.append(shm)
+            specs.append(spec)
+
+        out_shape = (n_rows, n_rows)
+        out_shm = shared_memory.SharedMemory(
+            create=True, size=n_rows * n_rows * np.dtype(np.float64).itemsize
+        )
+        segments.append(out_shm)
+        specs.append((out_shm.name, out_shape, np.dtype(np.float64).str))
+
+        tasks = [
+            (*specs, X.shape, start, min(start + block_size, n_rows), gamma, coef0)
+            for start in range(0, n_rows, block_size)
+        ]
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            list(pool.map(_sigmoid_kernel_block, tasks))
+
+        out = np.ndarray(out_shape, dtype=np.float64, buffer=out_shm.buf)
+        result = out.copy()
+        del out
+        return result
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def _array_column_pairs(series):
+    """
+    (row, label) pairs for a Postgres array column holding lists/ndarrays
+    or '{a,b}' strings; same normalization as the old per-row clean_array_column
+    """
+    values = series.reset_index(drop=True)
+    types = values.map(type)
+    is_str = (types == str).to_numpy()
+    is_seq = types.isin([list, tuple, set, np.ndarray]).to_numpy()
+
+    # String form: strip wrapping {}[]" then split on commas (object dtype so
+    # .str also works when no row is a string, e.g. an all-NaN float column)
+    parts = values[is_str].astype(object).str.strip('{}[]"').str.split(',').explode()
+
+    # List/ndarray form: flatten all items at once, keeping their row positions
+    seqs = values[is_seq]
+    items = pd.Series(
+        list(chain.from_iterable(seqs)),
+        index=np.repeat(seqs.index.to_numpy(), seqs.map(len).to_numpy(dtype=np.int64)),
+        dtype=object
+    ).map(str)
+
+    labels = pd.concat([parts, items]).astype(str).str.strip()
+    labels = labels[labels != ''].str.lower()
+    return pd.DataFrame({'row': labels.index.to_numpy(), 'label': labels.to_numpy()})
+
+
+def _scalar_column_pairs(series):
+    """(row, label) pairs for a single-valued text column (place, topic)"""
+    values = series.reset_index(drop=True)
+    labels = values[values.notna()].astype(str).str.strip()
+    labels = labels[labels != ''].str.lower()
+    return pd.DataFrame({'row': labels.index.to_numpy(), 'label': labels.to_numpy()})
+
+
+def preference_label_pairs(df, array_columns=(), scalar_columns=()):
+    """
+    Normalize preference columns for all rows in one pass
+
+    Args:
+        df: Users or articles table
+        array_columns: Postgres array columns (e.g. actor / actors)
+        scalar_columns: Single-valued text columns (e.g. place, topic)
+
+    Returns:
+        DataFrame of (row, label) pairs, row = position in df; per row the
+        labels keep the column order of the old combined preference lists
+    """
+    frames = [_array_column_pairs(df[c]) for c in array_columns]
+    frames += [_scalar_column_pairs(df[c]) for c in scalar_columns]
+    pairs = pd.concat(frames, ignore_index=True)
+    return pairs.sort_values('row', kind='stable').reset_index(drop=True)
+
+
+def label_indicator_matrix(rows, labels, n_rows, classes):
+    """
+    Sparse 0/1 matrix equivalent to MultiLabelBinarizer(classes).transform
+
+    Labels outside classes are ignored, duplicate labels count once.
+    """
+    codes = pd.Index(classes).get_indexer(labels)
+    known = codes >= 0
+    matrix = csr_matrix(
+        (np.ones(known.sum(), dtype=int), (np.asarray(rows)[known], codes[known])),
+        shape=(n_rows, len(classes))
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def _run_training_stage(trainer, stage):
+    """Worker: run one training stage and report (stage, success, seconds)"""
+    start = time.perf_counter()
+    trainer.artifacts = {}
+    success = getattr(trainer, ModelTrainer.STAGES[stage])()
+    return stage, bool(success), time.perf_counter() - start, trainer.artifacts
+
+
 class ModelTrainer:
-    def __init__(self):
+    # Independent training stages: name -> method
+    STAGES = {
+        'content': 'train_content_based_model',
+        'collaborative': 'train_collaborative_model',
+        'metadata_export': 'export_article_metadata',
+    }
+
+    # Artifacts that must come from the same run to stay consistent
+    CONTENT_ARTIFACTS = (
+        'tfidf_vectorizer.pkl', 'sigmoid_matrix.pkl', 'article_indices.pkl', 'article_metadata.csv'
+    )
+    COLLABORATIVE_ARTIFACTS = (
+        'user_similarity_matrix.pkl', 'user_features.pkl', 'article_features.pkl', 'mlb_encoder.pkl'
+    )
+
+    def __init__(self, workers=None, fetch_size=None):
+        self.workers = TRAIN_WORKERS if workers is None else workers
+        self.fetch_size = TRAIN_FETCH_SIZE if fetch_size is None else fetch_size
+        self.snapshots = SnapshotStore(DATA_DIR / 'snapshots')
+        self.bundle = ModelBundle(MODELS_DIR)
+        self.output_dir = MODELS_DIR
+        self.artifacts = {}
+        self.stage_timings = {}
         self.articles = None
         self.users = None
         self.tfv = None
+        self.tfv_matrix = None
         self.sig_matrix = None
         self.user_sim_matrix = None
         self.article_features = None
@@ -43,6 +313,9 @@ class ModelTrainer:
         
     def load_data_from_db(self):
         """Load data from PostgreSQL database"""
+        if self.fetch_size > 0:
+            return self.load_data_streaming()
+
         try:
             # Import database connection
             sys.path.append(str(BASE_DIR))
@@ -52,53 +325,117 @@ class ModelTrainer:
             
             # Load articles
             logger.info("Loading articles from database...")
-            articles_query = """
-                SELECT 
-                    id::text,
-                    title,
-                    summary,
-                    actors,
-                    place,
-                    topic,
-                    published_at,
-                    source_id::text
-                FROM articles
-                WHERE summary IS NOT NULL AND summary != ''
-                ORDER BY published_at DESC
-            """
-            self.articles = pd.read_sql_query(articles_query, conn)
+            self.articles = pd.read_sql_query(ARTICLES_QUERY, conn)
             logger.info(f"Loaded {len(self.articles)} articles")
             
             # Load user profiles
             logger.info("Loading user profiles from database...")
-            users_query = """
-                SELECT 
-                    id::text as user_id,
-                    auth_id::text,
-                    actor,
-                    place,
-                    topic
-                FROM profiles
-                WHERE actor IS NOT NULL OR place IS NOT NULL OR topic IS NOT NULL
-            """
-            self.users = pd.read_sql_query(users_query, conn)
+            self.users = pd.read_sql_query(USERS_QUERY, conn)
             logger.info(f"Loaded {len(self.users)} user profiles")
             
             conn.close()
             
-            # Save to CSV for backup
-            self.articles.to_csv(DATA_DIR / 'articles_export.csv', index=False)
-            self.users.to_csv(DATA_DIR / 'users_export.csv', index=False)
+            # Save columnar snapshot for backup
+            self.snapshots.append_new('articles', self.articles, key='id', partition_column='published_at')
+            self.snapshots.write_partition('users', self.users)
             
             return True
             
         except Exception as e:
             logger.error(f"Error loading data from database: {e}")
-            logger.info("Attempting to load from CSV files...")
+            logger.info("Attempting to load from snapshot...")
+            return self.load_data_from_snapshot()
+
+    def load_data_streaming(self):
+        """
+        Load data through server-side cursors, fetch_size rows at a time
+
+        Article chunks are fed straight into the TF-IDF vectorizer and appended
+        to the snapshot; only the compact metadata columns are kept, so the
+        summaries are never all held in memory at once.
+        """
+        try:
+            sys.path.append(str(BASE_DIR))
+            from config.db_python import stream_query
+
+            logger.info(f"Streaming articles from database (fetch size {self.fetch_size})...")
+            known_ids = self.snapshots.keys('articles', 'id')
+            metadata_chunks = []
+
+            def article_texts():
+                chunks = stream_query(
+                    ARTICLES_QUERY, fetch_size=self.fetch_size, cursor_name='train_articles'
+                )
+                for rows in chunks:
+                    chunk = pd.DataFrame(rows)
+                    self.snapshots.append_new(
+                        'articles', chunk, key='id', partition_column='published_at',
+                        known_keys=known_ids
+                    )
+                    metadata_chunks.append(chunk.drop(columns=['summary']))
+                    yield from combined_article_text(chunk)
+
+            self.tfv = build_tfidf_vectorizer()
+            self.tfv_matrix = self.tfv.fit_transform(article_texts())
+            self.articles = pd.concat(metadata_chunks, ignore_index=True)
+            logger.info(f"Loaded {len(self.articles)} articles, TF-IDF matrix shape: {self.tfv_matrix.shape}")
+
+            logger.info("Streaming user profiles from database...")
+            user_chunks = [
+                pd.DataFrame(rows)
+                for rows in stream_query(
+                    USERS_QUERY, fetch_size=self.fetch_size, cursor_name='train_profiles'
+                )
+            ]
+            self.users = (
+                pd.concat(user_chunks, ignore_index=True) if user_chunks
+                else pd.DataFrame(columns=['user_id', 'auth_id', 'actor', 'place', 'topic'])
+            )
+            logger.info(f"Loaded {len(self.users)} user profiles")
+            self.snapshots.write_partition('users', self.users)
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Error streaming data from database: {e}")
+            self.tfv = None
+            self.tfv_matrix = None
+            logger.info("Attempting to load from snapshot...")
+            return self.load_data_from_snapshot()
+
+    def load_data_from_snapshot(self, start=None, end=None):
+        """
+        Fallback / offline experiments: load data from the columnar snapshot
+
+        Args:
+            start / end: Optional inclusive publish-date bounds (YYYY-MM-DD)
+        """
+        try:
+            articles = self.snapshots.read('articles', start=start, end=end)
+            if articles is None:
+                logger.warning("No articles snapshot found")
+                return self.load_data_from_csv()
+
+            self.articles = (
+                articles.sort_values('published_at', ascending=False, kind='stable')
+                .reset_index(drop=True)
+            )
+            logger.info(f"Loaded {len(self.articles)} articles from snapshot")
+
+            self.users = self.snapshots.read('users', latest_partition=True)
+            if self.users is not None:
+                logger.info(f"Loaded {len(self.users)} users from snapshot")
+            else:
+                logger.warning("No users snapshot found, skipping collaborative filtering")
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Error loading data from snapshot: {e}")
             return self.load_data_from_csv()
     
     def load_data_from_csv(self):
-        """Fallback: Load data from CSV files"""
+        """Legacy fallback: Load data from CSV exports written by older versions"""
         try:
             articles_path = DATA_DIR / 'articles_export.csv'
             users_path = DATA_DIR / 'users_export.csv'
@@ -129,32 +466,25 @@ class ModelTrainer:
         logger.info("=" * 60)
         
         try:
-            # Prepare text data
-            self.articles['summary'] = self.articles['summary'].fillna('')
-            self.articles['combined_text'] = (
-                self.articles['title'].fillna('') + ' ' + 
-                self.articles['summary'].fillna('') + ' ' +
-                self.articles['topic'].fillna('')
-            )
-            
-            # Train TF-IDF vectorizer
-            logger.info("Training TF-IDF vectorizer...")
-            self.tfv = TfidfVectorizer(
-                min_df=2,
-                max_features=5000,
-                strip_accents='unicode',
-                analyzer='word',
-                token_pattern=r'\w{1,}',
-                ngram_range=(1, 3),
-                stop_words='english'
-            )
-            
-            tfv_matrix = self.tfv.fit_transform(self.articles['combined_text'])
+            if self.tfv_matrix is not None:
+                # Vectorizer was already fitted while streaming the articles
+                logger.info("Using TF-IDF matrix fitted during streaming load")
+                tfv_matrix = self.tfv_matrix
+            else:
+                # Prepare text data
+                self.articles['summary'] = self.articles['summary'].fillna('')
+                self.articles['combined_text'] = combined_article_text(self.articles)
+
+                # Train TF-IDF vectorizer
+                logger.info("Training TF-IDF vectorizer...")
+                self.tfv = build_tfidf_vectorizer()
+                tfv_matrix = self.tfv.fit_transform(self.articles['combined_text'])
+
             logger.info(f"TF-IDF matrix shape: {tfv_matrix.shape}")
             
             # Compute similarity matrix
             logger.info("Computing sigmoid kernel similarity matrix...")
-            self.sig_matrix = sigmoid_kernel(tfv_matrix, tfv_matrix)
+            self.sig_matrix = parallel_sigmoid_kernel(tfv_matrix, workers=self.workers)
             logger.info(f"Similarity matrix shape: {self.sig_matrix.shape}")
             
             # Create article index mapping
@@ -165,18 +495,11 @@ class ModelTrainer:
             
             # Save models
             logger.info("Saving content-based models...")
-            with open(MODELS_DIR / 'tfidf_vectorizer.pkl', 'wb') as f:
-                pickle.dump(self.tfv, f)
-            
-            with open(MODELS_DIR / 'sigmoid_matrix.pkl', 'wb') as f:
-                pickle.dump(self.sig_matrix, f)
+            self._save_pickle('tfidf_vectorizer.pkl', self.tfv)
             
-            with open(MODELS_DIR / 'article_indices.pkl', 'wb') as f:
-                pickle.dump(self.indices, f)
+            self._save_pickle('sigmoid_matrix.pkl', self.sig_matrix)
             
-            # Save article metadata
-            article_metadata = self.articles[['id', 'title', 'topic', 'place', 'published_at']]
-            article_metadata.to_csv(MODELS_DIR / 'article_metadata.csv', index=False)
+            self._save_pickle('article_indices.pkl', self.indices)
             
             logger.info("Content-based model trained and saved successfully!")
             return True
@@ -198,52 +521,15 @@ class ModelTrainer:
             return False
         
         try:
-            # Clean and process user preferences
+            # Normalize user preferences into (row, label) pairs
             logger.info("Processing user preferences...")
-            
-            def clean_array_column(col):
-                """Clean PostgreSQL array columns"""
-                # Handle None/NaN
-                if col is None or (isinstance(col, float) and pd.isna(col)):
-                    return []
-                
-                # Already a list
-                if isinstance(col, list):
-                    return [str(item).strip().lower() for item in col if str(item).strip()]
-                
-                # NumPy array
-                if hasattr(col, '__iter__') and not isinstance(col, str):
-                    return [str(item).strip().lower() for item in col if str(item).strip()]
-                
-                # String representation
-                if isinstance(col, str):
-                    # Remove brackets and quotes
-                    col = col.strip('{}[]"')
-                    if not col:
-                        return []
-                    return [item.strip().lower() for item in col.split(',') if item.strip()]
-                
-                return []
-            
-            self.users['actor_list'] = self.users['actor'].apply(clean_array_column)
-            self.users['place_list'] = self.users['place'].apply(
-                lambda x: [str(x).strip().lower()] if pd.notna(x) and str(x).strip() else []
-            )
-            self.users['topic_list'] = self.users['topic'].apply(
-                lambda x: [str(x).strip().lower()] if pd.notna(x) and str(x).strip() else []
-            )
-            
-            # Combine all preferences
-            self.users['combined_preferences'] = (
-                self.users['actor_list'] + 
-                self.users['place_list'] + 
-                self.users['topic_list']
+            user_pairs = preference_label_pairs(
+                self.users, array_columns=['actor'], scalar_columns=['place', 'topic']
             )
             
             # Filter users with preferences
-            users_with_prefs = self.users[
-                self.users['combined_preferences'].apply(len) > 0
-            ].copy()
+            user_rows = np.unique(user_pairs['row'].to_numpy())
+            users_with_prefs = self.users.iloc[user_rows]
             
             if len(users_with_prefs) == 0:
                 logger.warning(" No users with valid preferences")
@@ -251,11 +537,15 @@ class ModelTrainer:
             
             logger.info(f"Found {len(users_with_prefs)} users with preferences")
             
-            # Encode preferences using MultiLabelBinarizer
+            # Encode preferences (same classes_ as fitting MultiLabelBinarizer on the lists)
             logger.info("Encoding user preferences...")
             mlb = MultiLabelBinarizer()
+            mlb.fit([sorted(set(user_pairs['label']))])
             user_features = pd.DataFrame(
-                mlb.fit_transform(users_with_prefs['combined_preferences']),
+                label_indicator_matrix(
+                    np.searchsorted(user_rows, user_pairs['row'].to_numpy()),
+                    user_pairs['label'], len(user_rows), mlb.classes_
+                ).toarray(),
                 index=users_with_prefs['user_id'],
                 columns=mlb.classes_
             )
@@ -272,25 +562,16 @@ class ModelTrainer:
             
             logger.info(f"User similarity matrix shape: {self.user_sim_matrix.shape}")
             
-            # Encode article features
+            # Encode article features using the same classes
             logger.info("Encoding article features...")
-            self.articles['article_actors'] = self.articles['actors'].apply(clean_array_column)
-            self.articles['article_place'] = self.articles['place'].apply(
-                lambda x: [str(x).strip().lower()] if pd.notna(x) and str(x).strip() else []
-            )
-            self.articles['article_topic'] = self.articles['topic'].apply(
-                lambda x: [str(x).strip().lower()] if pd.notna(x) and str(x).strip() else []
+            article_pairs = preference_label_pairs(
+                self.articles, array_columns=['actors'], scalar_columns=['place', 'topic']
             )
-            
-            self.articles['article_features'] = (
-                self.articles['article_actors'] + 
-                self.articles['article_place'] + 
-                self.articles['article_topic']
-            )
-            
-            # Create article feature matrix using the same encoder
             article_features = pd.DataFrame(
-                mlb.transform(self.articles['article_features']),
+                label_indicator_matrix(
+                    article_pairs['row'].to_numpy(), article_pairs['label'],
+                    len(self.articles), mlb.classes_
+                ).toarray(),
                 index=self.articles['id'],
                 columns=mlb.classes_
             )
@@ -299,17 +580,13 @@ class ModelTrainer:
             
             # Save models
             logger.info("Saving collaborative filtering models...")
-            with open(MODELS_DIR / 'user_similarity_matrix.pkl', 'wb') as f:
-                pickle.dump(self.user_sim_matrix, f)
+            self._save_pickle('user_similarity_matrix.pkl', self.user_sim_matrix)
             
-            with open(MODELS_DIR / 'user_features.pkl', 'wb') as f:
-                pickle.dump(user_features, f)
+            self._save_pickle('user_features.pkl', user_features)
             
-            with open(MODELS_DIR / 'article_features.pkl', 'wb') as f:
-                pickle.dump(article_features, f)
+            self._save_pickle('article_features.pkl', article_features)
             
-            with open(MODELS_DIR / 'mlb_encoder.pkl', 'wb') as f:
-                pickle.dump(mlb, f)
+            self._save_pickle('mlb_encoder.pkl', mlb)
             
             logger.info("Collaborative filtering model trained and saved successfully!")
             return True
@@ -320,49 +597,152 @@ class ModelTrainer:
             traceback.print_exc()
             return False
     
+    def _save_pickle(self, name, obj):
+        """Pickle an artifact into output_dir and record it for the manifest"""
+        with open(self.output_dir / name, 'wb') as f:
+            pickle.dump(obj, f)
+        self.artifacts[name] = describe_artifact(obj)
+
+    def _save_csv(self, name, df):
+        """Write a DataFrame artifact into output_dir and record it for the manifest"""
+        df.to_csv(self.output_dir / name, index=False)
+        self.artifacts[name] = describe_artifact(df)
+
+    def _keep_stage_artifacts(self, success, stage_artifacts):
+        """Drop files written by a stage that failed part-way through"""
+        if success:
+            return stage_artifacts
+        for name in stage_artifacts:
+            (self.output_dir / name).unlink(missing_ok=True)
+        return {}
+
+    def export_article_metadata(self):
+        """Save article metadata used to hydrate recommendations"""
+        try:
+            article_metadata = self.articles[['id', 'title', 'topic', 'place', 'published_at']]
+            self._save_csv('article_metadata.csv', article_metadata)
+            logger.info(f"Article metadata saved ({len(article_metadata)} rows)")
+            return True
+        except Exception as e:
+            logger.error(f"Error exporting article metadata: {e}")
+            return False
+
+    def run_stages(self):
+        """
+        Run the independent training stages, concurrently when workers > 1
+
+        Each stage writes its own artifacts to output_dir. In parallel mode the
+        stages run in child processes, so trained objects (tfv, sig_matrix, ...)
+        are only available on disk, not on this trainer instance.
+
+        Returns:
+            Dict mapping stage name to success flag
+        """
+        results = {}
+        artifacts = {}
+        self.stage_timings = {}
+
+        if self.workers <= 1:
+            for stage in self.STAGES:
+                _, success, elapsed, stage_artifacts = _run_training_stage(self, stage)
+                results[stage] = success
+                self.stage_timings[stage] = elapsed
+                artifacts.update(self._keep_stage_artifacts(success, stage_artifacts))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(self.STAGES))) as pool:
+                futures = [
+                    pool.submit(_run_training_stage, self, stage)
+                    for stage in self.STAGES
+                ]
+                for future in futures:
+                    stage, success, elapsed, stage_artifacts = future.result()
+                    results[stage] = success
+                    self.stage_timings[stage] = elapsed
+                    artifacts.update(self._keep_stage_artifacts(success, stage_artifacts))
+
+        self.artifacts = artifacts
+        for stage, elapsed in self.stage_timings.items():
+            logger.info(f"Stage '{stage}' finished in {elapsed:.2f}s")
+        return results
+
     def save_metadata(self):
         """Save training metadata"""
         metadata = {
             'trained_at': datetime.now().isoformat(),
             'num_articles': len(self.articles) if self.articles is not None else 0,
             'num_users': len(self.users) if self.users is not None else 0,
-            'content_based_trained': os.path.exists(MODELS_DIR / 'tfidf_vectorizer.pkl'),
-            'collaborative_trained': os.path.exists(MODELS_DIR / 'user_similarity_matrix.pkl'),
+            'content_based_trained': 'tfidf_vectorizer.pkl' in self.artifacts,
+            'collaborative_trained': 'user_similarity_matrix.pkl' in self.artifacts,
+            'train_workers': self.workers,
         }
+        for stage, elapsed in self.stage_timings.items():
+            metadata[f'{stage}_seconds'] = round(elapsed, 3)
         
         metadata_df = pd.DataFrame([metadata])
-        metadata_df.to_csv(MODELS_DIR / 'training_metadata.csv', index=False)
+        self._save_csv('training_metadata.csv', metadata_df)
         logger.info(f"Training metadata saved: {metadata}")
+        return metadata
     
     def train_all(self):
-        """Train all models"""
+        """Train all models into a new bundle version and publish it"""
         logger.info(" Starting ML Model Training Pipeline")
-        logger.info(f"Models will be saved to: {MODELS_DIR}")
         
         # Load data
         if not self.load_data_from_db():
             logger.error("Failed to load data. Exiting.")
             return False
         
-        # Train content-based model
-        content_success = self.train_content_based_model()
-        
-        # Train collaborative model
-        collab_success = self.train_collaborative_model()
-        
-        # Save metadata
-        self.save_metadata()
+        self.output_dir = self.bundle.create_version()
+        self.artifacts = {}
+        logger.info(f"Models will be saved to: {self.output_dir}")
+
+        try:
+            # Train content-based, collaborative and metadata export stages
+            logger.info(f"Running training stages with {self.workers} worker(s)")
+            pipeline_start = time.perf_counter()
+            results = self.run_stages()
+            content_success = results['content'] and results['metadata_export']
+            collab_success = results['collaborative']
+            logger.info(f"Training stages completed in {time.perf_counter() - pipeline_start:.2f}s")
+
+            if not (content_success or collab_success):
+                logger.error("Training failed")
+                self.bundle.discard(self.output_dir)
+                return False
+
+            # Keep serving the previous model for a stage that failed
+            carried_forward = []
+            if not content_success:
+                carried_forward += self._carry_forward(self.CONTENT_ARTIFACTS)
+            if not collab_success:
+                carried_forward += self._carry_forward(self.COLLABORATIVE_ARTIFACTS)
+
+            # Save metadata and publish the complete bundle
+            metadata = self.save_metadata()
+            metadata['carried_forward'] = carried_forward
+            self.bundle.publish(self.output_dir, self.artifacts, stats=metadata)
+        except Exception:
+            self.bundle.discard(self.output_dir)
+            raise
         
         logger.info("=" * 60)
-        if content_success or collab_success:
-            logger.info("🎉 Training completed successfully!")
-            logger.info(f"   Content-Based Model: {'✅' if content_success else '❌'}")
-            logger.info(f"   Collaborative Model: {'✅' if collab_success else '❌'}")
-            return True
-        else:
-            logger.error("Training failed")
-            return False
+        logger.info("🎉 Training completed successfully!")
+        logger.info(f"   Content-Based Model: {'✅' if content_success else '❌'}")
+        logger.info(f"   Collaborative Model: {'✅' if collab_success else '❌'}")
+        logger.info(f"   Model version: {self.output_dir.name}")
+        return True
+
+    def _carry_forward(self, names):
+        """Copy a group of artifacts from the current published version"""
+        for name in names:
+            (self.output_dir / name).unlink(missing_ok=True)
+            self.artifacts.pop(name, None)
 
+        copied = self.bundle.carry_forward(self.output_dir, names)
+        self.artifacts.update(copied)
+        if copied:
+            logger.warning(f"Carried forward from previous version: {sorted(copied)}")
+        return sorted(copied)
 
 def main():
     """Main training function"""
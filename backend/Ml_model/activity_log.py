@@ -0,0 +1,227 @@
+"""
+Activity Log Writer for NewsXpress
+Buffers tracked activity events in memory and appends them in batches to
+per-worker, rotating JSONL segments from a background thread
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_LOG_DIR = os.getenv(
+    'ACTIVITY_LOG_DIR', str(Path(__file__).resolve().parent / 'data' / 'activity_logs')
+)
+# Events held in memory; beyond this new events are dropped, never waited on
+ACTIVITY_QUEUE_SIZE = int(os.getenv('ACTIVITY_QUEUE_SIZE', 10000))
+# A batch is written once it has this many events...
+ACTIVITY_FLUSH_EVENTS = int(os.getenv('ACTIVITY_FLUSH_EVENTS', 500))
+# ...or its oldest event has waited this long
+ACTIVITY_FLUSH_SECONDS = float(os.getenv('ACTIVITY_FLUSH_SECONDS', 1.0))
+# Segments are rotated daily and when they grow past this size
+ACTIVITY_SEGMENT_MAX_BYTES = int(os.getenv('ACTIVITY_SEGMENT_MAX_BYTES', 64 * 1024 * 1024))
+
+# Queued by close() to wake the flusher thread
+_STOP = object()
+
+
+class BatchWriter(ABC):
+    """
+    Bounded in-memory queue drained by a background thread, which hands
+    events to _write() in batches of up to flush_events, or whatever
+    arrived within flush_seconds. Subclasses implement _write().
+    """
+    thread_name = 'batch-writer'
+
+    def __init__(self, max_queue=None, flush_events=None, flush_seconds=None):
+        self.max_queue = ACTIVITY_QUEUE_SIZE if max_queue is None else max_queue
+        self.flush_events = ACTIVITY_FLUSH_EVENTS if flush_events is None else flush_events
+        self.flush_seconds = ACTIVITY_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self._reset()
+
+    def _reset(self):
+        """Fresh queue and no flusher thread (also used in forked children)"""
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def submit(self, event):
+        """
+        Queue one event without blocking
+
+        Returns:
+            False if the queue is full and the event was dropped
+        """
+        if 'timestamp' not in event:
+            event['timestamp'] = datetime.utcnow().isoformat()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Activity queue full; dropped {self.dropped} events so far")
+            return False
+        self._ensure_thread()
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=self.thread_name, daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                continue
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.flush_events:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    break
+                batch.append(event)
+            self._write(batch)
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                return batch
+            if event is not _STOP:
+                batch.append(event)
+
+    def flush(self):
+        """Write everything queued so far from the calling thread"""
+        batch = self._drain()
+        if batch:
+            self._write(batch)
+        return len(batch)
+
+    def close(self):
+        """Stop the flusher thread and write what is left"""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                pass  # the thread is busy writing and will see the stop flag
+            self._thread.join(timeout=5)
+        self.flush()
+
+    @abstractmethod
+    def _write(self, batch):
+        """Persist one batch of events"""
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+class ActivityLogWriter(BatchWriter):
+    """
+    Layout: <directory>/activity-<YYYY-MM-DD>-<pid>-<seq>.jsonl
+
+    Each worker appends only to its own segments, so lines from concurrent
+    workers never interleave. Readers should glob activity-*.jsonl.
+    """
+    thread_name = 'activity-writer'
+
+    def __init__(self, directory=None, max_queue=None, flush_events=None,
+                 flush_seconds=None, max_segment_bytes=None):
+        self.directory = Path(directory or ACTIVITY_LOG_DIR)
+        self.max_segment_bytes = (
+            ACTIVITY_SEGMENT_MAX_BYTES if max_segment_bytes is None else max_segment_bytes
+        )
+        super().__init__(max_queue, flush_events, flush_seconds)
+
+    def _reset(self):
+        super()._reset()
+        self._segment = None
+        self._segment_bytes = 0
+        self._segment_date = None
+        self._segment_seq = 0
+
+    def _segment_path(self, incoming_bytes):
+        """Current segment, rotated on a new day or when it would grow too large"""
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        if (
+            self._segment is None
+            or today != self._segment_date
+            or (self._segment_bytes and self._segment_bytes + incoming_bytes > self.max_segment_bytes)
+        ):
+            if today != self._segment_date:
+                self._segment_seq = 0
+            self._segment_seq += 1
+            self._segment_date = today
+            self._segment = self.directory / f"activity-{today}-{os.getpid()}-{self._segment_seq:04d}.jsonl"
+            self._segment_bytes = self._segment.stat().st_size if self._segment.exists() else 0
+        return self._segment
+
+    def _write(self, batch):
+        """Append a batch to the current segment in one write"""
+        data = ''.join(json.dumps(event, default=str) + '\n' for event in batch).encode('utf-8')
+        with self._write_lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                path = self._segment_path(len(data))
+                with open(path, 'ab') as f:
+                    f.write(data)
+                self._segment_bytes += len(data)
+                self.written += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.error(f"Could not write {len(batch)} activity events: {e}")
+
+
+# Singleton instance
+_activity_writer = None
+
+
+def get_activity_writer():
+    """Get or create the activity log writer"""
+    global _activity_writer
+    if _activity_writer is None:
+        _activity_writer = ActivityLogWriter()
+        atexit.register(_activity_writer.close)
+    return _activity_writer
+
+
+def _reset_after_fork():
+    # Events queued before fork belong to the parent, which writes them
+    if _activity_writer is not None:
+        _activity_writer._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
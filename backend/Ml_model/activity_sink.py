@@ -0,0 +1,195 @@
+"""
+Activity Event Sink for NewsXpress
+Bulk-loads tracked activity events into PostgreSQL in batches (COPY), so
+training can read them without a per-event INSERT round trip
+"""
+import os
+import io
+import csv
+import sys
+import json
+import atexit
+from pathlib import Path
+from datetime import datetime, timezone
+import logging
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from activity_log import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Off unless enabled: every worker then needs database credentials
+ACTIVITY_DB_SINK = os.getenv('ACTIVITY_DB_SINK', 'false').lower() == 'true'
+ACTIVITY_TABLE = os.getenv('ACTIVITY_TABLE', 'activity_events')
+# Events per COPY; larger batches amortise the round trip further
+ACTIVITY_DB_BATCH = int(os.getenv('ACTIVITY_DB_BATCH', 1000))
+ACTIVITY_DB_FLUSH_SECONDS = float(os.getenv('ACTIVITY_DB_FLUSH_SECONDS', 2.0))
+# Attempts per batch before it is dropped (the JSONL log still has it)
+ACTIVITY_DB_RETRIES = int(os.getenv('ACTIVITY_DB_RETRIES', 3))
+ACTIVITY_DB_RETRY_SECONDS = float(os.getenv('ACTIVITY_DB_RETRY_SECONDS', 0.5))
+
+COLUMNS = ('user_id', 'article_id', 'activity_type', 'occurred_at', 'payload')
+
+
+def occurred_at(value):
+    """
+    UTC ISO 8601 time for an event's client timestamp (ISO string, datetime,
+    or epoch seconds/milliseconds). Missing or invalid values become the
+    server time, since one value TIMESTAMPTZ rejects fails the whole COPY.
+    """
+    try:
+        if isinstance(value, datetime):
+            parsed = value
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Epoch milliseconds, as JavaScript's Date.now() sends
+            seconds = value / 1000 if abs(value) >= 1e11 else value
+            parsed = datetime.fromtimestamp(seconds, timezone.utc)
+        else:
+            parsed = datetime.fromisoformat(str(value).strip())
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc).isoformat()
+    except (TypeError, ValueError, OverflowError, OSError):
+        if value is not None:
+            logger.warning(f"Invalid activity timestamp {value!r}; using the server time")
+        return datetime.now(timezone.utc).isoformat()
+
+
+def event_row(event):
+    """Table row for one tracked event; the full event is kept as payload"""
+    user_id = event.get('user_id')
+    return (
+        str(user_id) if user_id is not None else None,
+        str(event['article_id']),
+        str(event['activity_type']),
+        occurred_at(event.get('timestamp')),
+        json.dumps(event, default=str),
+    )
+
+
+def _pooled_connection():
+    sys.path.append(str(BASE_DIR))
+    from config.db_python import pooled_connection
+    return pooled_connection()
+
+
+class ActivityEventSink(BatchWriter):
+    """
+    Writes batches with COPY ... FROM STDIN through a pooled connection.
+    Connections without copy_expert (e.g. SQLite in tests) fall back to
+    executemany.
+
+    Backpressure: while a batch is being retried the queue keeps filling,
+    and once it is full new events are dropped rather than blocking
+    requests.
+    """
+    thread_name = 'activity-db-sink'
+
+    def __init__(self, connection_factory=None, table=None, max_queue=None, flush_events=None,
+                 flush_seconds=None, retries=None, retry_seconds=None):
+        self.connection_factory = connection_factory or _pooled_connection
+        self.table = table or ACTIVITY_TABLE
+        self.retries = ACTIVITY_DB_RETRIES if retries is None else retries
+        self.retry_seconds = ACTIVITY_DB_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._table_ready = False
+        super().__init__(
+            max_queue,
+            ACTIVITY_DB_BATCH if flush_events is None else flush_events,
+            ACTIVITY_DB_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        )
+
+    def _ensure_table(self, cursor):
+        if self._table_ready:
+            return
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "user_id TEXT, "
+            "article_id TEXT NOT NULL, "
+            "activity_type TEXT NOT NULL, "
+            "occurred_at TIMESTAMPTZ, "
+            "payload JSONB)"
+        )
+        self._table_ready = True
+
+    def _copy(self, connection, rows):
+        cursor = connection.cursor()
+        try:
+            self._ensure_table(cursor)
+            if hasattr(cursor, 'copy_expert'):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {self.table} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+            else:
+                placeholders = ', '.join('?' for _ in COLUMNS)
+                cursor.executemany(
+                    f"INSERT INTO {self.table} ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                    rows
+                )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _write(self, batch):
+        """Load one batch, retrying with backoff"""
+        rows = []
+        for event in batch:
+            try:
+                rows.append(event_row(event))
+            except Exception as e:
+                self.dropped += 1
+                logger.warning(f"Skipping malformed activity event: {e}")
+        if not rows:
+            return
+
+        delay = self.retry_seconds
+        for attempt in range(1, self.retries + 1):
+            try:
+                with self._write_lock, self.connection_factory() as connection:
+                    self._copy(connection, rows)
+                self.written += len(rows)
+                return
+            except Exception as e:
+                logger.warning(f"Activity DB write failed (attempt {attempt}/{self.retries}): {e}")
+                self._table_ready = False
+                if attempt < self.retries:
+                    # close() interrupts the backoff; the last attempt still runs
+                    self._stop.wait(delay)
+                    delay *= 2
+
+        self.dropped += len(rows)
+        logger.error(f"Dropped {len(rows)} activity events after {self.retries} attempts")
+
+
+# Singleton instance
+_activity_sink = None
+
+
+def get_activity_sink():
+    """Get or create the database sink, or None when ACTIVITY_DB_SINK is off"""
+    global _activity_sink
+    if not ACTIVITY_DB_SINK:
+        return None
+    if _activity_sink is None:
+        _activity_sink = ActivityEventSink()
+        atexit.register(_activity_sink.close)
+    return _activity_sink
+
+
+def _reset_after_fork():
+    if _activity_sink is not None:
+        _activity_sink._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,114 @@
+"""
+Admission Control for NewsXpress
+Per-request deadline budgets, per-method scoring cost estimates and a
+concurrency limit on personalized scoring, used to degrade gracefully
+under load instead of letting tail latency grow without bound
+"""
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = 'X-Deadline-Ms'
+# Budgets above this are clamped
+DEADLINE_MAX_MS = float(os.getenv('DEADLINE_MAX_MS', 30000))
+# Scoring only starts if it is expected to finish this long before the deadline
+DEADLINE_MARGIN_MS = float(os.getenv('DEADLINE_MARGIN_MS', 10))
+# Personalized requests scoring at once per worker; beyond this they are shed (0 disables)
+ADMISSION_MAX_PERSONALIZED = int(os.getenv('ADMISSION_MAX_PERSONALIZED', 32))
+# Weight of the newest observation in the scoring cost estimate
+COST_EWMA_ALPHA = float(os.getenv('COST_EWMA_ALPHA', 0.2))
+# A method skipped for its cost is still run by one request this often, so
+# one slow outlier cannot keep it skipped for good
+COST_PROBE_SECONDS = float(os.getenv('COST_PROBE_SECONDS', 5))
+
+
+class Deadline:
+    """A request's latency budget, measured on the perf_counter clock"""
+
+    def __init__(self, budget_ms, started=None):
+        started = time.perf_counter() if started is None else started
+        self.expires_at = started + min(budget_ms, DEADLINE_MAX_MS) / 1000
+
+    @classmethod
+    def from_header(cls, value, started=None):
+        """Deadline for an X-Deadline-Ms value, or None if absent or invalid"""
+        if not value:
+            return None
+        try:
+            budget_ms = float(value)
+        except ValueError:
+            return None
+        if budget_ms <= 0:
+            return None
+        return cls(budget_ms, started)
+
+    def remaining(self):
+        return self.expires_at - time.perf_counter()
+
+    def allows(self, seconds):
+        """True if work expected to take this long fits in the budget"""
+        return self.remaining() - seconds >= DEADLINE_MARGIN_MS / 1000
+
+
+class CostEstimator:
+    """
+    Exponentially weighted average of uncached scoring time per method.
+    Unknown methods estimate as 0, so the first requests always run.
+
+    The estimate only moves when a method runs, so a method whose estimate
+    no longer fits requests' deadlines is probed: try_probe() lets one such
+    request run it every probe_seconds, and the probe's time replaces the
+    estimate.
+    """
+
+    def __init__(self, alpha=None, probe_seconds=None):
+        self.alpha = COST_EWMA_ALPHA if alpha is None else alpha
+        self.probe_seconds = COST_PROBE_SECONDS if probe_seconds is None else probe_seconds
+        self._estimates = {}
+        self._last_run = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, seconds, probe=False):
+        with self._lock:
+            previous = self._estimates.get(method)
+            self._estimates[method] = (
+                seconds if previous is None or probe else previous + self.alpha * (seconds - previous)
+            )
+            self._last_run[method] = time.monotonic()
+
+    def try_probe(self, method):
+        """True if a request skipping method for its cost should run it anyway"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_run.get(method, float('-inf')) < self.probe_seconds:
+                return False
+            self._last_run[method] = now
+            return True
+
+    def estimate(self, method):
+        return self._estimates.get(method, 0.0)
+
+    def snapshot(self):
+        return dict(self._estimates)
+
+
+class AdmissionLimiter:
+    """Non-blocking slots for personalized scoring; limit 0 admits everything"""
+
+    def __init__(self, limit=None):
+        self.limit = ADMISSION_MAX_PERSONALIZED if limit is None else limit
+        self._slots = threading.BoundedSemaphore(self.limit) if self.limit > 0 else None
+        self.shed = 0
+
+    def try_acquire(self):
+        if self._slots is None or self._slots.acquire(blocking=False):
+            return True
+        self.shed += 1
+        return False
+
+    def release(self):
+        if self._slots is not None:
+            self._slots.release()
@@ -2,18 +2,36 @@
 Flask API Server for ML Recommendations
 Provides REST API endpoints for personalized recommendation service
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 import os
 import sys
+import json
+import time
+import uuid
+import base64
+import threading
 from pathlib import Path
 import logging
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).resolve().parent))
 
-from Recommender_Models import get_recommendation_service
-from cache_manager import get_cache_manager, cached
+from Recommender_Models import get_recommendation_service, RecommendationService, MODELS_DIR
+from cache_manager import (
+    get_cache_manager, cached, recommendation_cache_key, trending_cache_key,
+    select_recommendations, RANKED_LIST_DEPTH, PERSONALIZED_CACHE_TTL, RECOMMENDATION_CACHE_TTL, TRENDING_CACHE_TTL, CACHE_COMPACT_RESULTS
+)
+from model_bundle import ModelBundle
+from activity_log import get_activity_writer
+from activity_sink import get_activity_sink
+from metrics import get_metrics, stage_timer, collect_stages, record_recommendation
+from slow_log import get_slow_log
+from response_encoding import encode_response, etag_content, negotiate_format, pack_msgpack, MSGPACK_MIMETYPE
+from admission import Deadline, CostEstimator, AdmissionLimiter, DEADLINE_HEADER
+from profiler import (
+    profiling_enabled, authorized, sample_stacks, RequestProfile, ProfilerBusy, PROFILER_MAX_SECONDS
+)
 
 
 # Setup logging
@@ -23,6 +41,530 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum sub-requests accepted by /api/recommendations/batch
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 50))
+
+# Seconds between checks for a newly published model bundle (0 disables)
+MODEL_RELOAD_INTERVAL = int(os.getenv('MODEL_RELOAD_INTERVAL', 60))
+
+# How long a paginated feed's ranked list stays cached for its next pages
+CURSOR_TTL = int(os.getenv('CURSOR_TTL', 1800))
+# First-page params a cursor carries, so an expired snapshot can be rebuilt
+CURSOR_PARAMS = ('method', 'user_id', 'article_id', 'recent_articles', 'days', 'exclude')
+# A paginated feed holds at least this many pages (or RANKED_LIST_DEPTH items)
+CURSOR_PAGES = int(os.getenv('CURSOR_PAGES', 10))
+
+# Cheaper methods to fall back to, in order, when a request cannot be scored in time
+FALLBACK_METHODS = {
+    'hybrid': ('collaborative', 'trending'),
+    'collaborative': ('trending',),
+    'content': ('trending',),
+}
+# Methods that score per user and take an admission slot
+PERSONALIZED_METHODS = ('hybrid', 'collaborative')
+
+
+class ModelReloader:
+    """
+    Swaps in a freshly loaded RecommendationService when training publishes
+    a new model bundle. Requests keep using the old service (and its cache
+    namespace) until the new one has finished loading.
+    """
+
+    def __init__(self, app, interval=None):
+        self.app = app
+        self.interval = MODEL_RELOAD_INTERVAL if interval is None else interval
+        self.bundle = ModelBundle(MODELS_DIR)
+        self._next_check = time.monotonic() + self.interval
+        self._lock = threading.Lock()
+
+    def maybe_reload(self):
+        """before_request hook: check at most once per interval, load in the background"""
+        if self.interval <= 0 or time.monotonic() < self._next_check:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        self._next_check = time.monotonic() + self.interval
+        threading.Thread(
+            target=self._reload_and_release, name='model-reloader', daemon=True
+        ).start()
+
+    def _reload_and_release(self):
+        try:
+            self.reload()
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """
+        Load the current bundle if it is not the one being served
+
+        Returns:
+            True if the app switched to a new model version
+        """
+        try:
+            current = self.bundle.current_version()
+            if current is None or current == self.app.recommendation_service.model_version:
+                return False
+
+            service = RecommendationService()
+            if not service.load_models() or service.model_version != current:
+                logger.error(f"Could not load model version {current}; keeping the current models")
+                return False
+
+            self.app.recommendation_service = service
+            self.app.cache_manager.model_version = service.model_version
+            logger.info(f"Switched to model version {service.model_version}")
+            return True
+        except Exception as e:
+            logger.error(f"Error reloading models: {e}")
+            return False
+
+
+def plan_recommendation(svc, params, depth=None):
+    """
+    Work out how to serve one recommendation request
+    
+    The cache holds one deep, unfiltered ranked list per method and
+    user/article; exclude and top_n are applied after the read, so every
+    variant of a request shares that entry.
+    
+    Args:
+        depth: Candidates needed after exclude when more than top_n, e.g.
+               a paginated feed's whole snapshot
+    
+    Returns:
+        dict with the method, the ranked list's cache key (None when the
+        request needs more than RANKED_LIST_DEPTH candidates), TTL, tags,
+        a zero-argument compute() producing the (compacted) ranked list,
+        and the top_n / exclude / fields to apply to it
+    """
+    user_id = params.get('user_id')
+    article_id = params.get('article_id')
+    method = params.get('method', 'hybrid')
+    top_n = int(params.get('top_n', 10))
+    exclude_ids = params.get('exclude') or []
+    recent_articles = params.get('recent_articles') or []
+    days = int(params.get('days', 7))
+    fields = parse_fields(params.get('fields'))
+    
+    def rank(depth, exclude=None):
+        # Route to appropriate method
+        if method == 'content' and article_id:
+            return svc.get_similar_articles(
+                article_id=article_id,
+                top_n=depth,
+                exclude_ids=exclude
+            )
+        if method == 'collaborative' and user_id:
+            return svc.get_collaborative_recommendations(
+                user_id=user_id,
+                top_n=depth,
+                exclude_ids=exclude
+            )
+        if method == 'hybrid' and user_id:
+            return svc.get_hybrid_recommendations(
+                user_id=user_id,
+                recent_article_ids=recent_articles,
+                top_n=depth,
+                exclude_ids=exclude
+            )
+        if method == 'trending':
+            return svc.get_trending_articles(
+                top_n=depth,
+                time_window_days=days
+            )
+        # Fallback to trending if invalid params
+        logger.warning(f"Invalid method/params: {method}, user_id={user_id}, article_id={article_id}")
+        return svc.get_trending_articles(top_n=depth)
+    
+    # Only the first 3 recent articles feed the hybrid ranking
+    context = None
+    if method == 'hybrid' and recent_articles:
+        context = tuple(recent_articles[:3])
+    
+    # Build cache key (namespaced by the model version being served);
+    # trending shares its entry with /api/recommendations/trending
+    cache_key = None
+    depth = max(top_n, depth or 0)
+    if depth <= RANKED_LIST_DEPTH and top_n + len(exclude_ids) <= RANKED_LIST_DEPTH:
+        if method == 'trending':
+            cache_key = trending_cache_key(svc.model_version, days=days)
+        else:
+            cache_key = recommendation_cache_key(
+                method, svc.model_version, user_id=user_id, article_id=article_id, context=context
+            )
+        ranked = lambda: rank(RANKED_LIST_DEPTH)
+    else:
+        ranked = lambda: rank(depth, exclude_ids)
+    
+    # Cache with appropriate TTL
+    if method == 'trending':
+        ttl = TRENDING_CACHE_TTL
+    else:
+        ttl = PERSONALIZED_CACHE_TTL if user_id else RECOMMENDATION_CACHE_TTL
+    tags = []
+    if user_id:
+        tags.append(f"user:{user_id}")
+    if article_id:
+        tags.append(f"article:{article_id}")
+    
+    compute = ranked
+    if CACHE_COMPACT_RESULTS:
+        compute = lambda: svc.compact_recommendations(ranked())
+    
+    return {
+        'method': method,
+        'cache_key': cache_key,
+        'compute': compute,
+        'ttl': ttl,
+        'tags': tags,
+        'top_n': top_n,
+        'exclude': exclude_ids,
+        'fields': fields,
+    }
+
+
+def parse_fields(value):
+    """
+    Requested response fields from "id,score" or ["id", "score"]
+
+    Returns:
+        list of field names, or None for every field
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = [str(field).strip() for field in value if str(field).strip()]
+    return fields or None
+
+
+def present_recommendations(svc, recommendations, fields=None, method=None):
+    """
+    Hydrate selected recommendations and project them to the requested
+    fields (the id is always kept). Hydration is skipped when the compact
+    entries already carry every requested field, e.g. fields=id,relevance_score.
+    Trending results keep published_at as a timestamp, as when uncached.
+    """
+    if CACHE_COMPACT_RESULTS and (
+        fields is None or any(field not in rec for rec in recommendations for field in fields)
+    ):
+        if method == 'trending':
+            recommendations = svc.hydrate_recommendations(recommendations, parse_dates=True)
+        else:
+            recommendations = svc.hydrate_recommendations(recommendations)
+    if fields is None:
+        return recommendations
+    keep = ['id'] + [field for field in fields if field != 'id']
+    return [{field: rec[field] for field in keep if field in rec} for rec in recommendations]
+
+
+def serve_plan(svc, plan, ranked):
+    """Filter a ranked list for one planned request, hydrate and project it"""
+    recommendations = select_recommendations(ranked, plan['top_n'], plan['exclude'])
+    return present_recommendations(svc, recommendations, plan['fields'], plan['method'])
+
+
+def render_payload(payload):
+    """JSON response, or MessagePack when the client asks for it and msgpack is installed"""
+    if negotiate_format(request.headers.get('Accept')) == 'msgpack':
+        response = Response(pack_msgpack(payload), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(payload)
+    response.vary.add('Accept')
+    return response
+
+
+def rank_plan(cache, plan):
+    """Ranked list for a plan: cached, or computed directly when too deep to cache"""
+    if plan['cache_key'] is None:
+        return plan['compute'](), False
+    # Concurrent misses for the same key are computed once
+    return cache.get_or_compute(
+        plan['cache_key'], plan['compute'], ttl_seconds=plan['ttl'], tags=plan['tags']
+    )
+
+
+def serve_within_budget(app, svc, cache, params, deadline=None):
+    """
+    Rank a request, degrading to cheaper methods rather than overrunning
+    
+    Each method of the fallback chain is scored only if its estimated cost
+    fits the deadline (or the request is its periodic cost probe) and, for
+    personalized methods, an admission slot is free. Otherwise its cached list is served if there is one, or the next
+    method is tried. Overload sheds personalized requests straight to
+    trending, the last resort, which always runs.
+    
+    Returns:
+        (plan actually served, ranked list, from_cache, degradation reason:
+        None, 'deadline' or 'overload')
+    """
+    plan = plan_recommendation(svc, params)
+    requested = plan['method']
+    chain = (requested,) + FALLBACK_METHODS.get(requested, ())
+    reason = None
+    for method in chain[:-1]:
+        if method != requested:
+            plan = plan_recommendation(svc, {**params, 'method': method})
+        personalized = method in PERSONALIZED_METHODS
+        over_budget = deadline is not None and not deadline.allows(app.cost_estimator.estimate(method))
+        probe = over_budget and app.cost_estimator.try_probe(method)
+        if over_budget and not probe:
+            blocked = 'deadline'
+        elif personalized and (reason == 'overload' or not app.admission.try_acquire()):
+            blocked = 'overload'
+        else:
+            try:
+                started = time.perf_counter()
+                ranked, from_cache = rank_plan(cache, plan)
+                if not from_cache:
+                    app.cost_estimator.observe(method, time.perf_counter() - started, probe=probe)
+            finally:
+                if personalized:
+                    app.admission.release()
+            return plan, ranked, from_cache, reason
+        
+        # Cannot score it now, but a cached list is still a full answer
+        fallback_ranked = cache.get(plan['cache_key']) if plan['cache_key'] is not None else None
+        if fallback_ranked is not None:
+            return plan, fallback_ranked, True, reason
+        reason = blocked
+    
+    if plan['method'] != chain[-1]:
+        plan = plan_recommendation(svc, {**params, 'method': chain[-1]})
+    ranked, from_cache = rank_plan(cache, plan)
+    return plan, ranked, from_cache, reason
+
+
+def is_paginated(params):
+    """True for a cursor request or a first page asked for with paginate=true"""
+    return bool(params.get('cursor')) or str(params.get('paginate', '')).lower() in ('1', 'true')
+
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(
+        json.dumps(state, separators=(',', ':')).encode('utf-8')
+    ).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Raises:
+        ValueError if the token is not a cursor issued by encode_cursor()
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not (isinstance(state['s'], str) and isinstance(state['o'], int) and isinstance(state['p'], dict)):
+            raise ValueError
+        return state
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def open_cursor(svc, params):
+    """
+    Cursor pagination over a snapshot of the first page's ranked list
+    
+    The first page (paginate=true) stores the ranked list, with exclude
+    already applied, under cursor:<random id>; later pages slice that
+    snapshot, so page N costs one cache read. The cursor also carries the
+    first page's params, so an expired snapshot is rebuilt rather than lost.
+    The snapshot holds RANKED_LIST_DEPTH items, or CURSOR_PAGES pages when
+    that is deeper (those bypass the ranked list cache).
+    
+    Returns:
+        (cursor state, plan, snapshot cache key)
+    
+    Raises:
+        ValueError for an invalid cursor
+    """
+    if params.get('cursor'):
+        state = decode_cursor(params['cursor'])
+        page_params = {**state['p'], 'top_n': params.get('top_n', 10), 'fields': params.get('fields')}
+    else:
+        state = {
+            's': uuid.uuid4().hex,
+            'o': 0,
+            'p': {name: params[name] for name in CURSOR_PARAMS if params.get(name)},
+        }
+        page_params = params
+    top_n = int(page_params.get('top_n', 10))
+    plan = plan_recommendation(svc, page_params, depth=max(state['o'] + top_n, top_n * CURSOR_PAGES))
+    return state, plan, f"cursor:{state['s']}"
+
+
+def snapshot_ranked(plan, ranked):
+    """The list a cursor pages through: the ranked list minus exclude"""
+    return select_recommendations(ranked, len(ranked), plan['exclude'])
+
+
+def page_from_snapshot(svc, state, plan, snapshot):
+    """
+    Returns:
+        (this page's presented recommendations, cursor of the next page or None)
+    """
+    offset = max(state['o'], 0)
+    end = offset + plan['top_n']
+    page = present_recommendations(svc, snapshot[offset:end], plan['fields'], plan['method'])
+    next_cursor = encode_cursor({**state, 'o': end}) if end < len(snapshot) else None
+    return page, next_cursor
+
+
+def serve_page(svc, cache, params):
+    """
+    One page of a paginated feed (see open_cursor)
+    
+    Returns:
+        (plan, recommendations, from_cache, next_cursor)
+    """
+    state, plan, snapshot_key = open_cursor(svc, params)
+    snapshot = cache.get(snapshot_key) if params.get('cursor') else None
+    from_cache = snapshot is not None
+    if snapshot is None:
+        ranked, from_cache = rank_plan(cache, plan)
+        snapshot = snapshot_ranked(plan, ranked)
+        cache.set(snapshot_key, snapshot, ttl_seconds=CURSOR_TTL, tags=plan['tags'])
+    recommendations, next_cursor = page_from_snapshot(svc, state, plan, snapshot)
+    return plan, recommendations, from_cache, next_cursor
+
+
+def cache_result(cache_key, from_cache):
+    """Cache outcome label for metrics: hit, miss, or bypass (not cacheable)"""
+    if cache_key is None:
+        return 'bypass'
+    return 'hit' if from_cache else 'miss'
+
+
+def capture_slow_request(svc, started, params, stages, cache_outcome, status):
+    """Write a recommendation request to the slow log if it exceeded SLOW_REQUEST_MS"""
+    get_slow_log().record(
+        (time.perf_counter() - started) * 1000, params, stages, request.headers,
+        route=request.path, status=status, model_version=svc.model_version, cache=cache_outcome
+    )
+
+
+def start_request_timer():
+    """before_request hook: remember when the request started"""
+    g.request_started = time.perf_counter()
+
+
+def record_request_metrics(response):
+    """after_request hook: count the request and observe its latency by route"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics = get_metrics()
+        metrics.inc('newsxpress_http_requests_total', {
+            'route': route, 'http_method': request.method, 'status': response.status_code
+        })
+        metrics.observe(
+            'newsxpress_http_request_duration_seconds', time.perf_counter() - started, {'route': route}
+        )
+    return response
+
+
+def start_request_profile():
+    """before_request hook: X-Profile: 1 plus the admin token profiles this request"""
+    if request.headers.get('X-Profile') != '1' or not authorized(request.headers.get('X-Admin-Token')):
+        return
+    profile = RequestProfile()
+    if profile.start():
+        g.request_profile = profile
+    else:
+        g.request_profile_busy = True
+
+
+def finish_request_profile(response):
+    """after_request hook: replace the response with the profile report"""
+    profile = g.pop('request_profile', None)
+    if profile is None:
+        if g.pop('request_profile_busy', False):
+            response.headers['X-Profile-Skipped'] = 'busy'
+        return response
+    report = Response(profile.stop(), mimetype='text/plain')
+    report.headers['X-Profiled-Status'] = str(response.status_code)
+    return report
+
+
+def release_request_profile(exc=None):
+    """teardown hook: never leave a profile running if the response failed"""
+    profile = g.pop('request_profile', None)
+    if profile is not None:
+        profile.stop()
+
+
+def encode_cacheable_response(response):
+    """
+    after_request hook for routes that set g.etag_parts: strong ETag,
+    304 for a matching If-None-Match, compression of large bodies
+    """
+    etag_parts = g.pop('etag_parts', None)
+    if etag_parts is None or response.status_code != 200 or response.direct_passthrough:
+        return response
+    status, body, headers = encode_response(
+        response.get_data(), etag_parts,
+        request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding')
+    )
+    response.status_code = status
+    response.set_data(body)
+    response.vary.add(headers.pop('Vary'))
+    response.headers.update(headers)
+    return response
+
+
+def record_activity(data):
+    """
+    Queue one tracked activity for the background log writer and, when
+    enabled, the database sink
+    
+    Returns:
+        False if the log writer is overloaded and the event was dropped
+    """
+    accepted = get_activity_writer().submit(data)
+    sink = get_activity_sink()
+    if sink is not None:
+        # Best effort: the JSONL log is the source of truth for backfills
+        sink.submit(dict(data))
+    if accepted:
+        logger.debug(f"Tracked {data['activity_type']} on article {data['article_id']}")
+    return accepted
+
+
+def models_info(svc):
+    """
+    Information about the loaded models and the published bundles
+    
+    model_version is the version held in memory; current_version is the
+    bundle the current link points to, which differs after a fallback to an
+    older bundle or until the reloader has caught up
+    """
+    models_dir = Path(__file__).resolve().parent / 'models'
+    bundle = ModelBundle(models_dir)
+    model_version = svc.model_version
+    metadata_path = (
+        bundle.versions_dir / model_version if model_version else models_dir
+    ) / 'training_metadata.csv'
+    
+    info = {
+        "models_loaded": svc.models_loaded,
+        "content_based_available": svc.sig_matrix is not None,
+        "collaborative_available": svc.user_sim_matrix is not None,
+        "model_version": model_version,
+        "current_version": bundle.current_version(),
+        "available_versions": bundle.published_versions(),
+    }
+    
+    if metadata_path.exists():
+        try:
+            import pandas as pd
+            metadata = pd.read_csv(metadata_path).iloc[0].to_dict()
+            info.update(metadata)
+        except Exception as e:
+            logger.warning(f"Could not read models metadata: {e}")
+    
+    return info
+
 
 def create_app(config: dict = None):
     """Create and configure the Flask application."""
@@ -41,6 +583,27 @@ def create_app(config: dict = None):
     # Initialize services lazily and attach to app for easy testing
     app.recommendation_service = get_recommendation_service()
     app.cache_manager = get_cache_manager()
+    app.cache_manager.model_version = app.recommendation_service.model_version
+
+    # Deadline budgets and load shedding for /api/recommendations
+    app.cost_estimator = CostEstimator()
+    app.admission = AdmissionLimiter()
+
+    # Pick up models published by the retraining scheduler
+    app.model_reloader = ModelReloader(app)
+    app.before_request(app.model_reloader.maybe_reload)
+    
+    # Request counts and latency for /metrics
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+    
+    # X-Profile: 1 (admin only, off unless PROFILER_ADMIN_TOKEN is set)
+    app.before_request(start_request_profile)
+    app.after_request(finish_request_profile)
+    app.teardown_request(release_request_profile)
+    
+    # ETag/304 and compression (registered last, so it runs first)
+    app.after_request(encode_cacheable_response)
 
     # Register routes using closures to access app services
     register_routes(app)
@@ -67,99 +630,136 @@ def register_routes(app):
     # Unified recommendations endpoint - supports all methods
     @app.route('/api/recommendations', methods=['GET', 'POST'])
     def get_recommendations():
+        started = time.perf_counter()
+        svc = current_app.recommendation_service
+        params, outcome = {}, None
+        with collect_stages() as stages:
+            try:
+                cache = current_app.cache_manager
+                
+                # Parse params from GET or POST
+                if request.method == 'POST':
+                    params = request.json or {}
+                else:
+                    params = request.args.to_dict()
+                    params['exclude'] = request.args.getlist('exclude')
+                
+                payload = {"success": True}
+                if is_paginated(params):
+                    try:
+                        plan, recommendations, from_cache, next_cursor = serve_page(svc, cache, params)
+                    except ValueError as e:
+                        return jsonify({
+                            "success": False,
+                            "error": str(e)
+                        }), 400
+                    payload["next_cursor"] = next_cursor
+                else:
+                    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), started)
+                    plan, ranked, from_cache, degraded = serve_within_budget(
+                        current_app, svc, cache, params, deadline
+                    )
+                    recommendations = serve_plan(svc, plan, ranked)
+                    if degraded:
+                        payload["degraded"] = degraded
+                        payload["requested_method"] = params.get('method', 'hybrid')
+                        get_metrics().inc('newsxpress_degraded_total', {
+                            'method': payload["requested_method"], 'reason': degraded
+                        })
+                cache_key, method = plan['cache_key'], plan['method']
+                outcome = cache_result(cache_key, from_cache)
+                if from_cache:
+                    logger.info(f"Cache hit: {cache_key}")
+                
+                payload.update({
+                    "recommendations": recommendations,
+                    "method": method,
+                    "from_cache": from_cache
+                })
+                with stage_timer('serialization'):
+                    response = render_payload(payload)
+                g.etag_parts = (svc.model_version, cache_key, etag_content(payload, response.mimetype))
+                record_recommendation(method, outcome, time.perf_counter() - started)
+                capture_slow_request(svc, started, params, stages, outcome, 200)
+                return response
+                
+            except Exception as e:
+                logger.error(f"Error in get_recommendations: {e}")
+                import traceback
+                traceback.print_exc()
+                capture_slow_request(svc, started, params, stages, outcome, 500)
+                return jsonify({
+                    "success": False,
+                    "error": str(e),
+                    "message": "Failed to fetch recommendations"
+                }), 500
+
+    @app.route('/api/recommendations/similar/<article_id>', methods=['GET'])
+    def get_similar_articles(article_id):
+        return get_recommendations()
+
+
+
+
+    @app.route('/api/recommendations/personalized/<user_id>', methods=['GET', 'POST'])
+    def get_personalized_recommendations_legacy(user_id):
+        return get_recommendations()
+
+    @app.route('/api/recommendations/batch', methods=['POST'])
+    def get_recommendations_batch():
+        """
+        Serve several recommendation requests with one cache round trip
+        Body: {"requests": [{...same params as /api/recommendations...}, ...]}
+        """
         try:
             svc = current_app.recommendation_service
             cache = current_app.cache_manager
             
-            # Parse params from GET or POST
-            if request.method == 'POST':
-                params = request.json or {}
-            else:
-                params = request.args.to_dict()
-                params['exclude'] = request.args.getlist('exclude')
+            batch = (request.json or {}).get('requests')
+            if not isinstance(batch, list) or not batch:
+                return jsonify({
+                    "success": False,
+                    "error": "Provide a non-empty 'requests' list"
+                }), 400
+            if len(batch) > BATCH_MAX_REQUESTS:
+                return jsonify({
+                    "success": False,
+                    "error": f"At most {BATCH_MAX_REQUESTS} requests per batch"
+                }), 400
             
-            user_id = params.get('user_id')
-            article_id = params.get('article_id')
-            method = params.get('method', 'hybrid')
-            top_n = int(params.get('top_n', 10))
-            exclude_ids = params.get('exclude', [])
+            plans = [plan_recommendation(svc, params or {}) for params in batch]
+            outcomes = iter(cache.get_or_compute_many([
+                (plan['cache_key'], plan['compute'], plan['ttl'], plan['tags'])
+                for plan in plans if plan['cache_key'] is not None
+            ]))
             
-            # Build cache key
-            cache_key = f"rec:{method}:u={user_id}:a={article_id}:n={top_n}"
-            cached_result = cache.get(cache_key)
+            results = []
+            for plan in plans:
+                if plan['cache_key'] is None:
+                    ranked, from_cache = plan['compute'](), False
+                else:
+                    ranked, from_cache = next(outcomes)
+                recommendations = serve_plan(svc, plan, ranked)
+                record_recommendation(plan['method'], cache_result(plan['cache_key'], from_cache))
+                results.append({
+                    "recommendations": recommendations,
+                    "method": plan['method'],
+                    "from_cache": from_cache
+                })
             
-            if cached_result:
-                logger.info(f"Cache hit: {cache_key}")
-                return jsonify({
+            with stage_timer('serialization'):
+                return render_payload({
                     "success": True,
-                    "recommendations": cached_result,
-                    "method": method,
-                    "from_cache": True
+                    "results": results
                 })
             
-            # Route to appropriate method
-            if method == 'content' and article_id:
-                recommendations = svc.get_similar_articles(
-                    article_id=article_id,
-                    top_n=top_n,
-                    exclude_ids=exclude_ids
-                )
-            elif method == 'collaborative' and user_id:
-                recommendations = svc.get_collaborative_recommendations(
-                    user_id=user_id,
-                    top_n=top_n,
-                    exclude_ids=exclude_ids
-                )
-            elif method == 'hybrid' and user_id:
-                recent_articles = params.get('recent_articles', [])
-                recommendations = svc.get_hybrid_recommendations(
-                    user_id=user_id,
-                    recent_article_ids=recent_articles,
-                    top_n=top_n,
-                    exclude_ids=exclude_ids
-                )
-            elif method == 'trending':
-                recommendations = svc.get_trending_articles(
-                    top_n=top_n,
-                    time_window_days=int(params.get('days', 7))
-                )
-            else:
-                # Fallback to trending if invalid params
-                logger.warning(f"Invalid method/params: {method}, user_id={user_id}, article_id={article_id}")
-                recommendations = svc.get_trending_articles(top_n=top_n)
-            
-            # Cache with appropriate TTL
-            ttl = 900 if user_id else 1800  # 15 min for personalized, 30 min for others
-            cache.set(cache_key, recommendations, ttl_seconds=ttl)
-            
-            return jsonify({
-                "success": True,
-                "recommendations": recommendations,
-                "method": method,
-                "from_cache": False
-            })
-            
         except Exception as e:
-            logger.error(f"Error in get_recommendations: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"Error in get_recommendations_batch: {e}")
             return jsonify({
                 "success": False,
-                "error": str(e),
-                "message": "Failed to fetch recommendations"
+                "error": str(e)
             }), 500
 
-    @app.route('/api/recommendations/similar/<article_id>', methods=['GET'])
-    def get_similar_articles(article_id):
-        return get_recommendations()
-
-
-
-
-    @app.route('/api/recommendations/personalized/<user_id>', methods=['GET', 'POST'])
-    def get_personalized_recommendations_legacy(user_id):
-        return get_recommendations()
-
     @app.route('/api/track', methods=['POST'])
     def track_activity():
         try:
@@ -178,23 +778,11 @@ def register_routes(app):
                     "error": "Missing required fields: article_id, activity_type"
                 }), 400
             
-            # Log activity (eventually to DB, for now to JSON log)
-            activity_log_path = Path(__file__).resolve().parent / 'data' / 'activity_logs.jsonl'
-            activity_log_path.parent.mkdir(exist_ok=True)
-            
-            # Add timestamp if missing
-            if 'timestamp' not in data:
-                from datetime import datetime
-                data['timestamp'] = datetime.utcnow().isoformat()
-            
-            # Append to JSONL file
-            try:
-                import json
-                with open(activity_log_path, 'a') as f:
-                    f.write(json.dumps(data) + '\n')
-                logger.info(f"Tracked {data['activity_type']} on article {data['article_id']}")
-            except Exception as log_err:
-                logger.warning(f"Could not write to activity log: {log_err}")
+            if not record_activity(data):
+                return jsonify({
+                    "success": False,
+                    "error": "Activity tracking is overloaded, try again shortly"
+                }), 503
             
             return jsonify({
                 "success": True,
@@ -214,39 +802,50 @@ def register_routes(app):
     def get_trending():
         """
         Get trending articles
-        Query params: top_n (default: 10), days (default: 7)
+        Query params: top_n (default: 10), days (default: 7), fields (default: all)
         """
+        started = time.perf_counter()
         try:
             svc = current_app.recommendation_service
             cache = current_app.cache_manager
             
             top_n = int(request.args.get('top_n', 10))
             days = int(request.args.get('days', 7))
+            fields = parse_fields(request.args.get('fields'))
             
-            # Check cache
-            cache_key = f"rec:trending:n={top_n}:days={days}"
-            cached_result = cache.get(cache_key)
-            
-            if cached_result:
-                return jsonify({
-                    "success": True,
-                    "recommendations": cached_result,
-                    "from_cache": True
-                })
+            # One deep list per window serves every top_n up to the depth
+            depth = max(top_n, RANKED_LIST_DEPTH)
+            def compute():
+                trending = svc.get_trending_articles(top_n=depth, time_window_days=days)
+                return svc.compact_recommendations(trending) if CACHE_COMPACT_RESULTS else trending
             
-            recommendations = svc.get_trending_articles(
-                top_n=top_n,
-                time_window_days=days
+            cache_key = None
+            if top_n > RANKED_LIST_DEPTH:
+                recommendations, from_cache = compute(), False
+            else:
+                cache_key = trending_cache_key(svc.model_version, days=days)
+                recommendations, from_cache = cache.get_or_compute(
+                    cache_key, compute, ttl_seconds=TRENDING_CACHE_TTL
+                )
+            recommendations = present_recommendations(
+                svc, select_recommendations(recommendations, top_n), fields, 'trending'
             )
             
-            # Cache for 5 minutes
-            cache.set(cache_key, recommendations, ttl_seconds=300)
-            
-            return jsonify({
+            payload = {
                 "success": True,
                 "recommendations": recommendations,
-                "from_cache": False
-            })
+                "from_cache": from_cache
+            }
+            with stage_timer('serialization'):
+                response = render_payload(payload)
+            g.etag_parts = (
+                svc.model_version, cache_key or f"trending:days={days}:top_n={top_n}",
+                etag_content(payload, response.mimetype)
+            )
+            record_recommendation(
+                'trending', cache_result(cache_key, from_cache), time.perf_counter() - started
+            )
+            return response
             
         except Exception as e:
             logger.error(f"Error in get_trending: {e}")
@@ -311,27 +910,59 @@ def register_routes(app):
             }), 500
 
 
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics_text():
+        """Prometheus text exposition of request, cache and stage metrics for all workers"""
+        return Response(get_metrics().render(), mimetype='text/plain; version=0.0.4')
+
+
+    @app.route('/api/debug/profile', methods=['GET'])
+    def profile_worker():
+        """
+        Sample this worker's stacks and return them collapsed (flame graph input)
+        Query params: seconds (default: 5), interval_ms (default: 5)
+        Header: X-Admin-Token
+        """
+        if not profiling_enabled():
+            return jsonify({
+                "success": False,
+                "error": "Not found"
+            }), 404
+        if not authorized(request.headers.get('X-Admin-Token')):
+            return jsonify({
+                "success": False,
+                "error": "Admin token required"
+            }), 403
+        
+        try:
+            seconds = float(request.args.get('seconds', 5))
+            interval_ms = request.args.get('interval_ms')
+            interval = float(interval_ms) / 1000 if interval_ms else None
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "error": "seconds and interval_ms must be numbers"
+            }), 400
+        if not 0 < seconds <= PROFILER_MAX_SECONDS:
+            return jsonify({
+                "success": False,
+                "error": f"seconds must be between 0 and {PROFILER_MAX_SECONDS:g}"
+            }), 400
+        
+        try:
+            return Response(sample_stacks(seconds, interval), mimetype='text/plain')
+        except ProfilerBusy as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 409
+
+
     @app.route('/api/models/info', methods=['GET'])
     def get_models_info():
         """Get information about loaded models"""
         try:
-            svc = current_app.recommendation_service
-            metadata_path = Path(__file__).resolve().parent / 'models' / 'training_metadata.csv'
-            
-            info = {
-                "models_loaded": svc.models_loaded,
-                "content_based_available": svc.sig_matrix is not None,
-                "collaborative_available": svc.user_sim_matrix is not None,
-            }
-            
-            if metadata_path.exists():
-                try:
-                    import pandas as pd
-                    metadata = pd.read_csv(metadata_path).iloc[0].to_dict()
-                    info.update(metadata)
-                except Exception as e:
-                    logger.warning(f"Could not read models metadata: {e}")
-            
+            info = models_info(current_app.recommendation_service)
             return jsonify({
                 "success": True,
                 "info": info
@@ -345,11 +976,22 @@ def register_routes(app):
             }), 500
 
 
-# Create default app instance for running the server directly or for WSGI servers
-app = create_app()
+def __getattr__(name):
+    """
+    The default app for WSGI servers (gunicorn api_server:app) is created on
+    first access, so modules importing helpers from here (asgi_server,
+    slow_log) do not build a Flask app, load models and start a reloader
+    """
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == '__main__':
+    app = create_app()
+    
     # Support PORT environment variable from Render, or use ML_API_PORT
     port = int(os.environ.get('PORT', os.getenv('ML_API_PORT', 5001)))
     debug = os.getenv('FLASK_ENV') == 'development'
@@ -0,0 +1,604 @@
+"""
+ASGI Server for ML Recommendations
+Serves the same endpoints as api_server.py on asyncio: Redis round trips are
+awaited and CPU-bound model scoring runs in a bounded thread pool
+
+Run with any ASGI server, e.g.: uvicorn asgi_server:app --port 5001
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import logging
+import contextlib
+from pathlib import Path
+from datetime import date
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.http import http_date
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from Recommender_Models import get_recommendation_service
+from cache_manager import (
+    get_cache_manager, AsyncCacheManager, trending_cache_key, select_recommendations,
+    RANKED_LIST_DEPTH, TRENDING_CACHE_TTL, CACHE_COMPACT_RESULTS
+)
+from api_server import (
+    ModelReloader, plan_recommendation, serve_plan, present_recommendations, parse_fields,
+    is_paginated, open_cursor, snapshot_ranked, page_from_snapshot,
+    record_activity, models_info, cache_result, BATCH_MAX_REQUESTS, CURSOR_TTL
+)
+from metrics import get_metrics, stage_timer, record_recommendation
+from response_encoding import encode_response, etag_content, negotiate_format, pack_msgpack, MSGPACK_MIMETYPE
+from profiler import profiling_enabled, authorized, sample_stacks, ProfilerBusy, PROFILER_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Threads scoring requests concurrently (numpy/scikit-learn release the GIL)
+ASGI_SCORING_WORKERS = int(os.getenv('ASGI_SCORING_WORKERS', os.cpu_count() or 4))
+# Scoring calls allowed to wait for a thread; beyond that requests wait for a slot
+ASGI_SCORING_QUEUE = int(os.getenv('ASGI_SCORING_QUEUE', 64))
+# Seconds a request may wait for a scoring slot before getting a 503
+ASGI_SCORING_WAIT_SECONDS = float(os.getenv('ASGI_SCORING_WAIT_SECONDS', 5))
+# Largest request body accepted
+ASGI_MAX_BODY_BYTES = int(os.getenv('ASGI_MAX_BODY_BYTES', 1024 * 1024))
+
+
+class ScoringBusy(Exception):
+    """Raised when no scoring slot frees up in time"""
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(obj):
+    """Match Flask's JSON output for values jsonify() accepts"""
+    if isinstance(obj, date):
+        return http_date(obj)
+    if hasattr(obj, 'item'):
+        return obj.item()
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class Request:
+    """The parts of an HTTP request the routes use"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        self.args = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+        self.body = body
+
+    def arg(self, name, default=None):
+        values = self.args.get(name)
+        return values[0] if values else default
+
+    def args_dict(self):
+        """First value of every query parameter, like request.args.to_dict()"""
+        return {name: values[0] for name, values in self.args.items()}
+
+    @property
+    def json(self):
+        """Parsed JSON body, or None for a missing or non-JSON body"""
+        if 'json' not in self.headers.get('content-type', '') or not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Invalid JSON body")
+
+
+class AsyncRecommendationApp:
+    """
+    ASGI application exposing the Flask app's routes
+
+    Attributes mirror the Flask app (recommendation_service, cache_manager,
+    model_reloader), so ModelReloader swaps models for both servers alike.
+    """
+
+    def __init__(self, recommendation_service=None, cache_manager=None, reload_interval=None):
+        self.recommendation_service = recommendation_service or get_recommendation_service()
+        self.cache_manager = cache_manager or get_cache_manager()
+        self.cache_manager.model_version = self.recommendation_service.model_version
+        self.async_cache = AsyncCacheManager(self.cache_manager)
+        self.model_reloader = ModelReloader(self, reload_interval)
+        self.scoring_pool = ThreadPoolExecutor(
+            max_workers=ASGI_SCORING_WORKERS, thread_name_prefix='scoring'
+        )
+        self._scoring_slots = asyncio.Semaphore(ASGI_SCORING_WORKERS + ASGI_SCORING_QUEUE)
+
+        allowed = os.getenv('ML_API_ALLOWED_ORIGINS')
+        self.allowed_origins = (
+            {o.strip() for o in allowed.split(',') if o.strip()} if allowed else None
+        )
+
+        self.routes = []
+        self.route('/health', ['GET'], self.health_check)
+        self.route('/api/recommendations', ['GET', 'POST'], self.get_recommendations)
+        self.route('/api/recommendations/similar/<article_id>', ['GET'], self.get_recommendations)
+        self.route('/api/recommendations/personalized/<user_id>', ['GET', 'POST'], self.get_recommendations)
+        self.route('/api/recommendations/batch', ['POST'], self.get_recommendations_batch)
+        self.route('/api/track', ['POST'], self.track_activity)
+        self.route('/api/recommendations/trending', ['GET'], self.get_trending)
+        self.route('/api/cache/clear', ['POST'], self.clear_cache)
+        self.route('/api/cache/stats', ['GET'], self.get_cache_stats)
+        self.route('/api/models/info', ['GET'], self.get_models_info)
+        self.route('/metrics', ['GET'], self.get_metrics_text)
+        self.route('/api/debug/profile', ['GET'], self.profile_worker)
+
+    def route(self, rule, methods, handler):
+        """Register a handler; <name> segments are passed as keyword arguments"""
+        pattern = re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', rule)
+        self.routes.append((re.compile(pattern), set(methods), handler, rule))
+
+    async def score(self, func, *args):
+        """
+        Run CPU-bound scoring in the pool without blocking the event loop
+
+        Raises:
+            ScoringBusy if no slot frees up within ASGI_SCORING_WAIT_SECONDS
+        """
+        try:
+            await asyncio.wait_for(self._scoring_slots.acquire(), ASGI_SCORING_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            raise ScoringBusy("Recommendation service is busy, try again shortly")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.scoring_pool, func, *args)
+        finally:
+            self._scoring_slots.release()
+
+    async def run_blocking(self, func, *args):
+        """Run blocking I/O (files, admin cache calls) on the default executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    # ASGI plumbing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.async_cache.connect()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.async_cache.close()
+                self.scoring_pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body += message.get('body', b'')
+            if len(body) > ASGI_MAX_BODY_BYTES:
+                raise HTTPError(413, "Request body too large")
+            if not message.get('more_body'):
+                return body
+
+    async def _http(self, scope, receive, send):
+        started = time.perf_counter()
+        headers = []
+        request = None
+        try:
+            body = await self._read_body(receive)
+            if body is None:
+                return
+            request = Request(scope, body)
+            headers = self._cors_headers(request)
+            if request.method == 'OPTIONS' and 'access-control-request-method' in request.headers:
+                await self._send(send, 200, None, headers)
+                return
+
+            # Servers without lifespan support (and tests) connect on first use
+            self.async_cache.connect()
+            self.model_reloader.maybe_reload()
+            status, payload = await self._dispatch(request)
+        except HTTPError as e:
+            status, payload = e.status, {"success": False, "error": str(e)}
+        except ScoringBusy as e:
+            status, payload = 503, {"success": False, "error": str(e)}
+            headers.append((b'retry-after', b'1'))
+        status = await self._send(send, status, payload, headers, request)
+        route = getattr(request, 'route', 'unmatched')
+
+        # Request counts and latency for /metrics
+        metrics = get_metrics()
+        metrics.inc('newsxpress_http_requests_total', {
+            'route': route, 'http_method': scope['method'], 'status': status
+        })
+        metrics.observe(
+            'newsxpress_http_request_duration_seconds', time.perf_counter() - started, {'route': route}
+        )
+
+    async def _dispatch(self, request):
+        allowed = set()
+        for pattern, methods, handler, rule in self.routes:
+            match = pattern.fullmatch(request.path)
+            if match is None:
+                continue
+            if request.method not in methods:
+                allowed |= methods
+                continue
+            request.route = rule
+            try:
+                result = await handler(request, **match.groupdict())
+            except (HTTPError, ScoringBusy):
+                raise
+            except Exception as e:
+                logger.error(f"Error in {handler.__name__}: {e}")
+                return 500, {"success": False, "error": str(e)}
+            return result if isinstance(result, tuple) else (200, result)
+        if allowed:
+            raise HTTPError(405, "Method not allowed")
+        raise HTTPError(404, "Not found")
+
+    def _cors_headers(self, request):
+        origin = request.headers.get('origin')
+        if origin is None:
+            return []
+        if self.allowed_origins is None:
+            headers = [(b'access-control-allow-origin', b'*')]
+        elif origin in self.allowed_origins:
+            headers = [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+        else:
+            return []
+        if request.method == 'OPTIONS':
+            requested = request.headers.get('access-control-request-headers', '')
+            headers.append((b'access-control-allow-methods', b'GET, POST, OPTIONS'))
+            if requested:
+                headers.append((b'access-control-allow-headers', requested.encode('latin-1')))
+        return headers
+
+    async def _send(self, send, status, payload, headers, request=None):
+        """
+        Send a JSON payload, or a str as plain text. Recommendation routes
+        record the serialization stage and honour Accept: application/msgpack,
+        and those that set request.etag_parts get an ETag/304 and compression.
+
+        Returns:
+            The status actually sent
+        """
+        body = b''
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            headers = headers + [(b'content-type', b'text/plain; version=0.0.4; charset=utf-8')]
+        elif payload is not None:
+            recommendation_route = getattr(request, 'route', '').startswith('/api/recommendations')
+            with stage_timer('serialization') if recommendation_route else contextlib.nullcontext():
+                if recommendation_route and negotiate_format(request.headers.get('accept')) == 'msgpack':
+                    body = pack_msgpack(payload)
+                    content_type = MSGPACK_MIMETYPE.encode('ascii')
+                else:
+                    body = (json.dumps(payload, default=_json_default, separators=(',', ':')) + '\n').encode('utf-8')
+                    content_type = b'application/json'
+            headers = headers + [(b'content-type', content_type)]
+            if recommendation_route:
+                headers.append((b'vary', b'Accept'))
+        etag_parts = getattr(request, 'etag_parts', None)
+        if status == 200 and etag_parts is not None:
+            if isinstance(payload, dict):
+                etag_parts = (*etag_parts, etag_content(payload, content_type.decode('ascii')))
+            status, body, extra = encode_response(
+                body, etag_parts, request.headers.get('if-none-match'), request.headers.get('accept-encoding')
+            )
+            headers = headers + [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in extra.items()
+            ]
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers + [(b'content-length', str(len(body)).encode('ascii'))],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+        return status
+
+    # Routes
+
+    async def health_check(self, request):
+        """Health check endpoint"""
+        return {
+            "status": "healthy",
+            "service": "NewsXpress ML Recommendation API",
+            "models_loaded": self.recommendation_service.models_loaded,
+            "cache_enabled": self.cache_manager.enabled
+        }
+
+    async def _rank(self, plan):
+        """Ranked list for a plan: cached, or scored in the pool"""
+        compute = lambda: self.score(plan['compute'])
+        if plan['cache_key'] is None:
+            return await compute(), False
+        return await self.async_cache.get_or_compute(
+            plan['cache_key'], compute, ttl_seconds=plan['ttl'], tags=plan['tags']
+        )
+
+    async def _serve_page(self, params):
+        """Async twin of api_server.serve_page()"""
+        try:
+            state, plan, snapshot_key = open_cursor(self.recommendation_service, params)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        snapshot = await self.async_cache.get(snapshot_key) if params.get('cursor') else None
+        from_cache = snapshot is not None
+        if snapshot is None:
+            ranked, from_cache = await self._rank(plan)
+            snapshot = snapshot_ranked(plan, ranked)
+            await self.async_cache.set(snapshot_key, snapshot, ttl_seconds=CURSOR_TTL, tags=plan['tags'])
+        recommendations, next_cursor = await self.score(
+            page_from_snapshot, self.recommendation_service, state, plan, snapshot
+        )
+        return plan, recommendations, from_cache, next_cursor
+
+    async def get_recommendations(self, request, **_):
+        """Unified recommendations endpoint - supports all methods"""
+        started = time.perf_counter()
+        try:
+            svc = self.recommendation_service
+
+            # Parse params from GET or POST
+            if request.method == 'POST':
+                params = request.json or {}
+            else:
+                params = request.args_dict()
+                params['exclude'] = request.args.get('exclude', [])
+
+            payload = {"success": True}
+            if is_paginated(params):
+                plan, recommendations, from_cache, payload["next_cursor"] = await self._serve_page(params)
+            else:
+                plan = plan_recommendation(svc, params)
+                ranked, from_cache = await self._rank(plan)
+                recommendations = await self.score(serve_plan, svc, plan, ranked)
+            if from_cache:
+                logger.info(f"Cache hit: {plan['cache_key']}")
+            request.etag_parts = (svc.model_version, plan['cache_key'])
+            record_recommendation(
+                plan['method'], cache_result(plan['cache_key'], from_cache), time.perf_counter() - started
+            )
+
+            return {
+                **payload,
+                "recommendations": recommendations,
+                "method": plan['method'],
+                "from_cache": from_cache
+            }
+
+        except (HTTPError, ScoringBusy):
+            raise
+        except Exception as e:
+            logger.error(f"Error in get_recommendations: {e}")
+            return 500, {
+                "success": False,
+                "error": str(e),
+                "message": "Failed to fetch recommendations"
+            }
+
+    async def get_recommendations_batch(self, request):
+        """
+        Serve several recommendation requests with one cache round trip
+        Body: {"requests": [{...same params as /api/recommendations...}, ...]}
+        """
+        svc = self.recommendation_service
+
+        batch = (request.json or {}).get('requests')
+        if not isinstance(batch, list) or not batch:
+            return 400, {
+                "success": False,
+                "error": "Provide a non-empty 'requests' list"
+            }
+        if len(batch) > BATCH_MAX_REQUESTS:
+            return 400, {
+                "success": False,
+                "error": f"At most {BATCH_MAX_REQUESTS} requests per batch"
+            }
+
+        plans = [plan_recommendation(svc, params or {}) for params in batch]
+        cached = await self.async_cache.get_or_compute_many([
+            (plan['cache_key'], lambda plan=plan: self.score(plan['compute']), plan['ttl'], plan['tags'])
+            for plan in plans if plan['cache_key'] is not None
+        ])
+        uncached = await asyncio.gather(*(
+            self.score(plan['compute']) for plan in plans if plan['cache_key'] is None
+        ))
+        cached, uncached = iter(cached), iter(uncached)
+
+        ranked_lists = []
+        for plan in plans:
+            if plan['cache_key'] is None:
+                ranked_lists.append((next(uncached), False))
+            else:
+                ranked_lists.append(next(cached))
+        # Hydration is CPU work too (the first call indexes all article metadata)
+        presented = await self.score(lambda: [
+            serve_plan(svc, plan, ranked) for plan, (ranked, _) in zip(plans, ranked_lists)
+        ])
+
+        results = []
+        for plan, (_, from_cache), recommendations in zip(plans, ranked_lists, presented):
+            record_recommendation(plan['method'], cache_result(plan['cache_key'], from_cache))
+            results.append({
+                "recommendations": recommendations,
+                "method": plan['method'],
+                "from_cache": from_cache
+            })
+
+        return {
+            "success": True,
+            "results": results
+        }
+
+    async def track_activity(self, request):
+        data = request.json
+
+        if not data:
+            return 400, {
+                "success": False,
+                "error": "No data provided"
+            }
+
+        # Validate required fields
+        if 'article_id' not in data or 'activity_type' not in data:
+            return 400, {
+                "success": False,
+                "error": "Missing required fields: article_id, activity_type"
+            }
+
+        # Only queues the event; the writer thread does the file I/O
+        if not record_activity(data):
+            return 503, {
+                "success": False,
+                "error": "Activity tracking is overloaded, try again shortly"
+            }
+        return {
+            "success": True,
+            "message": "Activity tracked successfully"
+        }
+
+    async def get_trending(self, request):
+        """
+        Get trending articles
+        Query params: top_n (default: 10), days (default: 7), fields (default: all)
+        """
+        started = time.perf_counter()
+        svc = self.recommendation_service
+
+        top_n = int(request.arg('top_n', 10))
+        days = int(request.arg('days', 7))
+        fields = parse_fields(request.arg('fields'))
+
+        # One deep list per window serves every top_n up to the depth
+        depth = max(top_n, RANKED_LIST_DEPTH)
+        def compute():
+            trending = svc.get_trending_articles(top_n=depth, time_window_days=days)
+            return svc.compact_recommendations(trending) if CACHE_COMPACT_RESULTS else trending
+
+        cache_key = None
+        if top_n > RANKED_LIST_DEPTH:
+            recommendations, from_cache = await self.score(compute), False
+        else:
+            cache_key = trending_cache_key(svc.model_version, days=days)
+            recommendations, from_cache = await self.async_cache.get_or_compute(
+                cache_key, lambda: self.score(compute), ttl_seconds=TRENDING_CACHE_TTL
+            )
+        recommendations = await self.score(
+            present_recommendations, svc, select_recommendations(recommendations, top_n), fields, 'trending'
+        )
+        request.etag_parts = (svc.model_version, cache_key or f"trending:days={days}:top_n={top_n}")
+        record_recommendation('trending', cache_result(cache_key, from_cache), time.perf_counter() - started)
+
+        return {
+            "success": True,
+            "recommendations": recommendations,
+            "from_cache": from_cache
+        }
+
+    async def clear_cache(self, request):
+        """Clear cache for specific user or article"""
+        data = request.json or {}
+        user_id = data.get('user_id')
+        article_id = data.get('article_id')
+
+        if user_id:
+            await self.run_blocking(self.cache_manager.clear_user_cache, user_id)
+            return {
+                "success": True,
+                "message": f"Cache cleared for user {user_id}"
+            }
+
+        if article_id:
+            await self.run_blocking(self.cache_manager.clear_article_cache, article_id)
+            return {
+                "success": True,
+                "message": f"Cache cleared for article {article_id}"
+            }
+
+        return 400, {
+            "success": False,
+            "error": "Please provide user_id or article_id"
+        }
+
+    async def get_cache_stats(self, request):
+        """Get cache statistics"""
+        stats = await self.run_blocking(self.cache_manager.get_cache_stats)
+        return {
+            "success": True,
+            "stats": stats
+        }
+
+    async def get_models_info(self, request):
+        """Get information about loaded models"""
+        info = await self.run_blocking(models_info, self.recommendation_service)
+        return {
+            "success": True,
+            "info": info
+        }
+
+    async def profile_worker(self, request):
+        """
+        Sample this worker's stacks (event loop and scoring threads) and
+        return them collapsed. Per-request X-Profile is Flask-only: on the
+        event loop cProfile would also time every interleaved request.
+        """
+        if not profiling_enabled():
+            raise HTTPError(404, "Not found")
+        if not authorized(request.headers.get('x-admin-token')):
+            return 403, {
+                "success": False,
+                "error": "Admin token required"
+            }
+
+        try:
+            seconds = float(request.arg('seconds', 5))
+            interval_ms = request.arg('interval_ms')
+            interval = float(interval_ms) / 1000 if interval_ms else None
+        except ValueError:
+            raise HTTPError(400, "seconds and interval_ms must be numbers")
+        if not 0 < seconds <= PROFILER_MAX_SECONDS:
+            raise HTTPError(400, f"seconds must be between 0 and {PROFILER_MAX_SECONDS:g}")
+
+        try:
+            return await self.run_blocking(sample_stacks, seconds, interval)
+        except ProfilerBusy as e:
+            return 409, {
+                "success": False,
+                "error": str(e)
+            }
+
+    async def get_metrics_text(self, request):
+        """Prometheus text exposition of request, cache and stage metrics for all workers"""
+        return await self.run_blocking(get_metrics().render)
+
+
+app = AsyncRecommendationApp()
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("Install an ASGI server to run this app: pip install uvicorn")
+
+    port = int(os.environ.get('PORT', os.getenv('ML_API_PORT', 5001)))
+    logger.info(f"Starting async ML Recommendation API on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
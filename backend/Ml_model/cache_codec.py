@@ -0,0 +1,142 @@
+"""
+Cache Value Codecs for NewsXpress
+Compact, version-tagged binary encoding of cached values with optional
+compression above a size threshold
+"""
+import os
+import json
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional: pip install lz4
+    lz4_frame = None
+
+# Frame layout: MAGIC | format version | serializer id | compression id | payload
+MAGIC = b'\xc1NX'
+FORMAT_VERSION = 1
+
+SERIALIZERS = {'json': b'j', 'msgpack': b'm'}
+COMPRESSIONS = {'none': b'-', 'zlib': b'z', 'lz4': b'4'}
+
+CACHE_SERIALIZER = os.getenv('CACHE_SERIALIZER', 'json').lower()
+CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'zlib').lower()
+# Payloads smaller than this are stored uncompressed
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv('CACHE_COMPRESS_MIN_BYTES', 1024))
+
+
+class CodecError(Exception):
+    """Raised when a cached payload cannot be decoded"""
+
+
+def _to_builtin(obj):
+    """Fallback for numpy scalars and timestamps inside cached values"""
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+
+class CacheCodec:
+    """
+    Encodes values for Redis and decodes anything written by any codec
+    version, so readers can be rolled out before writers switch format.
+    Plain JSON written before framing existed is still readable.
+    """
+
+    def __init__(self, serializer=None, compression=None, compress_min_bytes=None):
+        serializer = (serializer or CACHE_SERIALIZER).lower()
+        compression = (compression or CACHE_COMPRESSION).lower()
+
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if serializer == 'msgpack' and msgpack is None:
+            logger.warning("msgpack is not installed; caching with compact JSON")
+            serializer = 'json'
+        if compression == 'lz4' and lz4_frame is None:
+            logger.warning("lz4 is not installed; compressing cache values with zlib")
+            compression = 'zlib'
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_min_bytes = (
+            CACHE_COMPRESS_MIN_BYTES if compress_min_bytes is None else compress_min_bytes
+        )
+
+    def encode(self, value):
+        """Serialize (and maybe compress) a value into a framed bytes payload"""
+        if self.serializer == 'msgpack':
+            payload = msgpack.packb(value, default=_to_builtin, use_bin_type=True)
+        else:
+            payload = json.dumps(value, separators=(',', ':'), default=_to_builtin).encode('utf-8')
+
+        compression = 'none'
+        if self.compression != 'none' and len(payload) >= self.compress_min_bytes:
+            compression = self.compression
+            if compression == 'lz4':
+                payload = lz4_frame.compress(payload)
+            else:
+                payload = zlib.compress(payload, 6)
+
+        header = MAGIC + bytes([FORMAT_VERSION]) + SERIALIZERS[self.serializer] + COMPRESSIONS[compression]
+        return header + payload
+
+    def decode(self, data):
+        """
+        Decode a payload produced by encode() or a legacy plain JSON string
+
+        Raises:
+            CodecError for unknown versions/codecs or corrupt payloads
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not data.startswith(MAGIC):
+            try:
+                return json.loads(data)
+            except ValueError as e:
+                raise CodecError(f"Unreadable legacy cache value: {e}")
+
+        header_size = len(MAGIC) + 3
+        if len(data) < header_size:
+            raise CodecError("Truncated cache value")
+        version = data[len(MAGIC)]
+        serializer = data[len(MAGIC) + 1:len(MAGIC) + 2]
+        compression = data[len(MAGIC) + 2:header_size]
+        payload = data[header_size:]
+
+        if version != FORMAT_VERSION:
+            raise CodecError(f"Unsupported cache format version {version}")
+
+        try:
+            if compression == COMPRESSIONS['zlib']:
+                payload = zlib.decompress(payload)
+            elif compression == COMPRESSIONS['lz4']:
+                if lz4_frame is None:
+                    raise CodecError("lz4 is not installed")
+                payload = lz4_frame.decompress(payload)
+            elif compression != COMPRESSIONS['none']:
+                raise CodecError(f"Unknown compression id {compression!r}")
+
+            if serializer == SERIALIZERS['msgpack']:
+                if msgpack is None:
+                    raise CodecError("msgpack is not installed")
+                return msgpack.unpackb(payload, raw=False)
+            if serializer == SERIALIZERS['json']:
+                return json.loads(payload)
+        except CodecError:
+            raise
+        except Exception as e:
+            raise CodecError(f"Corrupt cache value: {e}")
+
+        raise CodecError(f"Unknown serializer id {serializer!r}")
@@ -3,134 +3,1245 @@ Redis Cache Manager for Recommendations
 Caches recommendation results to reduce computation time
 """
 import os
+import sys
 import json
+import hashlib
+import time
+import uuid
+import random
 import redis
+import redis.asyncio
+import asyncio
 import logging
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from fnmatch import fnmatchcase
 from functools import wraps
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from cache_codec import CacheCodec, CodecError
+from cache_metrics import CacheMetrics, summarize
 
 logger = logging.getLogger(__name__)
 
-class CacheManager:
+# Connection pool per process. Size it for gunicorn --threads plus the
+# invalidation listener and refresh workers; threads wait up to
+# REDIS_POOL_TIMEOUT seconds for a free connection instead of failing
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 32))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 2))
+
+# Per-operation socket timeouts: a slow Redis should cost milliseconds, not seconds
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.25))
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.5))
+
+# Circuit breaker: stop calling Redis after this many consecutive failures,
+# then let one probe through every CACHE_BREAKER_RESET_SECONDS
+CACHE_BREAKER_FAILURES = int(os.getenv('CACHE_BREAKER_FAILURES', 5))
+CACHE_BREAKER_RESET_SECONDS = float(os.getenv('CACHE_BREAKER_RESET_SECONDS', 10))
+
+# Background reconnection when Redis is unreachable at startup (max backoff 60s)
+CACHE_RECONNECT_SECONDS = float(os.getenv('CACHE_RECONNECT_SECONDS', 5))
+
+# In-process (L1) cache settings; CACHE_L1_TTL=0 disables the L1 tier
+CACHE_L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 1024))
+CACHE_L1_TTL = int(os.getenv('CACHE_L1_TTL', 30))
+
+# Redis pub/sub channel used to invalidate L1 entries in every worker
+INVALIDATION_CHANNEL = 'cache:invalidate'
+
+# Keys per SCAN page and per UNLINK command when invalidating
+CACHE_SCAN_COUNT = int(os.getenv('CACHE_SCAN_COUNT', 500))
+
+# Tag sets (tags:<tag> -> cached keys) let invalidation skip scanning.
+# They are sorted sets scored by each key's expiry, so members that expired
+# on their own are trimmed on every write and a busy tag stays bounded.
+# (Plain sets under the old tag: prefix are no longer read and just expire.)
+TAG_KEY_PREFIX = 'tags:'
+CACHE_TAG_TTL = int(os.getenv('CACHE_TAG_TTL', 86400))
+
+# Single-flight: cross-process lock lifetime, and how long/how often
+# other workers poll for the value while the lock holder computes it
+LOCK_KEY_PREFIX = 'lock:'
+CACHE_LOCK_TTL_MS = int(os.getenv('CACHE_LOCK_TTL_MS', 10000))
+CACHE_LOCK_WAIT_MS = int(os.getenv('CACHE_LOCK_WAIT_MS', 3000))
+CACHE_LOCK_POLL_MS = int(os.getenv('CACHE_LOCK_POLL_MS', 50))
+
+# Stale-while-revalidate: entries written by get_or_compute() stay
+# servable for CACHE_STALE_TTL seconds past their soft TTL while a background
+# worker recomputes them (0 disables); TTLs get up to CACHE_TTL_JITTER extra
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', 300))
+CACHE_TTL_JITTER = float(os.getenv('CACHE_TTL_JITTER', 0.1))
+CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 4))
+SOFT_EXPIRY_FIELD = '__soft_expires_at__'
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Cache recommendations as id+score lists, hydrated from in-process metadata
+CACHE_COMPACT_RESULTS = os.getenv('CACHE_COMPACT_RESULTS', 'true').lower() == 'true'
+
+# Ranked lists are cached this deep and unfiltered, so one entry serves
+# every exclude/top_n variant; deeper requests bypass the cache
+RANKED_LIST_DEPTH = int(os.getenv('CACHE_RANKED_DEPTH', 100))
+
+# Recommendation result TTLs (seconds)
+PERSONALIZED_CACHE_TTL = 900
+RECOMMENDATION_CACHE_TTL = 1800
+TRENDING_CACHE_TTL = 300
+
+
+def model_namespace(model_version):
+    """Key segment for results computed with a given model version"""
+    return f"v={model_version or 'unversioned'}"
+
+
+def recommendation_cache_key(method, model_version, user_id=None, article_id=None, context=None):
+    """
+    Cache key for a ranked candidate list (RANKED_LIST_DEPTH deep, unfiltered)
+    
+    Args:
+        context: Other inputs the ranking depends on (e.g. recent articles
+                 for hybrid), hashed into the key
+    """
+    key = f"rec:{model_namespace(model_version)}:{method}:u={user_id}:a={article_id}:d={RANKED_LIST_DEPTH}"
+    if context:
+        key += ":c=" + hashlib.sha1(str(context).encode('utf-8')).hexdigest()[:12]
+    return key
+
+
+def trending_cache_key(model_version, days=7):
+    """Cache key for the ranked trending list behind /api/recommendations/trending"""
+    return f"rec:{model_namespace(model_version)}:trending:days={days}:d={RANKED_LIST_DEPTH}"
+
+
+def select_recommendations(ranked, top_n, exclude_ids=None):
+    """Apply exclude and top_n to a cached ranked list"""
+    if exclude_ids:
+        excluded = set(exclude_ids)
+        ranked = [rec for rec in ranked if rec.get('id') not in excluded]
+    return ranked[:top_n]
+
+
+class LocalCache:
+    """
+    Thread-safe in-process cache with LRU eviction and per-entry TTL
+    Values are stored as-is, so callers must not mutate returned objects
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=30):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key):
+        """Return (hit, value)"""
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl_seconds=None):
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_pattern(self, pattern):
+        """Delete keys matching a Redis-style glob pattern"""
+        with self._lock:
+            for key in [k for k in self._entries if fnmatchcase(k, pattern)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. Open: calls fail fast without touching Redis.
+    Half-open: after reset_timeout one probe call is let through; its
+    outcome closes or re-opens the circuit.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=10):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a Redis call may be attempted now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # Open, or a half-open probe that never reported back
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("✅ Redis reachable again, cache circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(
+                        f"⚠️  Cache circuit opened after {self.failures} Redis failures; "
+                        f"serving uncached for {self.reset_timeout}s"
+                    )
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+# Errors that mean Redis is unreachable or too slow (vs. a bad command)
+REDIS_AVAILABILITY_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError)
+
+
+class _Flight:
+    """A computation in progress that other callers in this process wait on"""
+
     def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.from_cache = False
+        self.failed = False
+
+
+def redis_pool_options():
+    """Connection pool settings shared by the sync and asyncio clients"""
+    return {
+        'host': os.getenv('REDIS_HOST', 'localhost'),
+        'port': int(os.getenv('REDIS_PORT', 6379)),
+        'password': os.getenv('REDIS_PASSWORD', None),
+        'db': int(os.getenv('REDIS_DB', 0)),
+        # Values are binary codec frames; keys are decoded where needed
+        'decode_responses': False,
+        'socket_timeout': REDIS_SOCKET_TIMEOUT,
+        'socket_connect_timeout': REDIS_CONNECT_TIMEOUT,
+        'socket_keepalive': True,
+        'health_check_interval': 30,
+        'max_connections': REDIS_MAX_CONNECTIONS,
+        'timeout': REDIS_POOL_TIMEOUT,
+    }
+
+
+# Live managers, so forked workers can restart their invalidation listener
+_managers = weakref.WeakSet()
+
+
+def _restart_listeners_after_fork():
+    for manager in list(_managers):
+        manager._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
+
+class CacheManager:
+    def __init__(self, connect=True):
+        """
+        Args:
+            connect: False for a manager that never talks to Redis, so every
+                     lookup misses and values are computed (e.g. replays)
+        """
         self.redis_client = None
         self.enabled = False
-        self.connect()
+        self.local_cache = LocalCache(CACHE_L1_MAX_ENTRIES, CACHE_L1_TTL)
+        self.codec = CacheCodec()
+        self.metrics = CacheMetrics()
+        self.breaker = CircuitBreaker(CACHE_BREAKER_FAILURES, CACHE_BREAKER_RESET_SECONDS)
+        self._reconnector = None
+        # Model version that keys built by @cached are namespaced with
+        self.model_version = None
+        self._origin = uuid.uuid4().hex
+        self._listener = None
+        self._listener_stop = threading.Event()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_pool = None
+        _managers.add(self)
+        if connect:
+            self.connect()
     
     def connect(self):
-        """Connect to Redis server"""
+        """Connect to Redis server, retrying in the background if it is down"""
+        if not self._connect_once():
+            self._start_reconnect()
+    
+    def _connect_once(self, log_failure=True):
         try:
-            redis_host = os.getenv('REDIS_HOST', 'localhost')
-            redis_port = int(os.getenv('REDIS_PORT', 6379))
-            redis_password = os.getenv('REDIS_PASSWORD', None)
-            redis_db = int(os.getenv('REDIS_DB', 0))
-            
-            self.redis_client = redis.Redis(
-                host=redis_host,
-                port=redis_port,
-                password=redis_password,
-                db=redis_db,
-                decode_responses=True,
-                socket_timeout=5,
-                socket_connect_timeout=5
-            )
+            options = redis_pool_options()
+            pool = redis.BlockingConnectionPool(**options)
+            client = redis.Redis(connection_pool=pool)
             
             # Test connection
-            self.redis_client.ping()
+            client.ping()
+            self.redis_client = client
             self.enabled = True
-            logger.info(f"✅ Connected to Redis at {redis_host}:{redis_port}")
+            self.breaker.record_success()
+            logger.info(f"✅ Connected to Redis at {options['host']}:{options['port']}")
+            self.start_invalidation_listener()
+            return True
             
         except Exception as e:
-            logger.warning(f"⚠️  Redis connection failed: {e}. Caching disabled.")
+            if log_failure:
+                logger.warning(f"⚠️  Redis connection failed: {e}. Caching disabled.")
             self.enabled = False
+            return False
+    
+    def _start_reconnect(self):
+        if self._reconnector and self._reconnector.is_alive():
+            return
+        self._reconnector = threading.Thread(
+            target=self._reconnect_loop, name='cache-reconnect', daemon=True
+        )
+        self._reconnector.start()
+    
+    def _reconnect_loop(self):
+        """Retry with exponential backoff until Redis is reachable"""
+        delay = CACHE_RECONNECT_SECONDS
+        while not self._listener_stop.wait(delay):
+            if self.enabled or self._connect_once(log_failure=False):
+                return
+            delay = min(delay * 2, 60)
+    
+    def _available(self):
+        """Caching is configured and the circuit lets calls through"""
+        return self.enabled and self.breaker.allow()
+    
+    def _call(self, func, *args, **kwargs):
+        """Run one Redis call, feeding its outcome to the circuit breaker"""
+        try:
+            result = func(*args, **kwargs)
+        except REDIS_AVAILABILITY_ERRORS:
+            self.breaker.record_failure()
+            raise
+        except redis.exceptions.RedisError:
+            # Redis answered (e.g. a bad command) - it is up
+            self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
     
+    def start_invalidation_listener(self):
+        """Subscribe to L1 invalidations published by other workers"""
+        if not self.local_cache.enabled or (self._listener and self._listener.is_alive()):
+            return
+        self._listener_stop.clear()
+        self._listener = threading.Thread(
+            target=self._listen_for_invalidations,
+            name='cache-invalidation-listener',
+            daemon=True
+        )
+        self._listener.start()
+
+    def stop_invalidation_listener(self):
+        self._listener_stop.set()
+
+    def _after_fork(self):
+        """Threads do not survive fork: start a fresh listener in the child"""
+        self._origin = uuid.uuid4().hex
+        self._listener = None
+        self._listener_stop = threading.Event()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_pool = None
+        self._reconnector = None
+        self.local_cache.clear()
+        self.metrics.reset()
+        if self.enabled:
+            self.start_invalidation_listener()
+        else:
+            self._start_reconnect()
+
+    def _listen_for_invalidations(self):
+        while not self._listener_stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                while not self._listener_stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if not isinstance(message, dict):
+                        raise TypeError(f"Unexpected pub/sub message: {message!r}")
+                    self._handle_invalidation(message.get('data'))
+            except Exception as e:
+                # Invalidations may have been missed while disconnected
+                logger.warning(f"Cache invalidation listener error: {e}")
+                self.local_cache.clear()
+                self._listener_stop.wait(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _handle_invalidation(self, data):
+        """Apply an invalidation message from another worker to the L1 cache"""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get('origin') == self._origin:
+            return
+
+        if 'key' in message:
+            self.local_cache.delete(message['key'])
+        elif 'keys' in message:
+            for key in message['keys']:
+                self.local_cache.delete(key)
+        elif 'pattern' in message:
+            self.local_cache.delete_pattern(message['pattern'])
+
+    def _publish_invalidation(self, **message):
+        try:
+            message['origin'] = self._origin
+            if self._available():
+                self._call(self.redis_client.publish, INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error: {e}")
+
     def get(self, key):
-        """Get value from cache"""
+        """Get value from cache (in-process L1 first, then Redis)"""
+        _, value, _ = self._get_entry(key)
+        return value
+    
+    def _get_entry(self, key):
+        """
+        Returns:
+            (hit, value, soft_expires_at); soft_expires_at is None for plain
+            entries and for L1 hits, which never outlive the soft TTL
+        """
         if not self.enabled:
-            return None
+            return False, None, None
+        
+        started = time.perf_counter()
+        hit, value = self.local_cache.get(key)
+        if hit:
+            self.metrics.record_get(key, True, time.perf_counter() - started)
+            return True, value, None
+        if not self.breaker.allow():
+            self.metrics.record_get(key, False, time.perf_counter() - started)
+            return False, None, None
         
         try:
-            value = self.redis_client.get(key)
-            if value:
-                return json.loads(value)
-            return None
+            raw = self._call(self.redis_client.get, key)
+            entry = self._decode_entry(key, raw)
+            self.metrics.record_get(key, entry[0], time.perf_counter() - started, len(raw or b''))
+            return entry
         except Exception as e:
             logger.error(f"Cache GET error: {e}")
-            return None
+            self.metrics.record_error(key)
+            self.metrics.record_get(key, False, time.perf_counter() - started)
+            return False, None, None
     
-    def set(self, key, value, ttl_seconds=3600):
-        """Set value in cache with TTL"""
+    def _decode_entry(self, key, raw):
+        """Decode a raw Redis value into (hit, value, soft_expires_at), filling L1"""
+        if not raw:
+            return False, None, None
+        try:
+            result = self.codec.decode(raw)
+        except CodecError as e:
+            logger.warning(f"Ignoring undecodable cache value for {key}: {e}")
+            return False, None, None
+        
+        if isinstance(result, dict) and SOFT_EXPIRY_FIELD in result:
+            soft_expires_at = result[SOFT_EXPIRY_FIELD]
+            result = result['value']
+            fresh_for = soft_expires_at - time.time()
+            if fresh_for > 0:
+                self.local_cache.set(key, result, fresh_for)
+            return True, result, soft_expires_at
+        
+        self.local_cache.set(key, result)
+        return True, result, None
+    
+    def get_many(self, keys):
+        """
+        Get several keys: L1 first, then one MGET for the rest
+        
+        Returns:
+            {key: value} for the keys that were found
+        """
+        return {key: value for key, (value, _) in self._get_entries_many(keys).items()}
+    
+    def _get_entries_many(self, keys):
+        """{key: (value, soft_expires_at)} for found keys"""
         if not self.enabled:
+            return {}
+        
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            hit, value = self.local_cache.get(key)
+            if hit:
+                found[key] = (value, None)
+                self.metrics.record_get(key, True)
+            else:
+                missing.append(key)
+        if not missing or not self.breaker.allow():
+            for key in missing:
+                self.metrics.record_get(key, False)
+            return found
+        
+        started = time.perf_counter()
+        try:
+            for key, raw in zip(missing, self._call(self.redis_client.mget, missing)):
+                hit, value, soft_expires_at = self._decode_entry(key, raw)
+                if hit:
+                    found[key] = (value, soft_expires_at)
+                self.metrics.record_get(key, hit, nbytes=len(raw or b''))
+        except Exception as e:
+            logger.error(f"Cache MGET error: {e}")
+            for key in missing:
+                if key not in found:
+                    self.metrics.record_error(key)
+                    self.metrics.record_get(key, False)
+        self.metrics.record_latency(missing, 'get_latency_ms', time.perf_counter() - started)
+        return found
+    
+    def set(self, key, value, ttl_seconds=3600, tags=None, soft_ttl_seconds=None):
+        """
+        Set value in cache with TTL
+        
+        Args:
+            tags: Optional tags (e.g. "user:42") so the key can later be
+                  dropped with invalidate_tags() instead of a pattern scan
+            soft_ttl_seconds: Optional soft expiry (< ttl_seconds); past it
+                  get_or_compute() serves the value but refreshes it
+        """
+        if not self._available():
             return False
         
+        started = time.perf_counter()
         try:
-            serialized = json.dumps(value)
-            self.redis_client.setex(key, ttl_seconds, serialized)
+            serialized, local_ttl = self._encode_entry(value, ttl_seconds, soft_ttl_seconds)
+            if tags:
+                pipe = self.redis_client.pipeline(transaction=False)
+                self._queue_set(pipe, key, serialized, ttl_seconds, tags)
+                self._call(pipe.execute)
+            else:
+                self._call(self.redis_client.setex, key, ttl_seconds, serialized)
+            self.local_cache.set(key, value, local_ttl)
+            self.metrics.record_set(key, time.perf_counter() - started, len(serialized))
             return True
         except Exception as e:
             logger.error(f"Cache SET error: {e}")
+            self.metrics.record_error(key)
+            return False
+    
+    def set_many(self, entries, stale_while_revalidate=False):
+        """
+        Set several values in one pipeline
+        
+        Args:
+            entries: Iterable of (key, value, ttl_seconds, tags) tuples; tags may be None
+            stale_while_revalidate: Treat ttl_seconds as a jittered soft TTL,
+                  as get_or_compute() does
+        """
+        if not self._available():
+            return False
+        
+        started = time.perf_counter()
+        local = []
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value, ttl_seconds, tags in entries:
+                soft_ttl = None
+                if stale_while_revalidate:
+                    ttl_seconds, soft_ttl = self._swr_ttls(ttl_seconds)
+                serialized, local_ttl = self._encode_entry(value, ttl_seconds, soft_ttl)
+                self._queue_set(pipe, key, serialized, ttl_seconds, tags)
+                local.append((key, value, local_ttl, len(serialized)))
+            if not local:
+                return True
+            self._call(pipe.execute)
+            for key, value, local_ttl, nbytes in local:
+                self.local_cache.set(key, value, local_ttl)
+                self.metrics.record_set(key, nbytes=nbytes)
+            self.metrics.record_latency(
+                [key for key, *_ in local], 'set_latency_ms', time.perf_counter() - started
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Cache SET MANY error: {e}")
+            for key, *_ in local:
+                self.metrics.record_error(key)
             return False
     
+    def _encode_entry(self, value, ttl_seconds, soft_ttl_seconds):
+        """Returns (serialized payload, L1 TTL)"""
+        if soft_ttl_seconds is not None:
+            payload = {SOFT_EXPIRY_FIELD: time.time() + soft_ttl_seconds, 'value': value}
+            return self.codec.encode(payload), min(soft_ttl_seconds, ttl_seconds)
+        return self.codec.encode(value), ttl_seconds
+    
+    def _queue_set(self, pipe, key, serialized, ttl_seconds, tags):
+        pipe.setex(key, ttl_seconds, serialized)
+        now = time.time()
+        for tag in tags or ():
+            tag_key = f"{TAG_KEY_PREFIX}{tag}"
+            pipe.zremrangebyscore(tag_key, '-inf', now)
+            pipe.zadd(tag_key, {key: now + ttl_seconds})
+            pipe.expire(tag_key, max(ttl_seconds, CACHE_TAG_TTL))
+    
+    def _swr_ttls(self, ttl_seconds):
+        """(Redis TTL, soft TTL) for a computed value: jittered soft TTL plus the stale window"""
+        soft_ttl = ttl_seconds * (1 + random.uniform(0, CACHE_TTL_JITTER))
+        if CACHE_STALE_TTL > 0:
+            return int(soft_ttl) + CACHE_STALE_TTL, soft_ttl
+        return int(soft_ttl), None
+    
+    def _store(self, key, value, ttl_seconds, tags):
+        """Write a computed value with a jittered soft TTL plus the stale window"""
+        ttl_seconds, soft_ttl = self._swr_ttls(ttl_seconds)
+        return self.set(key, value, ttl_seconds, tags=tags, soft_ttl_seconds=soft_ttl)
+    
+    def get_or_compute(self, key, compute, ttl_seconds=3600, tags=None):
+        """
+        Return the cached value for key, computing and caching it on a miss
+        
+        Concurrent misses are coalesced: within a process one caller runs
+        compute() while the others wait for its result, and across processes
+        a short Redis lock (SET NX PX) lets one worker compute while the rest
+        poll for the value.
+        
+        Values are stale-while-revalidate: past ttl_seconds (plus jitter) the
+        cached value is still returned immediately, for up to CACHE_STALE_TTL
+        more seconds, while a background worker recomputes it.
+        
+        Args:
+            compute: Zero-argument callable producing the value
+            ttl_seconds: Soft TTL (freshness) of the computed value
+            tags: Passed to set()
+        
+        Returns:
+            (value, from_cache)
+        """
+        hit, value, soft_expires_at = self._get_entry(key)
+        if hit and value is not None:
+            if soft_expires_at is not None and soft_expires_at <= time.time():
+                self._refresh_in_background(key, compute, ttl_seconds, tags)
+            return value, True
+        
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+        
+        if not leader:
+            if flight.done.wait(CACHE_LOCK_WAIT_MS / 1000) and not flight.failed:
+                return flight.value, flight.from_cache
+            # Leader failed or is stuck - do not fail with it
+            return compute(), False
+        
+        try:
+            flight.value, flight.from_cache = self._compute_with_lock(key, compute, ttl_seconds, tags)
+            return flight.value, flight.from_cache
+        except Exception:
+            flight.failed = True
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+    
+    def _compute_with_lock(self, key, compute, ttl_seconds, tags):
+        if not self._available():
+            return compute(), False
+        
+        lock_key = f"{LOCK_KEY_PREFIX}{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = self._call(self.redis_client.set, lock_key, token, nx=True, px=CACHE_LOCK_TTL_MS)
+        except Exception as e:
+            logger.error(f"Cache LOCK error: {e}")
+            acquired, token = True, None
+        
+        if not acquired:
+            value = self._wait_for_value(key)
+            if value is not None:
+                return value, True
+            logger.warning(f"Timed out waiting for {key}; computing it here")
+        
+        try:
+            value = compute()
+            self._store(key, value, ttl_seconds, tags)
+            return value, False
+        finally:
+            if acquired and token is not None:
+                try:
+                    self._call(self.redis_client.eval, _RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.error(f"Cache UNLOCK error: {e}")
+    
+    def get_or_compute_many(self, requests):
+        """
+        Batch form of get_or_compute(): one MGET for all keys, misses
+        computed once per distinct key and written back in one pipeline
+        
+        Batch misses are not locked across processes; stale hits are still
+        refreshed in the background.
+        
+        Args:
+            requests: List of (key, compute, ttl_seconds, tags) tuples
+        
+        Returns:
+            List of (value, from_cache), in request order
+        """
+        entries = self._get_entries_many([key for key, _, _, _ in requests])
+        now = time.time()
+        
+        results = {}
+        writes = []
+        for key, compute, ttl_seconds, tags in requests:
+            if key in results:
+                continue
+            value, soft_expires_at = entries.get(key, (None, None))
+            if value is not None:
+                if soft_expires_at is not None and soft_expires_at <= now:
+                    self._refresh_in_background(key, compute, ttl_seconds, tags)
+                results[key] = (value, True)
+            else:
+                value = compute()
+                results[key] = (value, False)
+                writes.append((key, value, ttl_seconds, tags))
+        
+        if writes:
+            self.set_many(writes, stale_while_revalidate=True)
+        return [results[key] for key, _, _, _ in requests]
+    
+    def _refresh_in_background(self, key, compute, ttl_seconds, tags):
+        """Recompute a stale key once per process, off the request path"""
+        with self._flights_lock:
+            if key in self._refreshing or key in self._flights:
+                return
+            self._refreshing.add(key)
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(
+                    max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix='cache-refresh'
+                )
+            pool = self._refresh_pool
+        
+        try:
+            pool.submit(self._refresh, key, compute, ttl_seconds, tags)
+        except RuntimeError as e:
+            logger.error(f"Cache refresh not scheduled: {e}")
+            with self._flights_lock:
+                self._refreshing.discard(key)
+    
+    def _refresh(self, key, compute, ttl_seconds, tags):
+        lock_key = f"{LOCK_KEY_PREFIX}{key}"
+        token = uuid.uuid4().hex
+        try:
+            # Redis unavailable, or another worker already refreshing this key
+            if not self._available():
+                return
+            if not self._call(self.redis_client.set, lock_key, token, nx=True, px=CACHE_LOCK_TTL_MS):
+                return
+            try:
+                self._store(key, compute(), ttl_seconds, tags)
+            finally:
+                self._call(self.redis_client.eval, _RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.error(f"Cache refresh error for {key}: {e}")
+        finally:
+            with self._flights_lock:
+                self._refreshing.discard(key)
+    
+    def _wait_for_value(self, key):
+        """Poll Redis for a value another worker is computing"""
+        deadline = time.monotonic() + CACHE_LOCK_WAIT_MS / 1000
+        while time.monotonic() < deadline:
+            time.sleep(CACHE_LOCK_POLL_MS / 1000)
+            value = self.get(key)
+            if value is not None:
+                return value
+        return None
+    
     def delete(self, key):
         """Delete key from cache"""
         if not self.enabled:
             return False
         
+        self.local_cache.delete(key)
+        if not self.breaker.allow():
+            return False
         try:
-            self.redis_client.delete(key)
+            self._call(self.redis_client.delete, key)
+            self._publish_invalidation(key=key)
             return True
         except Exception as e:
             logger.error(f"Cache DELETE error: {e}")
             return False
     
+    def _unlink(self, keys):
+        """UNLINK keys in batches of CACHE_SCAN_COUNT sent as one pipeline"""
+        keys = list(keys)
+        if not keys:
+            return 0
+        pipe = self.redis_client.pipeline(transaction=False)
+        for start in range(0, len(keys), CACHE_SCAN_COUNT):
+            pipe.unlink(*keys[start:start + CACHE_SCAN_COUNT])
+        return sum(self._call(pipe.execute))
+    
     def delete_pattern(self, pattern):
-        """Delete all keys matching pattern"""
+        """
+        Delete all keys matching pattern
+        
+        Walks the keyspace with incremental SCAN and frees keys with UNLINK,
+        so Redis keeps serving other clients while a large flush runs
+        """
         if not self.enabled:
             return False
         
+        self.local_cache.delete_pattern(pattern)
+        if not self.breaker.allow():
+            return False
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
+            deleted = 0
+            batch = []
+            for key in self.redis_client.scan_iter(match=pattern, count=CACHE_SCAN_COUNT):
+                batch.append(key)
+                if len(batch) >= CACHE_SCAN_COUNT:
+                    deleted += self._unlink(batch)
+                    batch = []
+            deleted += self._unlink(batch)
+            self._publish_invalidation(pattern=pattern)
+            logger.debug(f"Deleted {deleted} keys matching {pattern}")
             return True
+        except REDIS_AVAILABILITY_ERRORS as e:
+            self.breaker.record_failure()
+            logger.error(f"Cache DELETE PATTERN error: {e}")
+            return False
         except Exception as e:
             logger.error(f"Cache DELETE PATTERN error: {e}")
             return False
     
+    def delete_many(self, keys):
+        """Delete several keys with pipelined UNLINK batches"""
+        if not self.enabled:
+            return False
+        
+        keys = list(keys)
+        for key in keys:
+            self.local_cache.delete(key)
+        if not self.breaker.allow():
+            return False
+        try:
+            self._unlink(keys)
+            if keys:
+                self._publish_invalidation(keys=keys)
+            return True
+        except Exception as e:
+            logger.error(f"Cache DELETE MANY error: {e}")
+            return False
+    
+    def invalidate_tags(self, tags):
+        """
+        Delete every key stored with any of the given tags
+        
+        Returns:
+            True on success, False if caching is disabled or Redis failed
+        """
+        if not self.enabled:
+            return False
+        
+        tag_keys = [f"{TAG_KEY_PREFIX}{tag}" for tag in tags]
+        if not self.breaker.allow():
+            return False
+        try:
+            now = time.time()
+            pipe = self.redis_client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                # Members past their expiry are already gone from Redis
+                pipe.zrangebyscore(tag_key, now, '+inf')
+            keys = set()
+            for members in self._call(pipe.execute):
+                keys.update(k.decode() if isinstance(k, bytes) else k for k in members)
+        except Exception as e:
+            logger.error(f"Cache INVALIDATE TAGS error: {e}")
+            return False
+        
+        # The tag sets go in the same UNLINK batches as their members
+        return self.delete_many(sorted(keys) + tag_keys)
+    
     def clear_user_cache(self, user_id):
         """Clear all cached recommendations for a user"""
-        patterns = [
-            f"rec:collab:{user_id}:*",
-            f"rec:hybrid:{user_id}:*",
-        ]
-        for pattern in patterns:
-            self.delete_pattern(pattern)
+        return self.invalidate_tags([f"user:{user_id}"])
     
     def clear_article_cache(self, article_id):
-        """Clear cached similar articles"""
-        self.delete_pattern(f"rec:similar:{article_id}:*")
+        """Clear cached recommendations derived from an article"""
+        return self.invalidate_tags([f"article:{article_id}"])
     
     def get_cache_stats(self):
-        """Get cache statistics"""
+        """
+        Get cache statistics for this application, per key prefix
+        (e.g. "rec:hybrid"), summed over all workers
+        """
         if not self.enabled:
             return {"enabled": False}
         
         try:
-            info = self.redis_client.info('stats')
+            prefixes, workers = self.metrics.aggregate()
+            hits = sum(stats['hits'] for stats in prefixes.values())
+            misses = sum(stats['misses'] for stats in prefixes.values())
             return {
                 "enabled": True,
-                "keyspace_hits": info.get('keyspace_hits', 0),
-                "keyspace_misses": info.get('keyspace_misses', 0),
-                "hit_rate": (
-                    info.get('keyspace_hits', 0) / 
-                    (info.get('keyspace_hits', 0) + info.get('keyspace_misses', 1))
-                ) * 100
+                "circuit": self.breaker.state,
+                "workers": workers,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": (hits / (hits + misses)) * 100 if hits + misses else 0.0,
+                "prefixes": summarize(prefixes)
             }
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
             return {"enabled": True, "error": str(e)}
 
 
+class AsyncCacheManager:
+    """
+    asyncio front end to a CacheManager, used by the ASGI server
+    
+    Reads, writes and the single-flight/stale-while-revalidate logic await
+    redis.asyncio instead of blocking a thread. The L1 cache, codec,
+    circuit breaker, metrics, model version and invalidation listener are
+    the wrapped manager's, so both front ends stay coherent; rare admin
+    operations (invalidation, stats) still go through it.
+    """
+    
+    def __init__(self, cache_manager):
+        self.sync = cache_manager
+        self.redis_client = None
+        self._flights = {}
+        self._refreshing = set()
+        self._tasks = set()
+    
+    @property
+    def enabled(self):
+        return self.sync.enabled
+    
+    @property
+    def model_version(self):
+        return self.sync.model_version
+    
+    def connect(self):
+        """Create the asyncio client; call from the event loop that will use it"""
+        if self.redis_client is None:
+            pool = redis.asyncio.BlockingConnectionPool(**redis_pool_options())
+            self.redis_client = redis.asyncio.Redis(connection_pool=pool)
+    
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            self.redis_client = None
+    
+    def _available(self):
+        return self.sync.enabled and self.redis_client is not None and self.sync.breaker.allow()
+    
+    async def _call(self, func, *args, **kwargs):
+        """Await one Redis call, feeding its outcome to the circuit breaker"""
+        breaker = self.sync.breaker
+        try:
+            result = await func(*args, **kwargs)
+        except REDIS_AVAILABILITY_ERRORS:
+            breaker.record_failure()
+            raise
+        except redis.exceptions.RedisError:
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+    
+    async def get(self, key):
+        """Get value from cache (in-process L1 first, then Redis)"""
+        _, value, _ = await self._get_entry(key)
+        return value
+    
+    async def _get_entry(self, key):
+        """Async twin of CacheManager._get_entry()"""
+        if not self.sync.enabled:
+            return False, None, None
+        
+        metrics = self.sync.metrics
+        started = time.perf_counter()
+        hit, value = self.sync.local_cache.get(key)
+        if hit:
+            metrics.record_get(key, True, time.perf_counter() - started)
+            return True, value, None
+        if not self._available():
+            metrics.record_get(key, False, time.perf_counter() - started)
+            return False, None, None
+        
+        try:
+            raw = await self._call(self.redis_client.get, key)
+            entry = self.sync._decode_entry(key, raw)
+            metrics.record_get(key, entry[0], time.perf_counter() - started, len(raw or b''))
+            return entry
+        except Exception as e:
+            logger.error(f"Cache GET error: {e}")
+            metrics.record_error(key)
+            metrics.record_get(key, False, time.perf_counter() - started)
+            return False, None, None
+    
+    async def set(self, key, value, ttl_seconds=3600, tags=None, soft_ttl_seconds=None):
+        """Set value in cache with TTL (see CacheManager.set)"""
+        if not self._available():
+            return False
+        
+        started = time.perf_counter()
+        try:
+            serialized, local_ttl = self.sync._encode_entry(value, ttl_seconds, soft_ttl_seconds)
+            pipe = self.redis_client.pipeline(transaction=False)
+            self.sync._queue_set(pipe, key, serialized, ttl_seconds, tags)
+            await self._call(pipe.execute)
+            self.sync.local_cache.set(key, value, local_ttl)
+            self.sync.metrics.record_set(key, time.perf_counter() - started, len(serialized))
+            return True
+        except Exception as e:
+            logger.error(f"Cache SET error: {e}")
+            self.sync.metrics.record_error(key)
+            return False
+    
+    async def _store(self, key, value, ttl_seconds, tags):
+        if not self._available():
+            return False
+        ttl_seconds, soft_ttl = self.sync._swr_ttls(ttl_seconds)
+        return await self.set(key, value, ttl_seconds, tags=tags, soft_ttl_seconds=soft_ttl)
+    
+    async def get_or_compute(self, key, compute, ttl_seconds=3600, tags=None):
+        """
+        Async twin of CacheManager.get_or_compute()
+        
+        Args:
+            compute: Zero-argument coroutine function producing the value
+        
+        Returns:
+            (value, from_cache)
+        """
+        hit, value, soft_expires_at = await self._get_entry(key)
+        if hit and value is not None:
+            if soft_expires_at is not None and soft_expires_at <= time.time():
+                self._refresh_in_background(key, compute, ttl_seconds, tags)
+            return value, True
+        
+        flight = self._flights.get(key)
+        if flight is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight), CACHE_LOCK_WAIT_MS / 1000)
+            except Exception:
+                # Leader failed or is stuck - do not fail with it
+                return await compute(), False
+        
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await self._compute_with_lock(key, compute, ttl_seconds, tags)
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Followers must not be cancelled with this request (e.g. when its
+            # client disconnects): fail the flight so they compute themselves
+            flight.set_exception(RuntimeError(f"Computation of {key} was cancelled"))
+            flight.exception()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Nobody may be waiting; avoid "exception was never retrieved"
+            flight.exception()
+            raise
+        finally:
+            self._flights.pop(key, None)
+    
+    async def _compute_with_lock(self, key, compute, ttl_seconds, tags):
+        if not self._available():
+            return await compute(), False
+        
+        lock_key = f"{LOCK_KEY_PREFIX}{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._call(
+                self.redis_client.set, lock_key, token, nx=True, px=CACHE_LOCK_TTL_MS
+            )
+        except Exception as e:
+            logger.error(f"Cache LOCK error: {e}")
+            acquired, token = True, None
+        
+        if not acquired:
+            value = await self._wait_for_value(key)
+            if value is not None:
+                return value, True
+            logger.warning(f"Timed out waiting for {key}; computing it here")
+        
+        try:
+            value = await compute()
+            await self._store(key, value, ttl_seconds, tags)
+            return value, False
+        finally:
+            if acquired and token is not None:
+                try:
+                    await self._call(self.redis_client.eval, _RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.error(f"Cache UNLOCK error: {e}")
+    
+    async def _wait_for_value(self, key):
+        deadline = time.monotonic() + CACHE_LOCK_WAIT_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(CACHE_LOCK_POLL_MS / 1000)
+            value = await self.get(key)
+            if value is not None:
+                return value
+        return None
+    
+    async def get_or_compute_many(self, requests):
+        """
+        Async twin of CacheManager.get_or_compute_many(); misses are
+        computed concurrently
+        
+        Args:
+            requests: List of (key, compute, ttl_seconds, tags) tuples, compute
+                      being a zero-argument coroutine function
+        
+        Returns:
+            List of (value, from_cache), in request order
+        """
+        keys = list(dict.fromkeys(key for key, _, _, _ in requests))
+        entries = {}
+        if self.sync.enabled:
+            for key in keys:
+                hit, value = self.sync.local_cache.get(key)
+                if hit:
+                    entries[key] = (value, None)
+                    self.sync.metrics.record_get(key, True)
+            missing = [key for key in keys if key not in entries]
+            if missing and self._available():
+                started = time.perf_counter()
+                try:
+                    raws = await self._call(self.redis_client.mget, missing)
+                    for key, raw in zip(missing, raws):
+                        hit, value, soft_expires_at = self.sync._decode_entry(key, raw)
+                        if hit:
+                            entries[key] = (value, soft_expires_at)
+                        self.sync.metrics.record_get(key, hit, nbytes=len(raw or b''))
+                except Exception as e:
+                    logger.error(f"Cache MGET error: {e}")
+                self.sync.metrics.record_latency(
+                    missing, 'get_latency_ms', time.perf_counter() - started
+                )
+        
+        now = time.time()
+        results = {}
+        pending = {}
+        for key, compute, ttl_seconds, tags in requests:
+            if key in results or key in pending:
+                continue
+            value, soft_expires_at = entries.get(key, (None, None))
+            if value is not None:
+                if soft_expires_at is not None and soft_expires_at <= now:
+                    self._refresh_in_background(key, compute, ttl_seconds, tags)
+                results[key] = (value, True)
+            else:
+                pending[key] = (compute, ttl_seconds, tags)
+        
+        if pending:
+            values = await asyncio.gather(*(compute() for compute, _, _ in pending.values()))
+            for (key, (_, ttl_seconds, tags)), value in zip(pending.items(), values):
+                results[key] = (value, False)
+                await self._store(key, value, ttl_seconds, tags)
+        return [results[key] for key, _, _, _ in requests]
+    
+    def _refresh_in_background(self, key, compute, ttl_seconds, tags):
+        """Recompute a stale key once per process, as a background task"""
+        if key in self._refreshing or key in self._flights:
+            return
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(
+            self._refresh(key, compute, ttl_seconds, tags)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _refresh(self, key, compute, ttl_seconds, tags):
+        lock_key = f"{LOCK_KEY_PREFIX}{key}"
+        token = uuid.uuid4().hex
+        try:
+            if not self._available():
+                return
+            if not await self._call(
+                self.redis_client.set, lock_key, token, nx=True, px=CACHE_LOCK_TTL_MS
+            ):
+                return
+            try:
+                await self._store(key, await compute(), ttl_seconds, tags)
+            finally:
+                await self._call(self.redis_client.eval, _RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.error(f"Cache refresh error for {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+
 # Singleton instance
 _cache_manager = None
 
@@ -145,6 +1256,8 @@ def get_cache_manager():
 def cached(key_prefix, ttl_seconds=3600):
     """
     Decorator to cache function results
+    Keys include the cache manager's model_version, so results computed
+    with an older model are never served after a model switch
     
     Usage:
         @cached('rec:similar', ttl_seconds=1800)
@@ -158,21 +1271,16 @@ def cached(key_prefix, ttl_seconds=3600):
             cache = get_cache_manager()
             
             # Build cache key from function args
-            cache_key_parts = [key_prefix, func.__name__]
+            cache_key_parts = [key_prefix, model_namespace(cache.model_version), func.__name__]
             cache_key_parts.extend([str(arg) for arg in args])
             cache_key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
             cache_key = ":".join(cache_key_parts)
             
-            # Try to get from cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache HIT: {cache_key}")
-                return cached_result
-            
-            # Cache miss - compute and cache
-            logger.debug(f"Cache MISS: {cache_key}")
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl_seconds)
+            # Concurrent misses for the same key compute it only once
+            result, from_cache = cache.get_or_compute(
+                cache_key, lambda: func(*args, **kwargs), ttl_seconds
+            )
+            logger.debug(f"Cache {'HIT' if from_cache else 'MISS'}: {cache_key}")
             
             return result
         
@@ -0,0 +1,150 @@
+"""
+Cache Metrics for NewsXpress
+Per-process cache counters by key prefix, shared between workers through
+small snapshot files so any worker can report totals for the whole server
+"""
+import os
+import sys
+import bisect
+import tempfile
+from pathlib import Path
+import logging
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from worker_metrics import WorkerRegistry
+
+logger = logging.getLogger(__name__)
+
+CACHE_METRICS_DIR = os.getenv(
+    'CACHE_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'newsxpress-cache-metrics')
+)
+# How often each worker publishes its snapshot
+CACHE_METRICS_FLUSH_SECONDS = float(os.getenv('CACHE_METRICS_FLUSH_SECONDS', 10))
+
+COUNTERS = ('hits', 'misses', 'sets', 'errors', 'bytes_read', 'bytes_written')
+HISTOGRAMS = ('get_latency_ms', 'set_latency_ms')
+# Upper bounds of the latency buckets; one extra bucket catches the rest
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def key_prefix(key):
+    """
+    Metrics bucket for a cache key: recommendation keys
+    ("rec:v=<version>:<method>:...") group by method, anything else by its
+    first segment
+    """
+    parts = key.split(':', 3)
+    if len(parts) > 2 and parts[1].startswith('v='):
+        return f"{parts[0]}:{parts[2]}"
+    return parts[0]
+
+
+def _new_prefix_stats():
+    stats = {name: 0 for name in COUNTERS}
+    for name in HISTOGRAMS:
+        stats[name] = {'counts': [0] * (len(LATENCY_BUCKETS_MS) + 1), 'sum': 0.0}
+    return stats
+
+
+def merge_snapshots(snapshots):
+    """Sum several {prefix: stats} snapshots into one"""
+    merged = {}
+    for snapshot in snapshots:
+        for prefix, stats in snapshot.items():
+            total = merged.setdefault(prefix, _new_prefix_stats())
+            for name in COUNTERS:
+                total[name] += stats.get(name, 0)
+            for name in HISTOGRAMS:
+                histogram = stats.get(name)
+                if not histogram:
+                    continue
+                counts = total[name]['counts']
+                for i, count in enumerate(histogram['counts'][:len(counts)]):
+                    counts[i] += count
+                total[name]['sum'] += histogram['sum']
+    return merged
+
+
+def summarize(snapshot):
+    """Add hit rates, averages and bucket bounds for reporting"""
+    report = {}
+    for prefix, stats in sorted(snapshot.items()):
+        lookups = stats['hits'] + stats['misses']
+        entry = {name: stats[name] for name in COUNTERS}
+        entry['hit_rate'] = (stats['hits'] / lookups) * 100 if lookups else 0.0
+        for name in HISTOGRAMS:
+            counts = stats[name]['counts']
+            observed = sum(counts)
+            entry[name] = {
+                'buckets': list(LATENCY_BUCKETS_MS) + ['+Inf'],
+                'counts': counts,
+                'count': observed,
+                'avg': stats[name]['sum'] / observed if observed else 0.0,
+            }
+        report[prefix] = entry
+    return report
+
+
+class CacheMetrics(WorkerRegistry):
+    """
+    Hits, misses, sets, errors, bytes and get/set latency per key prefix
+
+    Snapshots are {prefix: stats}; see WorkerRegistry for how they are
+    published and merged across workers.
+    """
+    thread_name = 'cache-metrics-flusher'
+
+    def __init__(self, directory=None, flush_seconds=None):
+        super().__init__(
+            directory or CACHE_METRICS_DIR,
+            CACHE_METRICS_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        )
+
+    def _new_shard(self):
+        return {}
+
+    def _stats(self, key):
+        shard = self._shard()
+        prefix = key_prefix(key)
+        stats = shard.get(prefix)
+        if stats is None:
+            stats = shard[prefix] = _new_prefix_stats()
+        return stats
+
+    def _observe(self, stats, histogram, seconds):
+        elapsed_ms = seconds * 1000
+        stats[histogram]['counts'][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        stats[histogram]['sum'] += elapsed_ms
+
+    def record_get(self, key, hit, seconds=None, nbytes=0):
+        """Record one lookup; seconds=None when the latency was recorded for a batch"""
+        stats = self._stats(key)
+        stats['hits' if hit else 'misses'] += 1
+        stats['bytes_read'] += nbytes
+        if seconds is not None:
+            self._observe(stats, 'get_latency_ms', seconds)
+
+    def record_set(self, key, seconds=None, nbytes=0):
+        """Record one write; seconds=None when the latency was recorded for a batch"""
+        stats = self._stats(key)
+        stats['sets'] += 1
+        stats['bytes_written'] += nbytes
+        if seconds is not None:
+            self._observe(stats, 'set_latency_ms', seconds)
+
+    def record_latency(self, keys, histogram, seconds):
+        """Record a batch round trip once for each prefix it touched"""
+        for prefix_key in {key_prefix(key): key for key in keys}.values():
+            self._observe(self._stats(prefix_key), histogram, seconds)
+
+    def record_error(self, key):
+        self._stats(key)['errors'] += 1
+
+    def snapshot(self):
+        """This process's counts as {prefix: stats}"""
+        return merge_snapshots([dict(shard) for shard in self._shard_list()])
+
+    def merge(self, snapshots):
+        return merge_snapshots(snapshots)
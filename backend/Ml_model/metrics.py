@@ -0,0 +1,229 @@
+"""
+Service Metrics for NewsXpress
+Low-overhead in-process counters and latency histograms, merged across
+gunicorn workers and rendered in the Prometheus text format for /metrics
+"""
+import os
+import sys
+import time
+import bisect
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+import logging
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from worker_metrics import WorkerRegistry
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'newsxpress-metrics')
+)
+# How often each worker publishes its snapshot
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+
+# Upper bounds (seconds) of the latency buckets; +Inf is implied
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRIC_HELP = {
+    'newsxpress_http_requests_total': ('counter', 'HTTP requests by route, HTTP method and status'),
+    'newsxpress_http_request_duration_seconds': ('histogram', 'HTTP request latency by route'),
+    'newsxpress_recommendations_total': ('counter', 'Recommendation requests by method and cache result'),
+    'newsxpress_recommendation_duration_seconds': ('histogram', 'Recommendation latency by method'),
+    'newsxpress_stage_duration_seconds': ('histogram', 'RecommendationService stage latency'),
+    'newsxpress_degraded_total': ('counter', 'Recommendation requests served by a cheaper fallback, by reason'),
+}
+
+
+def _labels_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _add_values(counters, histograms, shard_counters, shard_histograms):
+    """Add keyed counter and histogram values into running totals"""
+    for key, value in shard_counters.items():
+        counters[key] = counters.get(key, 0) + value
+    for key, values in shard_histograms.items():
+        total = histograms.setdefault(key, [0] * len(values))
+        for i, value in enumerate(list(values)[:len(total)]):
+            total[i] += value
+
+
+def _keyed(snapshot):
+    """(counters, histograms) keyed by (name, labels) from a JSON snapshot"""
+    counters, histograms = {}, {}
+    for name, labels, value in snapshot.get('counters', []):
+        _add_values(counters, histograms, {(name, _labels_key(labels)): value}, {})
+    for name, labels, values in snapshot.get('histograms', []):
+        _add_values(counters, histograms, {}, {(name, _labels_key(labels)): values})
+    return counters, histograms
+
+
+def _to_snapshot(counters, histograms):
+    return {
+        'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, dict(labels), values] for (name, labels), values in histograms.items()],
+    }
+
+
+class MetricsRegistry(WorkerRegistry):
+    """
+    Counters and histograms keyed by metric name and labels
+
+    Snapshots are {'counters': [[name, labels, value]], 'histograms':
+    [[name, labels, values]]}; see WorkerRegistry for how they are
+    published and merged across workers.
+    """
+
+    def __init__(self, directory=None, flush_seconds=None):
+        super().__init__(
+            directory or METRICS_DIR,
+            METRICS_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        )
+
+    def _new_shard(self):
+        return ({}, {})
+
+    def inc(self, name, labels=None, value=1):
+        counters = self._shard()[0]
+        key = (name, _labels_key(labels))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        histograms = self._shard()[1]
+        key = (name, _labels_key(labels))
+        histogram = histograms.get(key)
+        if histogram is None:
+            # Bucket counts, then the +Inf bucket, then the sum
+            histogram = histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+
+    @contextmanager
+    def time(self, name, labels=None):
+        """Observe the duration of the with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+    def snapshot(self):
+        """This process's values in a JSON-friendly form"""
+        counters, histograms = {}, {}
+        for shard_counters, shard_histograms in self._shard_list():
+            _add_values(counters, histograms, dict(shard_counters), dict(shard_histograms))
+        return _to_snapshot(counters, histograms)
+
+    def merge(self, snapshots):
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            _add_values(counters, histograms, *_keyed(snapshot))
+        return _to_snapshot(counters, histograms)
+
+    def render(self):
+        """All workers' metrics in the Prometheus text exposition format"""
+        snapshot, _ = self.aggregate()
+        counters, histograms = _keyed(snapshot)
+        lines = []
+        families = sorted({name for name, _ in counters} | {name for name, _ in histograms})
+        for family in families:
+            kind, help_text = METRIC_HELP.get(
+                family, ('histogram' if any(n == family for n, _ in histograms) else 'counter', family)
+            )
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            for (name, labels), value in sorted(counters.items()):
+                if name == family:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), values in sorted(histograms.items()):
+                if name != family:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], values[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+# Singleton instance
+_metrics = None
+
+
+def get_metrics():
+    """Get or create the metrics registry"""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
+
+
+# Stage timings of the request running on this thread, when collected
+_request_stages = threading.local()
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time one RecommendationService stage, e.g. with stage_timer('scoring'): ..."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        get_metrics().observe('newsxpress_stage_duration_seconds', seconds, {'stage': stage})
+        stages = getattr(_request_stages, 'stages', None)
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def collect_stages():
+    """
+    Also add up the stage timings of this thread's current request
+
+    Yields:
+        dict of stage -> total seconds, filled in as stages finish
+    """
+    stages = {}
+    previous = getattr(_request_stages, 'stages', None)
+    _request_stages.stages = stages
+    try:
+        yield stages
+    finally:
+        _request_stages.stages = previous
+
+
+def record_recommendation(method, cache_result, seconds=None):
+    """
+    Count one recommendation request by method and cache result ('hit',
+    'miss' or 'bypass' when the request was too deep to cache)
+    """
+    metrics = get_metrics()
+    metrics.inc('newsxpress_recommendations_total', {'method': method, 'cache': cache_result})
+    if seconds is not None:
+        metrics.observe('newsxpress_recommendation_duration_seconds', seconds, {'method': method})
+
+
+def _reset_after_fork():
+    if _metrics is not None:
+        _metrics.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,300 @@
+"""
+Versioned Model Bundles for NewsXpress
+Training writes every artifact into its own version directory with a
+checksummed manifest; publishing atomically repoints the `current` symlink
+"""
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+CURRENT_LINK = 'current'
+VERSIONS_DIR = 'versions'
+
+# Number of previous versions kept next to the current one for rollback
+MODEL_KEEP_VERSIONS = int(os.getenv('MODEL_KEEP_VERSIONS', 3))
+# Verify SHA-256 checksums on load (byte sizes are always checked)
+MODEL_VERIFY_CHECKSUMS = os.getenv('MODEL_VERIFY_CHECKSUMS', 'true').lower() == 'true'
+
+
+class BundleValidationError(Exception):
+    """Raised when a bundle does not match its manifest"""
+
+
+def describe_artifact(obj):
+    """Shape/dtype summary of a trained object for the manifest"""
+    info = {'type': type(obj).__name__}
+
+    shape = getattr(obj, 'shape', None)
+    if shape is not None:
+        info['shape'] = [int(d) for d in shape]
+
+    dtypes = getattr(obj, 'dtypes', None)
+    if dtypes is not None and hasattr(dtypes, '__iter__'):
+        info['dtype'] = sorted({str(d) for d in dtypes})
+    elif getattr(obj, 'dtype', None) is not None:
+        info['dtype'] = str(obj.dtype)
+
+    vocabulary = getattr(obj, 'vocabulary_', None)
+    if vocabulary is not None:
+        info['vocabulary_size'] = len(vocabulary)
+
+    return info
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelBundle:
+    """
+    Layout:
+        <root>/versions/<version>/   artifacts + manifest.json
+        <root>/current -> versions/<version>
+    """
+
+    def __init__(self, root, keep=None):
+        self.root = Path(root)
+        self.versions_dir = self.root / VERSIONS_DIR
+        self.current_link = self.root / CURRENT_LINK
+        self.keep = MODEL_KEEP_VERSIONS if keep is None else keep
+
+    def create_version(self):
+        """Create an empty, unpublished version directory to train into"""
+        version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        version_dir = self.versions_dir / version
+        version_dir.mkdir(parents=True, exist_ok=False)
+        return version_dir
+
+    def discard(self, version_dir):
+        """Remove an unpublished version directory (e.g. after a failed run)"""
+        if Path(version_dir).resolve() == self._current_dir():
+            raise ValueError("Refusing to discard the published version")
+        shutil.rmtree(version_dir, ignore_errors=True)
+
+    def publish(self, version_dir, artifacts, stats=None):
+        """
+        Write the manifest for a finished version and make it current
+
+        Args:
+            version_dir: Directory returned by create_version()
+            artifacts: {file name: describe_artifact(...)} for every artifact
+            stats: Training statistics to record in the manifest
+
+        Returns:
+            The manifest dict
+        """
+        version_dir = Path(version_dir)
+        files = {}
+        for name, info in sorted(artifacts.items()):
+            path = version_dir / name
+            files[name] = {
+                **info,
+                'bytes': path.stat().st_size,
+                'sha256': file_checksum(path),
+            }
+
+        manifest = {
+            'version': version_dir.name,
+            'created_at': datetime.now().isoformat(),
+            'files': files,
+            'stats': stats or {},
+        }
+        tmp_manifest = version_dir / (MANIFEST_NAME + '.tmp')
+        tmp_manifest.write_text(json.dumps(manifest, indent=2, default=str))
+        os.replace(tmp_manifest, version_dir / MANIFEST_NAME)
+
+        self._point_current_to(version_dir.name)
+        logger.info(f"Published model version {version_dir.name}")
+        self.prune()
+        return manifest
+
+    def carry_forward(self, version_dir, names):
+        """
+        Copy artifacts from the current version into an unpublished one,
+        all or nothing (a partial group would mix incompatible models)
+
+        Returns:
+            {file name: artifact info} for the copied files
+        """
+        current = self._current_dir()
+        if current is None:
+            return {}
+        try:
+            manifest = self.validate(current.name)
+        except BundleValidationError as e:
+            logger.error(f"Cannot carry forward artifacts: {e}")
+            return {}
+
+        files = manifest.get('files', {})
+        if not all(name in files for name in names):
+            return {}
+
+        copied = {}
+        for name in names:
+            shutil.copy2(current / name, Path(version_dir) / name)
+            copied[name] = {
+                k: v for k, v in files[name].items() if k not in ('bytes', 'sha256')
+            }
+        return copied
+
+    def _point_current_to(self, version):
+        """Atomically swap the current symlink via rename"""
+        tmp_link = self.root / f'.{CURRENT_LINK}-{os.getpid()}'
+        if tmp_link.is_symlink() or tmp_link.exists():
+            tmp_link.unlink()
+        os.symlink(Path(VERSIONS_DIR) / version, tmp_link)
+        os.replace(tmp_link, self.current_link)
+
+    def _current_dir(self):
+        if not os.path.islink(self.current_link):
+            return None
+        return self.current_link.resolve()
+
+    def current_version(self):
+        current = self._current_dir()
+        return current.name if current is not None else None
+
+    def published_versions(self):
+        """Versions with a manifest, newest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            (p.name for p in self.versions_dir.iterdir()
+             if os.path.isfile(p / MANIFEST_NAME)),
+            reverse=True
+        )
+
+    def validate(self, version, verify_checksums=None):
+        """
+        Check a version against its manifest
+
+        Returns:
+            The manifest dict
+
+        Raises:
+            BundleValidationError if a file is missing, truncated or corrupted
+        """
+        verify_checksums = MODEL_VERIFY_CHECKSUMS if verify_checksums is None else verify_checksums
+        version_dir = self.versions_dir / version
+        try:
+            manifest = json.loads((version_dir / MANIFEST_NAME).read_text())
+        except Exception as e:
+            raise BundleValidationError(f"Unreadable manifest for {version}: {e}")
+
+        for name, info in manifest.get('files', {}).items():
+            path = version_dir / name
+            if not os.path.isfile(path):
+                raise BundleValidationError(f"{version}: missing {name}")
+            size = os.path.getsize(path)
+            if size != info['bytes']:
+                raise BundleValidationError(
+                    f"{version}: {name} is {size} bytes, manifest says {info['bytes']}"
+                )
+            if verify_checksums and file_checksum(path) != info['sha256']:
+                raise BundleValidationError(f"{version}: checksum mismatch for {name}")
+
+        return manifest
+
+    def resolve(self):
+        """
+        Find the version to load: current, else the newest valid older one
+
+        Returns:
+            (version_dir, manifest), or (None, None) when no valid bundle exists
+        """
+        try:
+            current = self.current_version()
+            candidates = self.published_versions()
+            if current in candidates:
+                candidates.remove(current)
+                candidates.insert(0, current)
+            else:
+                candidates = [v for v in candidates if current is None or v < current]
+
+            for version in candidates:
+                try:
+                    manifest = self.validate(version)
+                except BundleValidationError as e:
+                    logger.error(f"Skipping invalid model bundle: {e}")
+                    continue
+                if version != current:
+                    logger.warning(f"Falling back to model version {version}")
+                return self.versions_dir / version, manifest
+        except Exception as e:
+            logger.error(f"Error resolving model bundle: {e}")
+
+        return None, None
+
+    def rollback(self, version=None):
+        """
+        Point current at an older published version
+
+        Args:
+            version: Target version (default: the one before current)
+
+        Returns:
+            The version now current
+        """
+        versions = self.published_versions()
+        current = self.current_version()
+        if version is None:
+            older = [v for v in versions if current is None or v < current]
+            if not older:
+                raise ValueError("No previous model version to roll back to")
+            version = older[0]
+        if version not in versions:
+            raise ValueError(f"Unknown model version {version}")
+
+        self.validate(version)
+        self._point_current_to(version)
+        logger.info(f"Rolled back model bundle to {version}")
+        return version
+
+    def prune(self):
+        """Delete published versions beyond current + `keep` previous ones"""
+        current = self.current_version()
+        versions = self.published_versions()
+        if current in versions:
+            keep = set(versions[versions.index(current):][:self.keep + 1])
+            keep.update(versions[:versions.index(current)])
+        else:
+            keep = set(versions[:self.keep + 1])
+
+        for version in versions:
+            if version not in keep:
+                shutil.rmtree(self.versions_dir / version, ignore_errors=True)
+                logger.info(f"Pruned model version {version}")
+
+
+def main():
+    """Inspect or roll back published model versions"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage NewsXpress model bundles')
+    parser.add_argument('command', choices=['list', 'rollback'])
+    parser.add_argument('version', nargs='?', help='Target version for rollback')
+    args = parser.parse_args()
+
+    bundle = ModelBundle(Path(__file__).resolve().parent / 'models')
+    if args.command == 'list':
+        current = bundle.current_version()
+        for version in bundle.published_versions():
+            print(f"{'*' if version == current else ' '} {version}")
+    else:
+        print(f"Current model version: {bundle.rollback(args.version)}")
+
+
+if __name__ == '__main__':
+    main()
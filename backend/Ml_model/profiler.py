@@ -0,0 +1,134 @@
+"""
+On-demand Profiler for NewsXpress
+Admin-only captures inside a live worker: a stack sampler for a bounded number
+of seconds, or cProfile around a single request; one capture at a time
+"""
+import os
+import io
+import sys
+import time
+import hmac
+import pstats
+import cProfile
+import threading
+from pathlib import Path
+from collections import Counter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Profiling is off unless a token is configured; requests must present it
+PROFILER_ADMIN_TOKEN = os.getenv('PROFILER_ADMIN_TOKEN', '')
+# Longest sampling capture accepted
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', 30))
+# Seconds between stack samples; 5ms keeps the sampler's own cost low
+PROFILER_SAMPLE_INTERVAL = float(os.getenv('PROFILER_SAMPLE_INTERVAL', 0.005))
+# Functions listed in a cProfile report
+PROFILER_TOP_FUNCTIONS = int(os.getenv('PROFILER_TOP_FUNCTIONS', 40))
+
+# Held for the duration of any capture
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when another capture is already running in this worker"""
+
+
+def profiling_enabled():
+    return bool(PROFILER_ADMIN_TOKEN)
+
+
+def authorized(token):
+    """True if profiling is enabled and token matches the admin token"""
+    if not PROFILER_ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), PROFILER_ADMIN_TOKEN.encode('utf-8'))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds, interval=None):
+    """
+    Sample every thread's stack for a while
+
+    Args:
+        seconds: Capture length, capped at PROFILER_MAX_SECONDS
+        interval: Seconds between samples
+
+    Returns:
+        Collapsed stacks ("thread;outer;...;inner count" per line), ready
+        for flamegraph.pl or speedscope
+
+    Raises:
+        ProfilerBusy if another capture is running
+    """
+    seconds = min(max(float(seconds), 0.0), PROFILER_MAX_SECONDS)
+    interval = max(PROFILER_SAMPLE_INTERVAL if interval is None else float(interval), 0.001)
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        me = threading.get_ident()
+        names = {}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while True:
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                stacks[';'.join(reversed(labels))] += 1
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+    finally:
+        _capture_lock.release()
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class RequestProfile:
+    """
+    cProfile around one request, started and stopped on the request's thread
+
+    start() returns False (and the request runs unprofiled) if another
+    capture is running.
+    """
+
+    def __init__(self):
+        self.profile = None
+
+    def start(self):
+        if not _capture_lock.acquire(blocking=False):
+            return False
+        try:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        except Exception as e:
+            # e.g. another profiler already installed on this thread
+            self.profile = None
+            _capture_lock.release()
+            logger.warning(f"Could not start request profile: {e}")
+            return False
+        return True
+
+    def stop(self):
+        """Stop profiling; returns a pstats report sorted by cumulative time"""
+        if self.profile is None:
+            return ''
+        try:
+            self.profile.disable()
+        finally:
+            _capture_lock.release()
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(PROFILER_TOP_FUNCTIONS)
+        self.profile = None
+        return out.getvalue()
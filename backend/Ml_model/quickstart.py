@@ -37,8 +37,10 @@ def main():
         print("\n⚠️  Model training failed. Check your database connection and data.")
         sys.exit(1)
     
-    # Step 2: Check models
+    # Step 2: Check models (published bundle, or legacy flat layout)
     models_dir = ml_dir / 'models'
+    if (models_dir / 'current').is_dir():
+        models_dir = models_dir / 'current'
     required_files = [
         'tfidf_vectorizer.pkl',
         'sigmoid_matrix.pkl',
@@ -0,0 +1,178 @@
+"""
+Response Encoding for NewsXpress
+JSON or MessagePack bodies, strong ETags with If-None-Match revalidation,
+and gzip/brotli compression of large bodies, shared by the Flask and ASGI
+servers
+"""
+import os
+import gzip
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+JSON_MIMETYPES = ('application/json', 'application/*', '*/*')
+
+# Bodies smaller than this are sent uncompressed
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESS_MIN_BYTES', 1024))
+# Moderate levels: most of the size win for a fraction of the CPU of the maximum
+RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 5))
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', 4))
+
+# Per-request fields left out of ETags, so a cache miss and the hits after
+# it revalidate each other
+ETAG_EXCLUDED_FIELDS = ('from_cache',)
+
+
+def _parse_qualities(header):
+    """{token: q} for an Accept or Accept-Encoding header"""
+    qualities = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if name.strip():
+            qualities[name.strip().lower()] = q
+    return qualities
+
+
+def negotiate_format(accept):
+    """
+    Response format for an Accept header: 'msgpack' when the client lists
+    MessagePack at least as highly as JSON and msgpack is installed,
+    otherwise 'json'
+    """
+    if msgpack is None or not accept:
+        return 'json'
+    qualities = _parse_qualities(accept)
+    msgpack_q = max(qualities.get(t, 0.0) for t in MSGPACK_MIMETYPES)
+    json_q = max(qualities.get(t, 0.0) for t in JSON_MIMETYPES)
+    return 'msgpack' if msgpack_q > 0 and msgpack_q >= json_q else 'json'
+
+
+def _msgpack_default(obj):
+    """Timestamps and numpy scalars found in hydrated article metadata"""
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+
+def pack_msgpack(payload):
+    return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+
+def strong_etag(model_version, cache_key, body):
+    """
+    ETag for a response body: model version and cache key namespace the
+    hash, so identical bytes from different models never validate each other
+    """
+    digest = hashlib.sha1(body).hexdigest()
+    tag = hashlib.sha1(f"{model_version}|{cache_key}|{digest}".encode('utf-8')).hexdigest()
+    return tag[:32]
+
+
+def etag_content(payload, media_type):
+    """
+    Bytes an ETag hashes for a payload: its content without
+    ETAG_EXCLUDED_FIELDS, plus the media type, as JSON and MessagePack
+    bodies are different representations
+    """
+    content = {name: value for name, value in payload.items() if name not in ETAG_EXCLUDED_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, default=str, separators=(',', ':'))
+    return f"{media_type}\n{encoded}".encode('utf-8')
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value lists etag (or is *)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # Weak comparison, as If-None-Match requires
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Best supported content coding for an Accept-Encoding header
+
+    Returns:
+        'br', 'gzip', or None for identity
+    """
+    if not accept_encoding:
+        return None
+    accepted = _parse_qualities(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get('br', wildcard) > 0:
+        return 'br'
+    if accepted.get('gzip', wildcard) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+
+
+def encode_response(body, etag_parts, if_none_match, accept_encoding):
+    """
+    Decide how to send a cacheable 200 response
+
+    Args:
+        body: Uncompressed response body
+        etag_parts: (model version, cache key) of the response, optionally
+                    followed by etag_content() to hash instead of the body
+        if_none_match: The request's If-None-Match header
+        accept_encoding: The request's Accept-Encoding header
+
+    Returns:
+        (status, body, headers): 304 with an empty body when the client's
+        copy is current, otherwise 200 with the body compressed if it is at
+        least RESPONSE_COMPRESS_MIN_BYTES and the client accepts it
+    """
+    encoding = None
+    if len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(accept_encoding)
+
+    # Each content coding is its own representation with its own strong ETag
+    model_version, cache_key, *content = etag_parts
+    etag = strong_etag(model_version, cache_key, content[0] if content else body)
+    if encoding:
+        etag = f"{etag}-{encoding}"
+    headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding'}
+
+    if etag_matches(if_none_match, etag):
+        return 304, b'', headers
+    if encoding:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return 200, body, headers
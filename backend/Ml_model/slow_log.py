@@ -0,0 +1,237 @@
+"""
+Slow Request Log for NewsXpress
+Captures /api/recommendations requests slower than a threshold, with their
+parameters and stage timings, and replays them against a local app
+
+Replay: python slow_log.py [paths...] [--limit N] [--repeat N] [--profile]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+logger = logging.getLogger(__name__)
+
+# Requests at least this slow are captured (0 disables the log)
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
+SLOW_LOG_DIR = os.getenv(
+    'SLOW_LOG_DIR', str(Path(__file__).resolve().parent / 'data' / 'slow_requests')
+)
+# Each worker's log rotates at this size, keeping SLOW_LOG_BACKUPS old files
+SLOW_LOG_MAX_BYTES = int(os.getenv('SLOW_LOG_MAX_BYTES', 10 * 1024 * 1024))
+SLOW_LOG_BACKUPS = int(os.getenv('SLOW_LOG_BACKUPS', 5))
+
+# Request parameters kept for replay
+REPLAY_PARAMS = (
+    'method', 'user_id', 'article_id', 'top_n', 'exclude', 'recent_articles', 'days', 'fields',
+    'paginate', 'cursor'
+)
+# Request headers that change how a request is served (deadline budget,
+# response format, compression), kept so replays take the same path
+REPLAY_HEADERS = ('X-Deadline-Ms', 'Accept', 'Accept-Encoding')
+
+
+class SlowRequestLog:
+    """
+    Layout: <directory>/slow-<pid>.jsonl, rotated to .1 ... .<backups>
+
+    Each worker writes only its own file, so rotation never races between
+    workers. Only slow requests are written, synchronously.
+    """
+
+    def __init__(self, directory=None, threshold_ms=None, max_bytes=None, backups=None):
+        self.directory = Path(directory or SLOW_LOG_DIR)
+        self.threshold_ms = SLOW_REQUEST_MS if threshold_ms is None else threshold_ms
+        self.max_bytes = SLOW_LOG_MAX_BYTES if max_bytes is None else max_bytes
+        self.backups = SLOW_LOG_BACKUPS if backups is None else backups
+        self.captured = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the open file (e.g. in a freshly forked worker)"""
+        self._logger = None
+        self._lock = threading.Lock()
+
+    def _file_logger(self):
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    handler = RotatingFileHandler(
+                        self.directory / f"slow-{os.getpid()}.jsonl",
+                        maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8'
+                    )
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    file_logger = logging.Logger(f"{__name__}.{os.getpid()}")
+                    file_logger.addHandler(handler)
+                    self._logger = file_logger
+        return self._logger
+
+    def is_slow(self, duration_ms):
+        return self.threshold_ms > 0 and duration_ms >= self.threshold_ms
+
+    def record(self, duration_ms, params, stages=None, headers=None, **details):
+        """
+        Capture one request if it was slow
+
+        Args:
+            duration_ms: Request latency
+            params: Request parameters (only REPLAY_PARAMS are kept)
+            stages: dict of stage -> seconds
+            headers: Request headers (only REPLAY_HEADERS are kept)
+            details: Extra fields, e.g. route, status, model_version, cache
+
+        Returns:
+            True if the request was captured
+        """
+        if not self.is_slow(duration_ms):
+            return False
+        kept = {name: params[name] for name in REPLAY_PARAMS if params.get(name) not in (None, '', [])}
+        kept_headers = {name: (headers or {}).get(name) for name in REPLAY_HEADERS}
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "duration_ms": round(duration_ms, 2),
+            **details,
+            "params": kept,
+            "headers": {name: value for name, value in kept_headers.items() if value},
+            "exclude_size": len(params.get('exclude') or []),
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in (stages or {}).items()},
+        }
+        try:
+            self._file_logger().info(json.dumps(entry, default=str))
+            self.captured += 1
+            return True
+        except Exception as e:
+            logger.error(f"Could not write slow request log: {e}")
+            return False
+
+
+def read_entries(paths):
+    """Captured requests from the given slow log files, oldest file first"""
+    entries = []
+    for path in sorted(paths, key=lambda p: Path(p).stat().st_mtime):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed slow log line in {path}")
+    return entries
+
+
+def replay(entries, app, repeat=1, cache_manager=None):
+    """
+    Re-issue captured requests, with their recorded headers, against an app
+    with its test client
+
+    Args:
+        cache_manager: Cache the app uses during the replay; by default one
+                       that never connects, so requests are recomputed
+                       rather than served from (or written to) the live cache
+
+    Returns:
+        One dict per request: captured and replayed latency, status, cache outcome
+    """
+    if cache_manager is None:
+        from cache_manager import CacheManager
+        cache_manager = CacheManager(connect=False)
+    client = app.test_client()
+    previous_cache, app.cache_manager = app.cache_manager, cache_manager
+    results = []
+    try:
+        for entry in entries:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.post(
+                    '/api/recommendations', json=entry.get('params', {}), headers=entry.get('headers', {})
+                )
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                data = response.get_json(silent=True) or {}
+                results.append({
+                    "params": entry.get('params', {}),
+                    "captured_ms": entry.get('duration_ms'),
+                    "replayed_ms": round(elapsed_ms, 2),
+                    "status": response.status_code,
+                    "from_cache": data.get('from_cache'),
+                })
+    finally:
+        app.cache_manager = previous_cache
+    return results
+
+
+# Singleton instance
+_slow_log = None
+
+
+def get_slow_log():
+    """Get or create the slow request log"""
+    global _slow_log
+    if _slow_log is None:
+        _slow_log = SlowRequestLog()
+    return _slow_log
+
+
+def _reset_after_fork():
+    if _slow_log is not None:
+        _slow_log.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def main():
+    """Replay captured slow requests against a local app, optionally under cProfile"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay NewsXpress slow requests')
+    parser.add_argument('paths', nargs='*', help=f'Slow log files (default: all in {SLOW_LOG_DIR})')
+    parser.add_argument('--limit', type=int, help='Replay only the N slowest requests')
+    parser.add_argument('--repeat', type=int, default=1, help='Times to replay each request')
+    parser.add_argument('--profile', action='store_true', help='Print a cProfile report of the replay')
+    args = parser.parse_args()
+
+    paths = args.paths or [str(p) for p in Path(SLOW_LOG_DIR).glob('slow-*.jsonl*')]
+    entries = read_entries(paths)
+    if args.limit:
+        entries = sorted(entries, key=lambda e: e.get('duration_ms', 0), reverse=True)[:args.limit]
+    if not entries:
+        print("No slow requests captured")
+        return
+
+    from api_server import create_app
+    app = create_app()
+    version = app.recommendation_service.model_version
+    captured_versions = {e.get('model_version') for e in entries} - {version}
+    if captured_versions:
+        print(f"Note: replaying on model {version}; captured on {', '.join(map(str, captured_versions))}")
+
+    if args.profile:
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        results = profile.runcall(replay, entries, app, args.repeat)
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(40)
+    else:
+        results = replay(entries, app, args.repeat)
+
+    for result in results:
+        print(
+            f"{result['captured_ms']:>10} ms -> {result['replayed_ms']:>10} ms  "
+            f"{result['status']}  cache={result['from_cache']}  {json.dumps(result['params'])}"
+        )
+
+
+if __name__ == '__main__':
+    main()
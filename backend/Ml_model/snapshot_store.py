@@ -0,0 +1,247 @@
+"""
+Columnar Training Snapshots for NewsXpress
+Stores training tables as date-partitioned NumPy column files, used as the
+DB-outage fallback for training and as input for offline experiments
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from datetime import datetime, date
+import logging
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_PARTITION = 'unknown'
+
+
+def _encode_strings(values, prefix, arrays):
+    """Store strings as one UTF-8 buffer plus character offsets (Arrow-style)"""
+    text = ''.join(values)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    arrays[f'{prefix}.data'] = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+    arrays[f'{prefix}.offsets'] = offsets
+
+
+def _decode_strings(npz, prefix):
+    """Inverse of _encode_strings"""
+    text = npz[f'{prefix}.data'].tobytes().decode('utf-8')
+    offsets = npz[f'{prefix}.offsets']
+    return [text[a:b] for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+def _is_list_like(value):
+    return isinstance(value, (list, tuple, np.ndarray))
+
+
+def _column_kind(series):
+    """Classify a column as timestamp, numeric, list or string"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'timestamp'
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return 'numeric'
+    if any(_is_list_like(v) for v in series):
+        return 'list'
+    return 'string'
+
+
+def write_frame(path, df):
+    """
+    Write a DataFrame as a columnar .npz file
+
+    Args:
+        path: Destination file (written atomically)
+        df: DataFrame with string, numeric, timestamp or list-of-string columns
+    """
+    arrays = {}
+    schema = []
+
+    for column in df.columns:
+        series = df[column]
+        kind = _column_kind(series)
+        entry = {'name': column, 'kind': kind}
+
+        if kind == 'timestamp':
+            tz = getattr(series.dt, 'tz', None)
+            entry['tz'] = str(tz) if tz is not None else None
+            values = series.dt.tz_convert('UTC').dt.tz_localize(None) if tz is not None else series
+            arrays[f'{column}.values'] = values.to_numpy(dtype='datetime64[ns]')
+        elif kind == 'numeric':
+            arrays[f'{column}.values'] = series.to_numpy()
+        else:
+            mask = series.isna().to_numpy()
+            arrays[f'{column}.mask'] = mask
+            if kind == 'string':
+                _encode_strings(
+                    ['' if m else str(v) for v, m in zip(series, mask)], column, arrays
+                )
+            else:
+                lists = [[] if m else [str(item) for item in v] for v, m in zip(series, mask)]
+                list_offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+                np.cumsum([len(items) for items in lists], out=list_offsets[1:])
+                arrays[f'{column}.list_offsets'] = list_offsets
+                _encode_strings(
+                    [item for items in lists for item in items], f'{column}.items', arrays
+                )
+
+        schema.append(entry)
+
+    arrays['__schema__'] = np.frombuffer(json.dumps(schema).encode('utf-8'), dtype=np.uint8)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_frame(path, columns=None):
+    """
+    Read a DataFrame written by write_frame
+
+    Args:
+        path: Snapshot part file
+        columns: Optional subset of columns to decode
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        schema = json.loads(npz['__schema__'].tobytes().decode('utf-8'))
+        data = {}
+
+        for entry in schema:
+            column, kind = entry['name'], entry['kind']
+            if columns is not None and column not in columns:
+                continue
+
+            if kind == 'timestamp':
+                values = pd.Series(npz[f'{column}.values'])
+                if entry.get('tz'):
+                    values = values.dt.tz_localize('UTC').dt.tz_convert(entry['tz'])
+                data[column] = values
+            elif kind == 'numeric':
+                data[column] = pd.Series(npz[f'{column}.values'])
+            else:
+                mask = npz[f'{column}.mask']
+                if kind == 'string':
+                    values = _decode_strings(npz, column)
+                else:
+                    items = _decode_strings(npz, f'{column}.items')
+                    offsets = npz[f'{column}.list_offsets'].tolist()
+                    values = [items[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+                series = pd.Series(values, dtype=object)
+                series[mask] = None
+                data[column] = series
+
+    return pd.DataFrame(data)
+
+
+class SnapshotStore:
+    """
+    Date-partitioned columnar snapshots
+
+    Layout: <root>/<table>/date=YYYY-MM-DD/part-<timestamp>.npz
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def partitions(self, table):
+        """List partition dates (as strings) for a table, oldest first"""
+        table_dir = self.root / table
+        if not table_dir.exists():
+            return []
+        return sorted(
+            p.name.split('=', 1)[1] for p in table_dir.iterdir()
+            if p.is_dir() and p.name.startswith('date=')
+        )
+
+    def _part_files(self, table, start=None, end=None):
+        for partition in self.partitions(table):
+            if partition != UNKNOWN_PARTITION:
+                if start is not None and partition < str(start):
+                    continue
+                if end is not None and partition > str(end):
+                    continue
+            yield from sorted((self.root / table / f'date={partition}').glob('part-*.npz'))
+
+    def _new_part_path(self, table, partition):
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        return self.root / table / f'date={partition}' / f'part-{stamp}-{os.getpid()}.npz'
+
+    def write_partition(self, table, df, partition=None):
+        """
+        Replace one partition with df (default partition: today)
+
+        Returns:
+            Number of rows written
+        """
+        partition = str(partition or date.today())
+        partition_dir = self.root / table / f'date={partition}'
+        old_parts = list(partition_dir.glob('part-*.npz')) if partition_dir.exists() else []
+
+        write_frame(self._new_part_path(table, partition), df)
+        for old in old_parts:
+            old.unlink(missing_ok=True)
+        return len(df)
+
+    def keys(self, table, key):
+        """Set of key values already stored for a table"""
+        existing = set()
+        for part in self._part_files(table):
+            existing.update(read_frame(part, columns=[key])[key])
+        return existing
+
+    def append_new(self, table, df, key, partition_column, known_keys=None):
+        """
+        Append rows whose key is not in the snapshot yet, partitioned by the
+        date of partition_column
+
+        Args:
+            known_keys: Optional set from keys(); updated in place so repeated
+                        appends (e.g. per streamed chunk) skip re-reading the store
+
+        Returns:
+            Number of rows written
+        """
+        if df is None or len(df) == 0:
+            return 0
+
+        if known_keys is None:
+            known_keys = self.keys(table, key)
+        new_rows = df[~df[key].isin(known_keys)].drop_duplicates(subset=key, keep='first')
+        if len(new_rows) == 0:
+            return 0
+        known_keys.update(new_rows[key])
+
+        dates = pd.to_datetime(new_rows[partition_column], utc=True, errors='coerce')
+        partition_keys = dates.dt.strftime('%Y-%m-%d').fillna(UNKNOWN_PARTITION)
+        for partition, rows in new_rows.groupby(partition_keys.to_numpy(), sort=True):
+            write_frame(self._new_part_path(table, partition), rows.reset_index(drop=True))
+
+        logger.info(f"Appended {len(new_rows)} new rows to {table} snapshot")
+        return len(new_rows)
+
+    def read(self, table, start=None, end=None, latest_partition=False, columns=None):
+        """
+        Read a table from its snapshot
+
+        Args:
+            table: Table name
+            start / end: Optional inclusive partition date bounds
+            latest_partition: Only read the newest partition (full-table snapshots)
+            columns: Optional subset of columns
+
+        Returns:
+            DataFrame, or None if the table has no snapshot
+        """
+        parts = list(self._part_files(table, start, end))
+        if latest_partition and parts:
+            newest = parts[-1].parent
+            parts = [p for p in parts if p.parent == newest]
+        if not parts:
+            return None
+
+        frames = [read_frame(part, columns=columns) for part in parts]
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,237 @@
+"""
+Worker Metrics for NewsXpress
+Per-process registries that record into lock-free per-thread shards and
+publish snapshots to <directory>/<pid>.json, so any gunicorn worker can
+report totals for the whole server, including workers that have exited
+"""
+import os
+import json
+import atexit
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from contextlib import contextmanager
+import logging
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: exited workers' snapshots are kept, not folded
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Totals of exited workers, so counters never go backwards when one leaves
+RETAINED_NAME = 'retained.json'
+LOCK_NAME = '.lock'
+
+
+def write_worker_snapshot(directory, snapshot):
+    """Atomically publish this worker's snapshot as <directory>/<pid>.json"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{os.getpid()}.json"
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps(snapshot))
+    os.replace(tmp_path, path)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _directory_lock(directory):
+    """Serialize folding between workers sharing a metrics directory"""
+    with open(Path(directory) / LOCK_NAME, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fold_worker_snapshots(directory, paths, merge):
+    """
+    Add worker snapshots into the retained totals and delete them
+
+    Args:
+        paths: Snapshot files of workers that are gone
+        merge: Function summing a list of snapshots into one
+    """
+    directory = Path(directory)
+    retained_path = directory / RETAINED_NAME
+    with _directory_lock(directory):
+        snapshots = [json.loads(retained_path.read_text())] if retained_path.exists() else []
+        folded = []
+        for path in paths:
+            try:
+                snapshots.append(json.loads(Path(path).read_text()))
+                folded.append(Path(path))
+            except FileNotFoundError:
+                continue  # another worker folded it first
+            except ValueError as e:
+                logger.warning(f"Not retaining unreadable metrics file {Path(path).name}: {e}")
+        if not folded:
+            return
+        tmp_path = retained_path.with_name(retained_path.name + '.tmp')
+        tmp_path.write_text(json.dumps(merge(snapshots)))
+        os.replace(tmp_path, retained_path)
+        for path in folded:
+            path.unlink(missing_ok=True)
+
+
+def read_worker_snapshots(directory, merge=None):
+    """
+    Snapshots of all workers, plus the retained totals of exited ones
+
+    Snapshots of workers whose process is gone are folded into the retained
+    totals when merge is given (and the platform has fcntl), otherwise they
+    are included as they are; either way their counts are never dropped.
+
+    Returns:
+        (list of snapshots, number of live workers)
+    """
+    directory = Path(directory)
+    live, exited = [], []
+    for path in directory.glob('*.json'):
+        if path.name == RETAINED_NAME:
+            continue
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+        if os.name == 'posix' and not _process_alive(pid):
+            exited.append(path)
+        else:
+            live.append(path)
+
+    if exited and merge is not None and fcntl is not None:
+        try:
+            fold_worker_snapshots(directory, exited, merge)
+            exited = []
+        except Exception as e:
+            logger.warning(f"Could not retain exited workers' metrics: {e}")
+
+    snapshots = []
+    for path in [directory / RETAINED_NAME] + exited + live:
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.warning(f"Skipping unreadable metrics file {path.name}: {e}")
+    return snapshots, len(live)
+
+
+class WorkerRegistry(ABC):
+    """
+    Base for per-worker metrics registries
+
+    Every thread records into its own shard, so the hot path takes no lock.
+    Once something is recorded, a background thread publishes the snapshot
+    every flush_seconds (and at exit), so idle workers stay current, and
+    aggregate() merges all workers' snapshots. Subclasses define the shard
+    layout, snapshot() and merge().
+    """
+    thread_name = 'metrics-flusher'
+
+    def __init__(self, directory, flush_seconds):
+        self.directory = Path(directory)
+        self.flush_seconds = flush_seconds
+        self._stop = None
+        self._atexit_registered = False
+        self.reset()
+
+    def reset(self):
+        """Drop all values and stop flushing (e.g. in a freshly forked worker)"""
+        if self._stop is not None:
+            self._stop.set()
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+        # Until the first flush, a <pid>.json already on disk belongs to an
+        # earlier process with the same pid (or to values dropped by reset)
+        self._published = False
+
+    @abstractmethod
+    def _new_shard(self):
+        """Empty per-thread shard"""
+
+    @abstractmethod
+    def snapshot(self):
+        """This process's values in a JSON-friendly form"""
+
+    @abstractmethod
+    def merge(self, snapshots):
+        """Sum several snapshots into one"""
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = self._new_shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._ensure_flusher()
+        return shard
+
+    def _shard_list(self):
+        with self._shards_lock:
+            return list(self._shards)
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop,), name=self.thread_name, daemon=True
+                )
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.flush)
+                    self._atexit_registered = True
+
+    def _run(self, stop):
+        while not stop.wait(self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        """Write this worker's snapshot atomically"""
+        with self._flush_lock:
+            try:
+                if not self._published:
+                    self._retain_previous()
+                write_worker_snapshot(self.directory, self.snapshot())
+                self._published = True
+                return True
+            except Exception as e:
+                logger.error(f"Error writing {self.thread_name} snapshot: {e}")
+                return False
+
+    def _retain_previous(self):
+        previous = self.directory / f"{os.getpid()}.json"
+        if fcntl is not None and previous.exists():
+            fold_worker_snapshots(self.directory, [previous], self.merge)
+
+    def aggregate(self):
+        """
+        Totals across all workers, live and exited
+
+        Returns:
+            (merged snapshot, number of live workers included)
+        """
+        if not self.flush():
+            return self.snapshot(), 1
+
+        snapshots, workers = read_worker_snapshots(self.directory, self.merge)
+        return self.merge(snapshots), workers
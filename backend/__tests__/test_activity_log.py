@@ -0,0 +1,81 @@
+import json
+import os
+import time
+import pytest
+
+from backend.Ml_model.activity_log import ActivityLogWriter, BatchWriter
+
+
+def read_events(directory):
+    events = []
+    for path in sorted(directory.glob("activity-*.jsonl")):
+        events.extend(json.loads(line) for line in path.read_text().splitlines())
+    return events
+
+
+# SUMMARY: Ensures queued events are written in one batch to a per-worker segment.
+# EDGE CASE: Events without a timestamp get one when queued, not when written.
+def test_flush_writes_batch_to_worker_segment(tmp_path):
+    writer = ActivityLogWriter(directory=tmp_path, flush_seconds=3600)
+
+    assert writer.submit({"article_id": "a1", "activity_type": "view"}) is True
+    assert writer.submit({"article_id": "a2", "activity_type": "click", "timestamp": "t"}) is True
+    writer.close()
+
+    segments = list(tmp_path.glob("activity-*.jsonl"))
+    assert len(segments) == 1
+    assert f"-{os.getpid()}-" in segments[0].name
+    events = read_events(tmp_path)
+    assert [e["article_id"] for e in events] == ["a1", "a2"]
+    assert "timestamp" in events[0] and events[1]["timestamp"] == "t"
+    assert writer.stats() == {"queued": 0, "written": 2, "dropped": 0}
+
+
+# SUMMARY: Ensures the background thread flushes once a batch is full.
+# EDGE CASE: flush_events reached long before flush_seconds.
+def test_background_flush_on_size(tmp_path):
+    writer = ActivityLogWriter(directory=tmp_path, flush_events=3, flush_seconds=30)
+
+    for i in range(3):
+        writer.submit({"article_id": f"a{i}", "activity_type": "view"})
+
+    deadline = time.monotonic() + 5
+    while writer.written < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(read_events(tmp_path)) == 3
+
+
+# SUMMARY: Ensures a full queue sheds events instead of blocking the request.
+# EDGE CASE: Dropped events are counted and submit() reports the drop.
+def test_full_queue_drops_events(tmp_path, monkeypatch):
+    writer = ActivityLogWriter(directory=tmp_path, max_queue=2, flush_seconds=3600)
+    monkeypatch.setattr(writer, "_ensure_thread", lambda: None)
+
+    results = [writer.submit({"article_id": f"a{i}", "activity_type": "view"}) for i in range(3)]
+
+    assert results == [True, True, False]
+    assert writer.stats()["dropped"] == 1
+
+
+# SUMMARY: Ensures segments rotate when they would exceed the size limit.
+# EDGE CASE: A single batch is never split across segments.
+def test_segments_rotate_by_size(tmp_path):
+    writer = ActivityLogWriter(directory=tmp_path, flush_seconds=3600, max_segment_bytes=250)
+
+    for i in range(6):
+        writer._write([{"article_id": f"a{i}", "activity_type": "view", "pad": "x" * 60}])
+
+    segments = sorted(tmp_path.glob("activity-*.jsonl"))
+    assert len(segments) == 3
+    assert all(len(s.read_text().splitlines()) == 2 for s in segments)
+    assert [e["article_id"] for e in read_events(tmp_path)] == [f"a{i}" for i in range(6)]
+
+
+# SUMMARY: BatchWriter subclasses must implement _write.
+# EDGE CASE: A subclass missing it fails when created, not on its first flush.
+def test_batch_writer_requires_write():
+    class Incomplete(BatchWriter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
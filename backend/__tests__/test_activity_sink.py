@@ -0,0 +1,135 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+import pytest
+
+from backend.Ml_model.activity_sink import ActivityEventSink, event_row
+
+T1, T1_UTC = "2026-01-01T12:00:00", "2026-01-01T12:00:00+00:00"
+T2, T2_UTC = "2026-01-01T12:00:05Z", "2026-01-01T12:00:05+00:00"
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "events.db"
+
+    @contextmanager
+    def connect():
+        connection = sqlite3.connect(path)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    return path, connect
+
+
+def rows(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute(
+            "SELECT user_id, article_id, activity_type, occurred_at, payload FROM activity_events"
+        ).fetchall()
+
+
+# SUMMARY: Ensures events are loaded into the table in one batch.
+# EDGE CASE: The table is created on first write; anonymous events keep a NULL user_id.
+def test_sink_writes_batches(db):
+    path, connect = db
+    sink = ActivityEventSink(connection_factory=connect, flush_seconds=3600)
+
+    sink.submit({"user_id": "u1", "article_id": "a1", "activity_type": "view", "timestamp": T1})
+    sink.submit({"article_id": "a2", "activity_type": "click", "timestamp": T2})
+    sink.close()
+
+    stored = rows(path)
+    assert [r[:4] for r in stored] == [("u1", "a1", "view", T1_UTC), (None, "a2", "click", T2_UTC)]
+    assert json.loads(stored[0][4])["user_id"] == "u1"
+    assert sink.stats()["written"] == 2
+
+
+# SUMMARY: Ensures failed writes are retried with backoff.
+# EDGE CASE: A transient failure does not lose the batch.
+def test_sink_retries_transient_failures(db):
+    path, connect = db
+    attempts = []
+
+    @contextmanager
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("server closed the connection")
+        with connect() as connection:
+            yield connection
+
+    sink = ActivityEventSink(connection_factory=flaky, flush_seconds=3600, retry_seconds=0)
+    sink._write([{"article_id": "a1", "activity_type": "view"}])
+
+    assert len(attempts) == 2
+    assert len(rows(path)) == 1
+
+
+# SUMMARY: Ensures a batch is dropped (and counted) after the last retry.
+# EDGE CASE: Malformed events are skipped without failing the batch.
+def test_sink_drops_after_retries():
+    @contextmanager
+    def down():
+        raise sqlite3.OperationalError("connection refused")
+        yield
+
+    sink = ActivityEventSink(connection_factory=down, flush_seconds=3600, retries=2, retry_seconds=0)
+    sink._write([{"article_id": "a1", "activity_type": "view"}, {"article_id": "a2"}])
+
+    assert sink.stats() == {"queued": 0, "written": 0, "dropped": 2}
+
+
+# SUMMARY: Ensures rows are built from the tracked event fields.
+# EDGE CASE: Non-string ids are stored as text.
+def test_event_row():
+    row = event_row({"user_id": 7, "article_id": 42, "activity_type": "view", "timestamp": T1})
+
+    assert row[:4] == ("7", "42", "view", T1_UTC)
+
+
+# SUMMARY: Ensures one event with a bad timestamp does not fail its whole batch.
+# EDGE CASE: Unparseable times fall back to the server time; offsets and epoch ms become UTC.
+def test_bad_timestamp_does_not_fail_batch(db):
+    path, connect = db
+    sink = ActivityEventSink(connection_factory=connect, flush_seconds=3600, retry_seconds=0)
+
+    sink._write([
+        {"article_id": "a1", "activity_type": "view", "timestamp": "2026-01-01T14:00:00+02:00"},
+        {"article_id": "a2", "activity_type": "view", "timestamp": "yesterday-ish"},
+        {"article_id": "a3", "activity_type": "view", "timestamp": 1767268800000},
+    ])
+
+    stored = rows(path)
+    assert sink.stats()["written"] == 3
+    assert stored[0][3] == T1_UTC
+    assert datetime.fromisoformat(stored[1][3]).tzinfo is not None
+    assert json.loads(stored[1][4])["timestamp"] == "yesterday-ish"
+    assert stored[2][3] == T1_UTC
+
+
+# SUMMARY: Ensures Postgres connections are loaded with COPY, not INSERTs.
+# EDGE CASE: NULL user_id is sent as an unquoted empty CSV field.
+def test_sink_uses_copy_on_postgres():
+    from unittest.mock import MagicMock
+
+    connection = MagicMock()
+    cursor = connection.cursor.return_value
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, buffer: copied.append((sql, buffer.read()))
+
+    @contextmanager
+    def connect():
+        yield connection
+
+    sink = ActivityEventSink(connection_factory=connect, flush_seconds=3600)
+    sink._write([{"article_id": "a1", "activity_type": "view", "timestamp": T1}])
+
+    sql, data = copied[0]
+    assert sql.startswith("COPY activity_events (user_id, article_id, activity_type, occurred_at, payload)")
+    assert data.startswith(f",a1,view,{T1_UTC},")
+    cursor.executemany.assert_not_called()
+    connection.commit.assert_called_once()
@@ -0,0 +1,68 @@
+import time
+import pytest
+
+from backend.Ml_model.admission import AdmissionLimiter, CostEstimator, Deadline
+
+
+# SUMMARY: Ensures X-Deadline-Ms values become budgets from the request start.
+# EDGE CASE: Missing, non-numeric and non-positive values mean no deadline.
+def test_deadline_from_header():
+    started = time.perf_counter()
+    deadline = Deadline.from_header("250", started)
+
+    assert deadline.expires_at == pytest.approx(started + 0.25)
+    assert Deadline.from_header(None) is None
+    assert Deadline.from_header("soon") is None
+    assert Deadline.from_header("0") is None
+
+
+# SUMMARY: Ensures work is only allowed if it fits before the deadline.
+# EDGE CASE: The safety margin counts against the budget too.
+def test_deadline_allows():
+    deadline = Deadline(1000)
+
+    assert deadline.allows(0.5)
+    assert not deadline.allows(0.995)
+    assert not Deadline(1, started=time.perf_counter() - 1).allows(0)
+
+
+# SUMMARY: Ensures cost estimates follow observed scoring times.
+# EDGE CASE: Unknown methods estimate as free so they always get a first run.
+def test_cost_estimator():
+    estimator = CostEstimator(alpha=0.5)
+
+    assert estimator.estimate("hybrid") == 0.0
+    estimator.observe("hybrid", 0.2)
+    estimator.observe("hybrid", 0.4)
+    assert estimator.estimate("hybrid") == pytest.approx(0.3)
+
+
+# SUMMARY: Ensures an outlier estimate recovers through periodic probes.
+# EDGE CASE: Only one probe per interval; the probe's time replaces the estimate.
+def test_cost_estimator_probe_recovers(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    estimator = CostEstimator(alpha=0.2, probe_seconds=5)
+    estimator.observe("hybrid", 10.0)
+
+    assert estimator.try_probe("hybrid") is False
+    now[0] += 5
+    assert estimator.try_probe("hybrid") is True
+    assert estimator.try_probe("hybrid") is False
+
+    estimator.observe("hybrid", 0.05, probe=True)
+    assert estimator.estimate("hybrid") == pytest.approx(0.05)
+
+
+# SUMMARY: Ensures the limiter admits up to its limit and counts the rest.
+# EDGE CASE: A limit of 0 admits everything.
+def test_admission_limiter():
+    limiter = AdmissionLimiter(limit=1)
+    assert limiter.try_acquire() is True
+    assert limiter.try_acquire() is False
+    assert limiter.shed == 1
+    limiter.release()
+    assert limiter.try_acquire() is True
+
+    unlimited = AdmissionLimiter(limit=0)
+    assert all(unlimited.try_acquire() for _ in range(100))
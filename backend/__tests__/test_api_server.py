@@ -306,3 +306,539 @@ def test_cors_allowed_origins(monkeypatch):
     # Simple request to ensure app starts with CORS configured
     resp = client.get("/health")
     assert resp.status_code == 200
+
+
+# SUMMARY: Importing the module (as asgi_server does) must not build the Flask app.
+# EDGE CASE: The WSGI entry point api_server:app still resolves, once.
+def test_default_app_is_created_on_first_access(monkeypatch):
+    monkeypatch.delitem(vars(api), "app", raising=False)
+    created = []
+    monkeypatch.setattr(api, "create_app", lambda: created.append(object()) or created[-1])
+
+    assert "app" not in vars(api)
+    first = getattr(api, "app")
+
+    assert created == [first]
+    assert api.app is first
+    assert len(created) == 1
+    monkeypatch.delitem(vars(api), "app")
+
+
+@pytest.fixture
+def versioned_app(fake_recommendation_service, fake_cache_manager):
+    """App with fake services attached directly to the app object."""
+    flask_app = create_app()
+    flask_app.config["TESTING"] = True
+    fake_recommendation_service.model_version = "20260101T000000"
+    flask_app.recommendation_service = fake_recommendation_service
+    fake_recommendation_service.compact_recommendations.side_effect = lambda recs: recs
+    fake_recommendation_service.hydrate_recommendations.side_effect = lambda recs, **kwargs: recs
+    fake_cache_manager.get_or_compute.side_effect = (
+        lambda key, compute, ttl_seconds=3600, tags=None: (compute(), False)
+    )
+    fake_cache_manager.get_or_compute_many.side_effect = (
+        lambda requests: [(compute(), False) for _, compute, _, _ in requests]
+    )
+    flask_app.cache_manager = fake_cache_manager
+    flask_app.model_reloader.interval = 0
+    return flask_app
+
+
+def test_recommendation_cache_keys_include_model_version(versioned_app, fake_cache_manager):
+    client = versioned_app.test_client()
+
+    client.get("/api/recommendations?method=hybrid&user_id=u1&top_n=5")
+    client.get("/api/recommendations/trending?top_n=3")
+
+    calls = fake_cache_manager.get_or_compute.call_args_list
+    assert [c.args[0] for c in calls] == [
+        "rec:v=20260101T000000:hybrid:u=u1:a=None:d=100",
+        "rec:v=20260101T000000:trending:days=7:d=100",
+    ]
+    assert calls[0].kwargs["tags"] == ["user:u1"]
+
+
+def test_trending_shares_one_cache_entry(versioned_app, fake_cache_manager):
+    client = versioned_app.test_client()
+
+    client.get("/api/recommendations?method=trending&days=3&top_n=5")
+    client.get("/api/recommendations/trending?days=3&top_n=8")
+
+    calls = fake_cache_manager.get_or_compute.call_args_list
+    assert [c.args[0] for c in calls] == ["rec:v=20260101T000000:trending:days=3:d=100"] * 2
+    assert calls[0].kwargs["ttl_seconds"] == calls[1].kwargs["ttl_seconds"] == api.TRENDING_CACHE_TTL
+
+
+def test_model_reloader_switches_to_new_bundle(versioned_app, fake_cache_manager, monkeypatch):
+    reloader = versioned_app.model_reloader
+    monkeypatch.setattr(reloader.bundle, "current_version", lambda: "20260201T000000")
+
+    new_service = MagicMock()
+    new_service.load_models.return_value = True
+    new_service.model_version = "20260201T000000"
+    monkeypatch.setattr(api, "RecommendationService", lambda: new_service)
+
+    assert reloader.reload() is True
+    assert versioned_app.recommendation_service is new_service
+    assert fake_cache_manager.model_version == "20260201T000000"
+
+    # Already serving the current bundle -> nothing to do
+    assert reloader.reload() is False
+
+
+def test_model_reloader_keeps_old_models_on_failed_load(versioned_app, fake_recommendation_service, monkeypatch):
+    reloader = versioned_app.model_reloader
+    monkeypatch.setattr(reloader.bundle, "current_version", lambda: "20260201T000000")
+
+    broken = MagicMock()
+    broken.load_models.return_value = False
+    monkeypatch.setattr(api, "RecommendationService", lambda: broken)
+
+    assert reloader.reload() is False
+    assert versioned_app.recommendation_service is fake_recommendation_service
+
+
+def test_models_info_reports_loaded_version(versioned_app, monkeypatch):
+    # The current link already points at a newer bundle the reloader has not loaded yet
+    monkeypatch.setattr(api.ModelBundle, "current_version", lambda self: "20260201T000000")
+    monkeypatch.setattr(api.ModelBundle, "published_versions", lambda self: ["20260201T000000", "20260101T000000"])
+    client = versioned_app.test_client()
+
+    info = client.get("/api/models/info").get_json()["info"]
+
+    assert info["model_version"] == "20260101T000000"
+    assert info["current_version"] == "20260201T000000"
+
+
+def test_recommendations_report_cache_hits(versioned_app, fake_cache_manager, fake_recommendation_service):
+    fake_cache_manager.get_or_compute.side_effect = None
+    fake_cache_manager.get_or_compute.return_value = ([{"id": "cached1"}], True)
+    client = versioned_app.test_client()
+
+    data = client.get("/api/recommendations?method=content&article_id=a1").get_json()
+
+    assert data["from_cache"] is True
+    assert data["recommendations"] == [{"id": "cached1"}]
+    fake_recommendation_service.get_similar_articles.assert_not_called()
+
+
+def test_batch_recommendations(versioned_app, fake_cache_manager):
+    client = versioned_app.test_client()
+
+    resp = client.post("/api/recommendations/batch", json={"requests": [
+        {"method": "content", "article_id": "a1", "top_n": 3},
+        {"method": "hybrid", "user_id": "u1"},
+    ]})
+
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [r["method"] for r in data["results"]] == ["content", "hybrid"]
+    assert data["results"][0]["recommendations"] == [{"id": "b", "score": 0.9}]
+    (requests,), _ = fake_cache_manager.get_or_compute_many.call_args
+    assert [r[0] for r in requests] == [
+        "rec:v=20260101T000000:content:u=None:a=a1:d=100",
+        "rec:v=20260101T000000:hybrid:u=u1:a=None:d=100",
+    ]
+    fake_cache_manager.get_or_compute_many.assert_called_once()
+
+
+def test_ranked_list_shared_across_top_n_and_exclude(versioned_app, fake_cache_manager, fake_recommendation_service):
+    fake_cache_manager.get_or_compute.side_effect = None
+    fake_cache_manager.get_or_compute.return_value = ([{"id": "a"}, {"id": "b"}, {"id": "c"}], True)
+    client = versioned_app.test_client()
+
+    first = client.get("/api/recommendations?method=collaborative&user_id=u1&top_n=2").get_json()
+    second = client.get("/api/recommendations?method=collaborative&user_id=u1&top_n=1&exclude=a").get_json()
+
+    assert [r["id"] for r in first["recommendations"]] == ["a", "b"]
+    assert [r["id"] for r in second["recommendations"]] == ["b"]
+    keys = {c.args[0] for c in fake_cache_manager.get_or_compute.call_args_list}
+    assert keys == {"rec:v=20260101T000000:collaborative:u=u1:a=None:d=100"}
+
+
+def test_ranked_list_computed_deep_and_unfiltered(versioned_app, fake_recommendation_service):
+    client = versioned_app.test_client()
+
+    client.get("/api/recommendations?method=content&article_id=a1&top_n=3&exclude=x")
+
+    fake_recommendation_service.get_similar_articles.assert_called_once_with(
+        article_id="a1", top_n=api.RANKED_LIST_DEPTH, exclude_ids=None
+    )
+
+
+def test_requests_deeper_than_ranked_list_bypass_cache(versioned_app, fake_cache_manager, fake_recommendation_service):
+    client = versioned_app.test_client()
+
+    resp = client.get(f"/api/recommendations?method=content&article_id=a1&top_n={api.RANKED_LIST_DEPTH + 1}")
+
+    assert resp.status_code == 200
+    fake_cache_manager.get_or_compute.assert_not_called()
+    fake_recommendation_service.get_similar_articles.assert_called_once_with(
+        article_id="a1", top_n=api.RANKED_LIST_DEPTH + 1, exclude_ids=[]
+    )
+
+
+def test_batch_recommendations_validation(versioned_app, monkeypatch):
+    client = versioned_app.test_client()
+    monkeypatch.setattr(api, "BATCH_MAX_REQUESTS", 1)
+
+    assert client.post("/api/recommendations/batch", json={}).status_code == 400
+    resp = client.post("/api/recommendations/batch", json={"requests": [{}, {}]})
+    assert resp.status_code == 400
+
+
+def test_track_activity_is_buffered(versioned_app, monkeypatch, tmp_path):
+    from backend.Ml_model.activity_log import ActivityLogWriter
+
+    writer = ActivityLogWriter(directory=tmp_path, flush_seconds=3600)
+    monkeypatch.setattr(writer, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(api, "get_activity_writer", lambda: writer)
+    client = versioned_app.test_client()
+
+    resp = client.post("/api/track", json={"article_id": "a1", "activity_type": "view"})
+
+    assert resp.status_code == 200
+    assert writer.stats()["queued"] == 1
+    assert not list(tmp_path.glob("*.jsonl"))
+
+    writer.max_queue = 1
+    writer._reset()
+    writer.submit({"article_id": "a0", "activity_type": "view"})
+    resp = client.post("/api/track", json={"article_id": "a1", "activity_type": "view"})
+    assert resp.status_code == 503
+
+
+def test_metrics_endpoint_reports_routes_methods_and_stages(versioned_app, tmp_path, monkeypatch):
+    metrics_module = importlib.import_module(api.get_metrics.__module__)
+    monkeypatch.setattr(metrics_module, "_metrics", metrics_module.MetricsRegistry(tmp_path))
+    client = versioned_app.test_client()
+
+    client.get("/api/recommendations?method=hybrid&user_id=u1")
+    client.get("/api/recommendations?method=content&article_id=a1&top_n=200")
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert (
+        'newsxpress_http_requests_total{http_method="GET",route="/api/recommendations",status="200"} 2'
+        in text
+    )
+    assert 'newsxpress_recommendations_total{cache="miss",method="hybrid"} 1' in text
+    assert 'newsxpress_recommendations_total{cache="bypass",method="content"} 1' in text
+    assert 'newsxpress_recommendation_duration_seconds_count{method="hybrid"} 1' in text
+    assert 'newsxpress_stage_duration_seconds_count{stage="serialization"} 2' in text
+
+
+@pytest.fixture
+def profiler_token(monkeypatch):
+    profiler_module = importlib.import_module(api.authorized.__module__)
+    monkeypatch.setattr(profiler_module, "PROFILER_ADMIN_TOKEN", "s3cret")
+    return "s3cret"
+
+
+def test_profile_endpoint_is_off_by_default(versioned_app):
+    client = versioned_app.test_client()
+
+    assert client.get("/api/debug/profile?seconds=0.01").status_code == 404
+    # Without a configured token X-Profile is ignored
+    resp = client.get("/health", headers={"X-Profile": "1", "X-Admin-Token": ""})
+    assert resp.is_json
+
+
+def test_profile_endpoint_requires_admin_token(versioned_app, profiler_token):
+    client = versioned_app.test_client()
+
+    assert client.get("/api/debug/profile?seconds=0.01").status_code == 403
+    assert client.get(
+        "/api/debug/profile?seconds=600", headers={"X-Admin-Token": profiler_token}
+    ).status_code == 400
+
+    resp = client.get(
+        "/api/debug/profile?seconds=0.02&interval_ms=5", headers={"X-Admin-Token": profiler_token}
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+
+
+def test_profile_header_returns_pstats_report(versioned_app, profiler_token):
+    client = versioned_app.test_client()
+
+    resp = client.get(
+        "/api/recommendations?method=hybrid&user_id=u1",
+        headers={"X-Profile": "1", "X-Admin-Token": profiler_token}
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers["X-Profiled-Status"] == "200"
+    assert "function calls" in resp.get_data(as_text=True)
+    # The next request is served normally
+    assert client.get("/api/recommendations?method=hybrid&user_id=u1").is_json
+
+
+def test_slow_requests_are_captured_and_replayable(versioned_app, fake_recommendation_service, fake_cache_manager,
+                                                  tmp_path, monkeypatch):
+    slow_log_module = importlib.import_module(api.get_slow_log.__module__)
+    monkeypatch.setattr(slow_log_module, "_slow_log", slow_log_module.SlowRequestLog(tmp_path, threshold_ms=0.001))
+    client = versioned_app.test_client()
+
+    client.get(
+        "/api/recommendations?method=collaborative&user_id=u1&top_n=3&exclude=x",
+        headers={"X-Deadline-Ms": "5000", "X-Admin-Token": "secret"}
+    )
+
+    [entry] = slow_log_module.read_entries(list(tmp_path.glob("slow-*.jsonl")))
+    assert entry["params"] == {"method": "collaborative", "user_id": "u1", "top_n": "3", "exclude": ["x"]}
+    assert entry["headers"] == {"X-Deadline-Ms": "5000"}
+    assert (entry["model_version"], entry["cache"], entry["status"]) == ("20260101T000000", "miss", 200)
+    assert "serialization" in entry["stages_ms"]
+
+    fake_recommendation_service.get_collaborative_recommendations.reset_mock()
+    fake_cache_manager.reset_mock()
+    [result] = slow_log_module.replay([entry], versioned_app)
+
+    assert result["status"] == 200
+    fake_recommendation_service.get_collaborative_recommendations.assert_called_once()
+    # Replays are recomputed, never served from or written to the live cache
+    fake_cache_manager.get_or_compute.assert_not_called()
+    assert versioned_app.cache_manager is fake_cache_manager
+    # The replay was captured too, with the recorded deadline forwarded
+    replayed = slow_log_module.read_entries(list(tmp_path.glob("slow-*.jsonl")))[-1]
+    assert replayed["headers"] == {"X-Deadline-Ms": "5000"}
+
+
+def test_recommendations_revalidate_with_etag(versioned_app, fake_recommendation_service):
+    client = versioned_app.test_client()
+
+    first = client.get("/api/recommendations/trending?top_n=1")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert "Accept-Encoding" in first.headers["Vary"]
+
+    again = client.get("/api/recommendations/trending?top_n=1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    # New content means a new ETag and a full response
+    fake_recommendation_service.get_trending_articles.return_value = [{"id": "t2"}]
+    changed = client.get("/api/recommendations/trending?top_n=1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+# SUMMARY: A cache miss and the cache hit after it are the same content.
+# EDGE CASE: Only from_cache differs between the bodies, so the client's copy revalidates.
+def test_etag_survives_cache_miss_then_hit(versioned_app, fake_cache_manager):
+    cached = {}
+
+    def get_or_compute(key, compute, ttl_seconds=3600, tags=None):
+        if key in cached:
+            return cached[key], True
+        cached[key] = compute()
+        return cached[key], False
+
+    fake_cache_manager.get_or_compute.side_effect = get_or_compute
+    client = versioned_app.test_client()
+
+    miss = client.get("/api/recommendations?method=hybrid&user_id=u1")
+    hit = client.get("/api/recommendations?method=hybrid&user_id=u1")
+    revalidated = client.get(
+        "/api/recommendations?method=hybrid&user_id=u1", headers={"If-None-Match": miss.headers["ETag"]}
+    )
+
+    assert (miss.get_json()["from_cache"], hit.get_json()["from_cache"]) == (False, True)
+    assert hit.headers["ETag"] == miss.headers["ETag"]
+    assert revalidated.status_code == 304
+
+
+def test_large_recommendation_responses_are_gzipped(versioned_app, fake_recommendation_service):
+    import gzip
+    fake_recommendation_service.get_hybrid_recommendations.return_value = [
+        {"id": f"a{i}", "title": "x" * 50} for i in range(50)
+    ]
+    client = versioned_app.test_client()
+
+    resp = client.get("/api/recommendations?method=hybrid&user_id=u1&top_n=50", headers={"Accept-Encoding": "gzip"})
+
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(resp.data))["recommendations"]) == 50
+    # Error responses and other routes are left alone
+    assert "ETag" not in client.get("/health").headers
+
+
+def test_fields_projection_skips_hydration_for_compact_fields(versioned_app, fake_recommendation_service, monkeypatch):
+    monkeypatch.setattr(api, "CACHE_COMPACT_RESULTS", True)
+    fake_recommendation_service.get_similar_articles.return_value = [
+        {"id": "b", "similarity_score": 0.9}, {"id": "c", "similarity_score": 0.8}
+    ]
+    fake_recommendation_service.hydrate_recommendations.side_effect = (
+        lambda recs: [{**rec, "title": f"T{rec['id']}", "url": "u"} for rec in recs]
+    )
+    client = versioned_app.test_client()
+
+    data = client.get("/api/recommendations?method=content&article_id=a1&fields=similarity_score").get_json()
+    assert data["recommendations"] == [{"id": "b", "similarity_score": 0.9}, {"id": "c", "similarity_score": 0.8}]
+    fake_recommendation_service.hydrate_recommendations.assert_not_called()
+
+    data = client.post("/api/recommendations", json={
+        "method": "content", "article_id": "a1", "top_n": 1, "fields": ["title"]
+    }).get_json()
+    assert data["recommendations"] == [{"id": "b", "title": "Tb"}]
+
+
+def test_msgpack_content_negotiation(versioned_app, monkeypatch):
+    encoding_module = importlib.import_module(api.negotiate_format.__module__)
+    client = versioned_app.test_client()
+
+    # msgpack missing: JSON regardless of Accept
+    monkeypatch.setattr(encoding_module, "msgpack", None)
+    resp = client.get("/api/recommendations?method=hybrid&user_id=u1", headers={"Accept": "application/msgpack"})
+    assert resp.is_json
+    assert "Accept" in resp.headers["Vary"]
+
+    fake_msgpack = MagicMock()
+    fake_msgpack.packb.side_effect = lambda payload, **kwargs: b"\x81packed"
+    monkeypatch.setattr(encoding_module, "msgpack", fake_msgpack)
+    resp = client.get("/api/recommendations?method=hybrid&user_id=u1", headers={"Accept": "application/msgpack"})
+    assert resp.mimetype == "application/msgpack"
+    assert resp.data == b"\x81packed"
+    (payload,), _ = fake_msgpack.packb.call_args
+    assert payload["method"] == "hybrid"
+
+
+@pytest.fixture
+def cursor_store(fake_cache_manager):
+    store = {}
+    fake_cache_manager.get.side_effect = store.get
+    fake_cache_manager.set.side_effect = (
+        lambda key, value, ttl_seconds=3600, tags=None: store.__setitem__(key, value)
+    )
+    return store
+
+
+def test_cursor_pagination_slices_one_snapshot(versioned_app, fake_recommendation_service, cursor_store):
+    fake_recommendation_service.get_collaborative_recommendations.return_value = [
+        {"id": i} for i in "abcdef"
+    ]
+    client = versioned_app.test_client()
+
+    first = client.get("/api/recommendations?method=collaborative&user_id=u1&top_n=2&exclude=b&paginate=true").get_json()
+    assert [r["id"] for r in first["recommendations"]] == ["a", "c"]
+    [snapshot] = cursor_store.values()
+    assert [r["id"] for r in snapshot] == ["a", "c", "d", "e", "f"]
+
+    second = client.get(f"/api/recommendations?cursor={first['next_cursor']}&top_n=2").get_json()
+    third = client.post("/api/recommendations", json={"cursor": second["next_cursor"], "top_n": 2}).get_json()
+
+    assert [r["id"] for r in second["recommendations"]] == ["d", "e"]
+    assert second["from_cache"] is True
+    assert [r["id"] for r in third["recommendations"]] == ["f"]
+    assert third["next_cursor"] is None
+    # Later pages were served from the snapshot without scoring again
+    fake_recommendation_service.get_collaborative_recommendations.assert_called_once()
+
+
+# SUMMARY: A paginated request too deep for the ranked list cache still snapshots a whole feed.
+# EDGE CASE: top_n + exclude beyond RANKED_LIST_DEPTH must not leave a one-page feed without a next cursor.
+def test_deep_cursor_request_ranks_several_pages(versioned_app, fake_recommendation_service, cursor_store, monkeypatch):
+    monkeypatch.setattr(api, "RANKED_LIST_DEPTH", 3)
+    monkeypatch.setattr(api, "CURSOR_PAGES", 3)
+    fake_recommendation_service.get_collaborative_recommendations.return_value = [
+        {"id": i} for i in "cdefgh"
+    ]
+    client = versioned_app.test_client()
+
+    first = client.get(
+        "/api/recommendations?method=collaborative&user_id=u1&top_n=2&exclude=a&exclude=b&paginate=true"
+    ).get_json()
+    second = client.get(f"/api/recommendations?cursor={first['next_cursor']}&top_n=2").get_json()
+
+    fake_recommendation_service.get_collaborative_recommendations.assert_called_once_with(
+        user_id="u1", top_n=6, exclude_ids=["a", "b"]
+    )
+    assert [r["id"] for r in first["recommendations"]] == ["c", "d"]
+    assert [r["id"] for r in second["recommendations"]] == ["e", "f"]
+    assert second["next_cursor"] is not None
+
+
+def test_cursor_survives_expired_snapshot_and_rejects_garbage(versioned_app, fake_recommendation_service, cursor_store):
+    fake_recommendation_service.get_collaborative_recommendations.return_value = [{"id": i} for i in "abc"]
+    client = versioned_app.test_client()
+
+    first = client.get("/api/recommendations?method=collaborative&user_id=u1&top_n=1&exclude=a&paginate=1").get_json()
+    cursor_store.clear()
+
+    second = client.get(f"/api/recommendations?cursor={first['next_cursor']}&top_n=1").get_json()
+    assert [r["id"] for r in second["recommendations"]] == ["c"]
+    assert second["method"] == "collaborative"
+
+    resp = client.get("/api/recommendations?cursor=not-a-cursor")
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Invalid cursor"
+
+
+def test_hybrid_degrades_to_collaborative_when_over_budget(versioned_app, fake_recommendation_service, fake_cache_manager):
+    fake_cache_manager.get.return_value = None
+    versioned_app.cost_estimator.observe("hybrid", 10.0)
+    client = versioned_app.test_client()
+
+    data = client.get(
+        "/api/recommendations?method=hybrid&user_id=u1", headers={"X-Deadline-Ms": "200"}
+    ).get_json()
+
+    assert data["method"] == "collaborative"
+    assert data["degraded"] == "deadline"
+    assert data["requested_method"] == "hybrid"
+    fake_recommendation_service.get_hybrid_recommendations.assert_not_called()
+    # Without a deadline the hybrid ranking runs as usual
+    data = client.get("/api/recommendations?method=hybrid&user_id=u1").get_json()
+    assert data["method"] == "hybrid"
+    assert "degraded" not in data
+
+
+# SUMMARY: One slow outlier must not keep a method degraded for every request with a deadline.
+# EDGE CASE: After the probe interval one request runs hybrid anyway and resets the estimate.
+def test_over_budget_method_is_probed_and_recovers(versioned_app, fake_recommendation_service, fake_cache_manager):
+    fake_cache_manager.get.return_value = None
+    versioned_app.cost_estimator = api.CostEstimator(probe_seconds=0)
+    versioned_app.cost_estimator.observe("hybrid", 10.0)
+    client = versioned_app.test_client()
+
+    probe = client.get(
+        "/api/recommendations?method=hybrid&user_id=u1", headers={"X-Deadline-Ms": "200"}
+    ).get_json()
+
+    assert probe["method"] == "hybrid"
+    assert "degraded" not in probe
+    assert versioned_app.cost_estimator.estimate("hybrid") < 1.0
+    fake_recommendation_service.get_hybrid_recommendations.assert_called_once()
+
+
+def test_cached_hybrid_list_served_within_budget(versioned_app, fake_recommendation_service, fake_cache_manager):
+    fake_cache_manager.get.side_effect = lambda key: [{"id": "cached"}] if ":hybrid:" in key else None
+    versioned_app.cost_estimator.observe("hybrid", 10.0)
+    client = versioned_app.test_client()
+
+    data = client.get(
+        "/api/recommendations?method=hybrid&user_id=u1", headers={"X-Deadline-Ms": "200"}
+    ).get_json()
+
+    assert data["method"] == "hybrid"
+    assert data["recommendations"] == [{"id": "cached"}]
+    assert "degraded" not in data
+
+
+def test_overload_sheds_personalized_requests_to_trending(versioned_app, fake_recommendation_service, fake_cache_manager):
+    fake_cache_manager.get.return_value = None
+    versioned_app.admission = api.AdmissionLimiter(limit=1)
+    assert versioned_app.admission.try_acquire()
+    client = versioned_app.test_client()
+
+    data = client.get("/api/recommendations?method=hybrid&user_id=u1").get_json()
+
+    assert data["method"] == "trending"
+    assert data["degraded"] == "overload"
+    assert data["recommendations"] == [{"id": "t1"}]
+    fake_recommendation_service.get_hybrid_recommendations.assert_not_called()
+    fake_recommendation_service.get_collaborative_recommendations.assert_not_called()
+    assert versioned_app.admission.shed == 1
@@ -0,0 +1,330 @@
+import asyncio
+import importlib
+import json
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.Ml_model import asgi_server
+from backend.Ml_model.asgi_server import AsyncRecommendationApp
+from backend.Ml_model.cache_manager import AsyncCacheManager, CacheManager
+
+
+@pytest.fixture
+def fake_recommendation_service():
+    svc = MagicMock()
+    svc.models_loaded = True
+    svc.model_version = "20260101T000000"
+    svc.get_similar_articles.return_value = [{"id": "b", "score": 0.9}]
+    svc.get_collaborative_recommendations.return_value = [{"id": "a"}, {"id": "c"}]
+    svc.get_hybrid_recommendations.return_value = [{"id": "a", "hybrid_score": 0.8}]
+    svc.get_trending_articles.return_value = [{"id": "t1"}, {"id": "t2"}]
+    svc.compact_recommendations.side_effect = lambda recs: recs
+    svc.hydrate_recommendations.side_effect = lambda recs, **kwargs: recs
+    return svc
+
+
+@pytest.fixture
+def fake_cache_manager():
+    cache = MagicMock()
+    cache.enabled = False
+    cache.get_cache_stats.return_value = {"enabled": False}
+    return cache
+
+
+@pytest.fixture
+def asgi_app(fake_recommendation_service, fake_cache_manager):
+    return AsyncRecommendationApp(fake_recommendation_service, fake_cache_manager, reload_interval=0)
+
+
+async def call(app, method, path, query=b"", body=None, headers=()):
+    """Drive the ASGI app like a server would; returns (status, headers, json)"""
+    payload = json.dumps(body).encode() if body is not None else b""
+    request_headers = list(headers)
+    if body is not None:
+        request_headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http", "method": method, "path": path,
+        "query_string": query, "headers": request_headers,
+    }
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start, response = sent
+    data = json.loads(response["body"]) if response["body"] else None
+    return start["status"], dict(start["headers"]), data
+
+
+def request(app, method, path, **kwargs):
+    return asyncio.run(call(app, method, path, **kwargs))
+
+
+def test_health(asgi_app):
+    status, headers, data = request(asgi_app, "GET", "/health")
+
+    assert status == 200
+    assert headers[b"content-type"] == b"application/json"
+    assert data["models_loaded"] is True
+    assert data["cache_enabled"] is False
+
+
+def test_recommendations_match_flask_response(asgi_app, fake_recommendation_service):
+    status, _, data = request(
+        asgi_app, "GET", "/api/recommendations",
+        query=b"method=collaborative&user_id=u1&top_n=1&exclude=a"
+    )
+
+    assert status == 200
+    assert data == {
+        "success": True,
+        "recommendations": [{"id": "c"}],
+        "method": "collaborative",
+        "from_cache": False,
+    }
+    fake_recommendation_service.get_collaborative_recommendations.assert_called_once_with(
+        user_id="u1", top_n=asgi_server.RANKED_LIST_DEPTH, exclude_ids=None
+    )
+
+
+def test_scoring_runs_off_the_event_loop(asgi_app, fake_recommendation_service):
+    loop_threads = []
+
+    def similar(**kwargs):
+        loop_threads.append(threading.current_thread().name)
+        return [{"id": "b"}]
+
+    fake_recommendation_service.get_similar_articles.side_effect = similar
+
+    status, _, _ = request(asgi_app, "GET", "/api/recommendations", query=b"method=content&article_id=a1")
+
+    assert status == 200
+    assert loop_threads[0].startswith("scoring")
+
+
+# SUMMARY: Hydration (which indexes all article metadata on first use) is CPU work too.
+# EDGE CASE: It must run in the scoring pool, not on the event loop.
+def test_hydration_runs_off_the_event_loop(asgi_app, fake_recommendation_service):
+    hydrate_threads = []
+
+    def hydrate(recs, **kwargs):
+        hydrate_threads.append(threading.current_thread().name)
+        return recs
+
+    fake_recommendation_service.hydrate_recommendations.side_effect = hydrate
+
+    request(asgi_app, "GET", "/api/recommendations", query=b"method=content&article_id=a1")
+    request(asgi_app, "GET", "/api/recommendations/trending")
+    request(asgi_app, "POST", "/api/recommendations/batch",
+            body={"requests": [{"method": "content", "article_id": "a1"}]})
+
+    assert len(hydrate_threads) == 3
+    assert all(name.startswith("scoring") for name in hydrate_threads)
+
+
+def test_scoring_busy_returns_503(asgi_app, monkeypatch):
+    monkeypatch.setattr(asgi_server, "ASGI_SCORING_WAIT_SECONDS", 0.01)
+    asgi_app._scoring_slots = asyncio.Semaphore(0)
+
+    status, headers, data = request(asgi_app, "GET", "/api/recommendations/trending")
+
+    assert status == 503
+    assert headers[b"retry-after"] == b"1"
+    assert data["success"] is False
+
+
+def test_batch_and_trending(asgi_app):
+    status, _, data = request(asgi_app, "POST", "/api/recommendations/batch", body={"requests": [
+        {"method": "content", "article_id": "a1", "top_n": 3},
+        {"method": "hybrid", "user_id": "u1"},
+    ]})
+    assert status == 200
+    assert [r["method"] for r in data["results"]] == ["content", "hybrid"]
+
+    status, _, data = request(asgi_app, "GET", "/api/recommendations/trending", query=b"top_n=1")
+    assert status == 200
+    assert data["recommendations"] == [{"id": "t1"}]
+
+
+def test_validation_and_unknown_routes(asgi_app):
+    assert request(asgi_app, "POST", "/api/recommendations/batch", body={})[0] == 400
+    assert request(asgi_app, "POST", "/api/track", body={"article_id": "a1"})[0] == 400
+    assert request(asgi_app, "POST", "/api/cache/clear", body={})[0] == 400
+    assert request(asgi_app, "GET", "/api/track")[0] == 405
+    assert request(asgi_app, "GET", "/nope")[0] == 404
+
+
+def test_admin_routes_use_sync_cache_manager(asgi_app, fake_cache_manager):
+    status, _, data = request(asgi_app, "POST", "/api/cache/clear", body={"user_id": "u1"})
+    assert status == 200
+    fake_cache_manager.clear_user_cache.assert_called_once_with("u1")
+
+    status, _, data = request(asgi_app, "GET", "/api/cache/stats")
+    assert data["stats"] == {"enabled": False}
+
+
+def test_cors_preflight(asgi_app):
+    status, headers, _ = request(asgi_app, "OPTIONS", "/api/recommendations", headers=[
+        (b"origin", b"http://localhost:3000"),
+        (b"access-control-request-method", b"POST"),
+    ])
+
+    assert status == 200
+    assert headers[b"access-control-allow-origin"] == b"*"
+
+
+@pytest.fixture
+def async_cache():
+    cache = CacheManager()
+    cache.enabled = True
+    manager = AsyncCacheManager(cache)
+    manager.redis_client = MagicMock()
+    manager.redis_client.get = AsyncMock(return_value=None)
+    manager.redis_client.set = AsyncMock(return_value=True)
+    manager.redis_client.eval = AsyncMock(return_value=1)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True])
+    manager.redis_client.pipeline.return_value = pipe
+    return manager
+
+
+def test_async_cache_coalesces_concurrent_misses(async_cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [{"id": "a"}]
+
+    async def run():
+        return await asyncio.gather(*(
+            async_cache.get_or_compute("rec:v=1:hybrid:u=u1", compute, ttl_seconds=60)
+            for _ in range(5)
+        ))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(value == [{"id": "a"}] for value, _ in results)
+    async_cache.redis_client.pipeline.return_value.setex.assert_called_once()
+
+
+# SUMMARY: A cancelled leader (e.g. its client disconnected) must not cancel requests waiting on it.
+# EDGE CASE: The waiting request computes the value itself instead of raising CancelledError.
+def test_async_cache_follower_survives_cancelled_leader(async_cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(3600)
+        return [{"id": "a"}]
+
+    async def run():
+        key = "rec:v=1:hybrid:u=u1"
+        leader = asyncio.create_task(async_cache.get_or_compute(key, compute, ttl_seconds=60))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(async_cache.get_or_compute(key, compute, ttl_seconds=60))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == ([{"id": "a"}], False)
+    assert len(calls) == 2
+
+
+def test_async_cache_reads_sync_codec_frames(async_cache):
+    frame = async_cache.sync.codec.encode([{"id": "x"}])
+    async_cache.redis_client.get = AsyncMock(return_value=frame)
+    compute = AsyncMock()
+
+    value, from_cache = asyncio.run(async_cache.get_or_compute("rec:v=1:content:a=1", compute))
+
+    assert (value, from_cache) == ([{"id": "x"}], True)
+    compute.assert_not_called()
+    # The hit also fills the shared L1 cache
+    assert async_cache.sync.local_cache.get("rec:v=1:content:a=1") == (True, [{"id": "x"}])
+
+
+def test_async_cache_open_circuit_computes_directly(async_cache):
+    async_cache.sync.breaker.state = "open"
+    async_cache.sync.breaker._opened_at = float("inf")
+    compute = AsyncMock(return_value=[1])
+
+    assert asyncio.run(async_cache.get_or_compute("k", compute)) == ([1], False)
+    async_cache.redis_client.get.assert_not_called()
+
+
+def test_metrics_endpoint(asgi_app, tmp_path, monkeypatch):
+    metrics_module = importlib.import_module(asgi_server.get_metrics.__module__)
+    monkeypatch.setattr(metrics_module, "_metrics", metrics_module.MetricsRegistry(tmp_path))
+    request(asgi_app, "GET", "/api/recommendations/trending", query=b"top_n=1")
+    request(asgi_app, "GET", "/nope")
+
+    async def scrape():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/metrics", "query_string": b"", "headers": []}
+        await asgi_app(scope, receive, send)
+        return sent
+
+    start, response = asyncio.run(scrape())
+    text = response["body"].decode()
+
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/plain")
+    assert 'newsxpress_recommendations_total{cache="miss",method="trending"} 1' in text
+    assert 'route="unmatched",status="404"' in text
+    assert 'newsxpress_stage_duration_seconds_count{stage="serialization"} 1' in text
+
+
+def test_recommendations_etag_and_304(asgi_app):
+    status, headers, _ = request(asgi_app, "GET", "/api/recommendations", query=b"method=hybrid&user_id=u1")
+    etag = headers[b"etag"]
+    assert status == 200
+
+    status, headers, data = request(
+        asgi_app, "GET", "/api/recommendations", query=b"method=hybrid&user_id=u1",
+        headers=[(b"if-none-match", etag)]
+    )
+    assert (status, data) == (304, None)
+    assert headers[b"etag"] == etag
+
+
+def test_trending_fields_projection(asgi_app, fake_recommendation_service):
+    fake_recommendation_service.get_trending_articles.return_value = [{"id": "t1", "title": "T", "score": 3}]
+
+    status, _, data = request(asgi_app, "GET", "/api/recommendations/trending", query=b"fields=score")
+
+    assert status == 200
+    assert data["recommendations"] == [{"id": "t1", "score": 3}]
+
+
+def test_cursor_pagination(asgi_app, fake_recommendation_service):
+    fake_recommendation_service.get_collaborative_recommendations.return_value = [{"id": i} for i in "abc"]
+
+    status, _, first = request(
+        asgi_app, "GET", "/api/recommendations", query=b"method=collaborative&user_id=u1&top_n=2&paginate=true"
+    )
+    assert status == 200
+    assert [r["id"] for r in first["recommendations"]] == ["a", "b"]
+
+    _, _, second = request(asgi_app, "POST", "/api/recommendations", body={"cursor": first["next_cursor"], "top_n": 2})
+    assert [r["id"] for r in second["recommendations"]] == ["c"]
+    assert second["next_cursor"] is None
+
+    assert request(asgi_app, "GET", "/api/recommendations", query=b"cursor=%%%")[0] == 400
@@ -0,0 +1,101 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.Ml_model import cache_codec
+from backend.Ml_model.cache_codec import CacheCodec, CodecError, MAGIC
+
+
+@pytest.fixture
+def articles():
+    return [
+        {"id": f"a{i}", "title": "Budget session opens", "topic": "politics", "similarity_score": 0.5}
+        for i in range(50)
+    ]
+
+
+# SUMMARY: Ensures values round-trip through compact JSON.
+# EDGE CASE: Small payloads stay uncompressed and use no whitespace.
+def test_json_roundtrip_small_uncompressed():
+    codec = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=1024)
+
+    data = codec.encode({"id": "a1", "score": 0.5})
+
+    assert data.startswith(MAGIC)
+    assert data.endswith(b'{"id":"a1","score":0.5}')
+    assert codec.decode(data) == {"id": "a1", "score": 0.5}
+
+
+# SUMMARY: Ensures payloads above the threshold are compressed.
+# EDGE CASE: Repeated article fields compress well below the JSON size.
+def test_large_payload_is_compressed(articles):
+    codec = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=256)
+
+    data = codec.encode(articles)
+
+    assert len(data) < len(json.dumps(articles)) / 4
+    assert codec.decode(data) == articles
+
+
+# SUMMARY: Ensures legacy plain-JSON cache entries remain readable.
+# EDGE CASE: Both str and bytes responses from Redis.
+def test_decode_legacy_json():
+    codec = CacheCodec()
+
+    assert codec.decode('[{"id": "a1"}]') == [{"id": "a1"}]
+    assert codec.decode(b'{"a": 1}') == {"a": 1}
+
+
+# SUMMARY: Ensures a reader decodes frames written with other settings.
+# EDGE CASE: Reader configured without compression reads a zlib frame.
+def test_decode_independent_of_writer_settings(articles):
+    writer = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=0)
+    reader = CacheCodec(serializer="json", compression="none")
+
+    assert reader.decode(writer.encode(articles)) == articles
+
+
+# SUMMARY: Ensures unknown versions and corrupt frames raise CodecError.
+# EDGE CASE: Truncated header, future version, bad zlib stream.
+def test_decode_rejects_unknown_or_corrupt_frames():
+    codec = CacheCodec()
+
+    with pytest.raises(CodecError):
+        codec.decode(MAGIC + b"\x01")
+    with pytest.raises(CodecError):
+        codec.decode(MAGIC + bytes([cache_codec.FORMAT_VERSION + 1]) + b"j-{}")
+    with pytest.raises(CodecError):
+        codec.decode(MAGIC + bytes([cache_codec.FORMAT_VERSION]) + b"jz" + b"not zlib")
+
+
+# SUMMARY: Ensures numpy scalars and timestamps are encodable.
+# EDGE CASE: Values coming straight from DataFrame rows.
+def test_encode_numpy_and_timestamps():
+    codec = CacheCodec(serializer="json", compression="none")
+    value = {"id": np.int64(7), "score": np.float32(0.25), "published_at": pd.Timestamp("2026-01-01")}
+
+    assert codec.decode(codec.encode(value)) == {
+        "id": 7, "score": 0.25, "published_at": "2026-01-01T00:00:00"
+    }
+
+
+# SUMMARY: Ensures missing optional codecs fall back instead of failing.
+# EDGE CASE: msgpack / lz4 not installed.
+def test_optional_codecs_fall_back(monkeypatch, articles):
+    monkeypatch.setattr(cache_codec, "msgpack", None)
+    monkeypatch.setattr(cache_codec, "lz4_frame", None)
+
+    codec = CacheCodec(serializer="msgpack", compression="lz4", compress_min_bytes=0)
+
+    assert (codec.serializer, codec.compression) == ("json", "zlib")
+    assert codec.decode(codec.encode(articles)) == articles
+
+
+# SUMMARY: Ensures unknown codec names are rejected at construction.
+# EDGE CASE: Typos in CACHE_SERIALIZER / CACHE_COMPRESSION.
+def test_unknown_codec_names():
+    with pytest.raises(ValueError):
+        CacheCodec(serializer="pickle")
+    with pytest.raises(ValueError):
+        CacheCodec(compression="gzip")
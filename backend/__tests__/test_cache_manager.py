@@ -1,4 +1,5 @@
 import json
+import time
 import pytest
 from unittest.mock import MagicMock, patch
 from backend.Ml_model.cache_manager import CacheManager, get_cache_manager, cached
@@ -137,36 +138,44 @@ def test_delete_pattern_disabled():
     assert cm.delete_pattern("*") is False
 
 
-# SUMMARY: Ensures delete_pattern() deletes all matching keys.
-# EDGE CASE: Multiple keys returned → must delete in one call.
-def test_delete_pattern_success(mock_redis):
-    mock_redis.keys.return_value = ["a", "b"]
+# SUMMARY: Ensures delete_pattern() walks keys with SCAN and frees them with UNLINK.
+# EDGE CASE: More keys than one batch → several UNLINK commands, never KEYS.
+def test_delete_pattern_success(mock_redis, monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+    monkeypatch.setattr(cm_module, "CACHE_SCAN_COUNT", 2)
+    mock_redis.scan_iter.return_value = iter(["a", "b", "c"])
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.return_value = [1]
 
     cm = CacheManager()
     cm.enabled = True
     cm.redis_client = mock_redis
 
     assert cm.delete_pattern("rec:*") is True
-    mock_redis.delete.assert_called_once_with("a", "b")
+    mock_redis.scan_iter.assert_called_once_with(match="rec:*", count=2)
+    pipe.unlink.assert_any_call("a", "b")
+    pipe.unlink.assert_any_call("c")
+    mock_redis.keys.assert_not_called()
+    mock_redis.delete.assert_not_called()
 
 
 # SUMMARY: Ensures delete_pattern() returns True when no keys match.
-# EDGE CASE: keys() returns empty list.
+# EDGE CASE: SCAN yields nothing → no UNLINK pipeline at all.
 def test_delete_pattern_no_keys(mock_redis):
-    mock_redis.keys.return_value = []
+    mock_redis.scan_iter.return_value = iter([])
 
     cm = CacheManager()
     cm.enabled = True
     cm.redis_client = mock_redis
 
     assert cm.delete_pattern("rec:*") is True
-    mock_redis.delete.assert_not_called()
+    mock_redis.pipeline.assert_not_called()
 
 
 # SUMMARY: Ensures delete_pattern() catches Redis exceptions.
-# EDGE CASE: redis.keys raises exception → return False.
+# EDGE CASE: redis.scan_iter raises exception → return False.
 def test_delete_pattern_error(mock_redis):
-    mock_redis.keys.side_effect = Exception("boom")
+    mock_redis.scan_iter.side_effect = Exception("boom")
 
     cm = CacheManager()
     cm.enabled = True
@@ -175,29 +184,38 @@ def test_delete_pattern_error(mock_redis):
     assert cm.delete_pattern("rec:*") is False
 
 
-# SUMMARY: Ensures clear_user_cache deletes multiple patterns.
-# EDGE CASE: Must call delete_pattern for both hybrid and collab keys.
+# SUMMARY: Ensures clear_user_cache deletes only the keys tagged with that user.
+# EDGE CASE: No keyspace scan; the tag set itself is unlinked too.
 def test_clear_user_cache(mock_redis):
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [[["rec:hybrid:u=u1:a=None:n=10"]], [2]]
+
     cm = CacheManager()
     cm.enabled = True
     cm.redis_client = mock_redis
 
-    cm.clear_user_cache("u1")
+    assert cm.clear_user_cache("u1") is True
 
-    mock_redis.keys.assert_any_call("rec:collab:u1:*")
-    mock_redis.keys.assert_any_call("rec:hybrid:u1:*")
+    assert pipe.zrangebyscore.call_args.args[0] == "tags:user:u1"
+    pipe.unlink.assert_called_once_with("rec:hybrid:u=u1:a=None:n=10", "tags:user:u1")
+    mock_redis.scan_iter.assert_not_called()
+    mock_redis.keys.assert_not_called()
 
 
-# SUMMARY: Ensures clear_article_cache deletes similar-article cache.
-# EDGE CASE: pattern is specific to similar recommender.
+# SUMMARY: Ensures clear_article_cache deletes keys tagged with that article.
+# EDGE CASE: Tag is specific to the article id.
 def test_clear_article_cache(mock_redis):
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [[[]], [0]]
+
     cm = CacheManager()
     cm.enabled = True
     cm.redis_client = mock_redis
 
     cm.clear_article_cache("A1")
 
-    mock_redis.keys.assert_called_once_with("rec:similar:A1:*")
+    assert pipe.zrangebyscore.call_args.args[0] == "tags:article:A1"
+    pipe.unlink.assert_called_once_with("tags:article:A1")
 
 
 # SUMMARY: Ensures get_cache_stats returns disabled state.
@@ -209,34 +227,51 @@ def test_stats_disabled():
     assert cm.get_cache_stats() == {"enabled": False}
 
 
-# SUMMARY: Ensures get_cache_stats produces correct hit-rate calculation.
-# EDGE CASE: Uses default division fallback to avoid divide-by-zero.
-def test_stats_success(mock_redis):
-    mock_redis.info.return_value = {"keyspace_hits": 10, "keyspace_misses": 5}
+# SUMMARY: Ensures get_cache_stats reports this app's hits/misses per key prefix.
+# EDGE CASE: Redis server-wide INFO (shared with other tenants) is not used.
+def test_stats_success(mock_redis, tmp_path):
+    from backend.Ml_model.cache_metrics import CacheMetrics
 
     cm = CacheManager()
     cm.enabled = True
     cm.redis_client = mock_redis
+    cm.metrics = CacheMetrics(directory=tmp_path)
+    mock_redis.get.side_effect = [json.dumps([{"id": "a"}]), None]
+
+    cm.get("rec:v=v1:hybrid:u=u1:a=None:d=100")
+    cm.get("rec:v=v1:content:u=None:a=a1:d=100")
+    cm.set("rec:v=v1:content:u=None:a=a1:d=100", [{"id": "b"}], 60)
 
     stats = cm.get_cache_stats()
     assert stats["enabled"] is True
-    assert stats["keyspace_hits"] == 10
-    assert stats["keyspace_misses"] == 5
-    assert stats["hit_rate"] == pytest.approx(66.666, rel=1e-2)
-
-
-# SUMMARY: Ensures get_cache_stats handles Redis errors safely.
-# EDGE CASE: redis.info throws → return dict with error message.
-def test_stats_error(mock_redis):
-    mock_redis.info.side_effect = Exception("bad stats")
-
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == pytest.approx(50.0)
+    assert stats["prefixes"]["rec:hybrid"]["hits"] == 1
+    assert stats["prefixes"]["rec:content"]["misses"] == 1
+    assert stats["prefixes"]["rec:content"]["sets"] == 1
+    assert stats["prefixes"]["rec:content"]["bytes_written"] > 0
+    mock_redis.info.assert_not_called()
+
+
+# SUMMARY: Ensures get_cache_stats still works when worker snapshots cannot be shared.
+# EDGE CASE: Metrics directory unwritable → this worker's counts only.
+def test_stats_error(mock_redis, tmp_path):
+    from backend.Ml_model.cache_metrics import CacheMetrics
+
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
     cm = CacheManager()
     cm.enabled = True
     cm.redis_client = mock_redis
+    cm.metrics = CacheMetrics(directory=blocker)
+    mock_redis.get.side_effect = Exception("boom")
+
+    cm.get("rec:v=v1:hybrid:u=u1:a=None:d=100")
 
     stats = cm.get_cache_stats()
-    assert stats["enabled"] is True
-    assert "error" in stats
+    assert stats["workers"] == 1
+    assert stats["prefixes"]["rec:hybrid"]["errors"] == 1
+    assert stats["prefixes"]["rec:hybrid"]["misses"] == 1
 
 
 # SUMMARY: Verifies that get_cache_manager() returns a true singleton.
@@ -304,3 +339,513 @@ def test_cached_builds_key_correctly(mock_redis, monkeypatch):
     assert "multiply" in cached_key
     assert "5" in cached_key
     assert "y=10" in cached_key
+
+
+# SUMMARY: Ensures cached decorator namespaces keys by model version.
+# EDGE CASE: Same call after a model switch must miss the old key.
+def test_cached_key_includes_model_version(mock_redis, monkeypatch):
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+    cm.model_version = "v1"
+
+    monkeypatch.setattr(
+        "backend.Ml_model.cache_manager.get_cache_manager",
+        lambda: cm
+    )
+
+    @cached("myprefix")
+    def square(x):
+        return x * x
+
+    mock_redis.get.return_value = None
+    square(3)
+    cm.model_version = "v2"
+    square(3)
+
+    keys = [c.args[0] for c in mock_redis.get.call_args_list]
+    assert keys == ["myprefix:v=v1:square:3", "myprefix:v=v2:square:3"]
+
+
+# SUMMARY: Ensures recommendation key helpers embed the model version.
+# EDGE CASE: Unversioned (legacy flat) models get their own namespace.
+def test_recommendation_cache_key_helpers():
+    from backend.Ml_model.cache_manager import recommendation_cache_key, trending_cache_key
+
+    assert recommendation_cache_key("content", "v7", article_id="A1") == "rec:v=v7:content:u=None:a=A1:d=100"
+    assert trending_cache_key(None, days=7) == "rec:v=unversioned:trending:days=7:d=100"
+    # Context (e.g. hybrid recent articles) is hashed into the key
+    with_context = recommendation_cache_key("hybrid", "v7", user_id="u1", context=("a", "b"))
+    assert with_context.startswith("rec:v=v7:hybrid:u=u1:a=None:d=100:c=")
+    assert with_context != recommendation_cache_key("hybrid", "v7", user_id="u1", context=("b", "a"))
+
+
+# SUMMARY: Ensures exclude/top_n are applied to a cached ranked list after the read.
+# EDGE CASE: Excluded ids do not use up top_n slots.
+def test_select_recommendations_filters_then_truncates():
+    from backend.Ml_model.cache_manager import select_recommendations
+
+    ranked = [{"id": "a"}, {"id": "b"}, {"id": "c"}, {"id": "d"}]
+
+    assert select_recommendations(ranked, 2) == [{"id": "a"}, {"id": "b"}]
+    assert select_recommendations(ranked, 2, exclude_ids=["a", "c"]) == [{"id": "b"}, {"id": "d"}]
+    assert select_recommendations(ranked, 10, exclude_ids=[]) == ranked
+
+
+# FIXTURE: CacheManager "connected" to a mock Redis without the slow failed connect
+@pytest.fixture
+def connected_cache(mock_redis):
+    with patch("redis.Redis", return_value=mock_redis), \
+            patch.object(CacheManager, "start_invalidation_listener"):
+        cm = CacheManager()
+    return cm
+
+
+# SUMMARY: Ensures a value set through the manager is served from the L1 cache.
+# EDGE CASE: Second get must not touch Redis at all.
+def test_l1_serves_hot_keys_without_redis(connected_cache, mock_redis):
+    connected_cache.set("rec:trending:n=10:days=7", [{"id": "t1"}], 300)
+
+    assert connected_cache.get("rec:trending:n=10:days=7") == [{"id": "t1"}]
+    mock_redis.get.assert_not_called()
+
+
+# SUMMARY: Ensures Redis hits populate L1 so the next get is local.
+# EDGE CASE: Only one Redis round trip for two gets.
+def test_l1_populated_from_redis_hit(connected_cache, mock_redis):
+    mock_redis.get.return_value = json.dumps({"a": 1})
+
+    assert connected_cache.get("k") == {"a": 1}
+    assert connected_cache.get("k") == {"a": 1}
+    mock_redis.get.assert_called_once_with("k")
+
+
+# SUMMARY: Ensures L1 entries expire after their TTL.
+# EDGE CASE: L1 TTL is capped by the shorter of the Redis TTL and the L1 TTL.
+def test_local_cache_ttl_expiry(monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+
+    now = {"t": 1000.0}
+    monkeypatch.setattr(cm_module.time, "monotonic", lambda: now["t"])
+    local = cm_module.LocalCache(max_entries=10, ttl_seconds=30)
+
+    local.set("short", 1, ttl_seconds=5)
+    local.set("long", 2, ttl_seconds=3600)
+    now["t"] += 10
+    assert local.get("short") == (False, None)
+    assert local.get("long") == (True, 2)
+    now["t"] += 25
+    assert local.get("long") == (False, None)
+
+
+# SUMMARY: Ensures L1 evicts the least recently used entry when full.
+# EDGE CASE: Reading a key refreshes its recency.
+def test_local_cache_lru_eviction():
+    from backend.Ml_model.cache_manager import LocalCache
+
+    local = LocalCache(max_entries=2, ttl_seconds=60)
+    local.set("a", 1)
+    local.set("b", 2)
+    local.get("a")
+    local.set("c", 3)
+
+    assert local.get("a") == (True, 1)
+    assert local.get("b") == (False, None)
+    assert len(local) == 2
+
+
+# SUMMARY: Ensures delete/delete_pattern drop local entries and notify other workers.
+# EDGE CASE: Invalidation is published on the shared pub/sub channel.
+def test_delete_publishes_invalidation(connected_cache, mock_redis):
+    from backend.Ml_model.cache_manager import INVALIDATION_CHANNEL
+
+    connected_cache.set("rec:a", 1, 60)
+    connected_cache.set("rec:b", 2, 60)
+    mock_redis.scan_iter.return_value = iter([])
+
+    connected_cache.delete("rec:a")
+    connected_cache.delete_pattern("rec:*")
+
+    assert connected_cache.local_cache.get("rec:b") == (False, None)
+    channels = [c.args[0] for c in mock_redis.publish.call_args_list]
+    payloads = [json.loads(c.args[1]) for c in mock_redis.publish.call_args_list]
+    assert channels == [INVALIDATION_CHANNEL, INVALIDATION_CHANNEL]
+    assert payloads[0]["key"] == "rec:a"
+    assert payloads[1]["pattern"] == "rec:*"
+
+
+# SUMMARY: Ensures invalidations from other workers clear matching L1 entries.
+# EDGE CASE: Messages from this worker itself and malformed messages are ignored.
+def test_handle_invalidation_from_other_worker(connected_cache):
+    connected_cache.local_cache.set("rec:hybrid:u=1", 1)
+    connected_cache.local_cache.set("rec:hybrid:u=2", 2)
+    connected_cache.local_cache.set("rec:similar:a=1", 3)
+
+    connected_cache._handle_invalidation(json.dumps({"origin": connected_cache._origin, "key": "rec:hybrid:u=1"}))
+    connected_cache._handle_invalidation("not json")
+    assert len(connected_cache.local_cache) == 3
+
+    connected_cache._handle_invalidation(json.dumps({"origin": "other", "key": "rec:hybrid:u=1"}))
+    connected_cache._handle_invalidation(json.dumps({"origin": "other", "pattern": "rec:similar:*"}))
+    assert connected_cache.local_cache.get("rec:hybrid:u=1") == (False, None)
+    assert connected_cache.local_cache.get("rec:similar:a=1") == (False, None)
+    assert connected_cache.local_cache.get("rec:hybrid:u=2") == (True, 2)
+
+
+# SUMMARY: Ensures set() with tags records the key and its expiry in each tag set.
+# EDGE CASE: Expired members are trimmed on every write, so a busy tag stays bounded.
+def test_set_with_tags_uses_pipeline(connected_cache, mock_redis):
+    from backend.Ml_model.cache_manager import CACHE_TAG_TTL
+    pipe = mock_redis.pipeline.return_value
+
+    assert connected_cache.set("rec:k", [1], 900, tags=["user:1", "article:A"]) is True
+
+    pipe.setex.assert_called_once_with("rec:k", 900, connected_cache.codec.encode([1]))
+    [(user_tag, user_members), (article_tag, _)] = [c.args for c in pipe.zadd.call_args_list]
+    assert (user_tag, article_tag) == ("tags:user:1", "tags:article:A")
+    assert user_members["rec:k"] == pytest.approx(time.time() + 900, abs=5)
+    pipe.expire.assert_any_call("tags:user:1", max(900, CACHE_TAG_TTL))
+    trimmed = {c.args[0]: c.args[1:] for c in pipe.zremrangebyscore.call_args_list}
+    assert trimmed["tags:user:1"][0] == "-inf"
+    assert trimmed["tags:user:1"][1] == pytest.approx(time.time(), abs=5)
+    pipe.execute.assert_called_once()
+    mock_redis.setex.assert_not_called()
+
+
+# SUMMARY: Ensures tag invalidation clears L1 and tells other workers which keys went.
+# EDGE CASE: Keys from several tags are unlinked once and published as a list.
+def test_invalidate_tags_publishes_keys(connected_cache, mock_redis):
+    connected_cache.local_cache.set("rec:x", 1)
+    connected_cache.local_cache.set("rec:y", 2)
+    pipe = mock_redis.pipeline.return_value
+    pipe.execute.side_effect = [[["rec:x"], ["rec:x", "rec:z"]], [3]]
+
+    assert connected_cache.invalidate_tags(["user:1", "article:A"]) is True
+
+    assert connected_cache.local_cache.get("rec:x") == (False, None)
+    assert connected_cache.local_cache.get("rec:y") == (True, 2)
+    pipe.unlink.assert_called_once_with("rec:x", "rec:z", "tags:user:1", "tags:article:A")
+    payload = json.loads(mock_redis.publish.call_args.args[1])
+    assert payload["keys"] == ["rec:x", "rec:z", "tags:user:1", "tags:article:A"]
+
+
+# SUMMARY: Ensures concurrent misses in one process compute the value only once.
+# EDGE CASE: Followers receive the leader's result instead of recomputing.
+def test_get_or_compute_single_flight_in_process(connected_cache, mock_redis):
+    import threading
+    mock_redis.get.return_value = None
+    mock_redis.set.return_value = True
+    started, release = threading.Event(), threading.Event()
+    calls = {"count": 0}
+
+    def compute():
+        calls["count"] += 1
+        started.set()
+        release.wait(5)
+        return [{"id": "t1"}]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(connected_cache.get_or_compute("rec:k", compute, 60)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(connected_cache.get_or_compute("rec:k", compute, 60)))
+        for _ in range(3)
+    ]
+    for t in followers:
+        t.start()
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert calls["count"] == 1
+    assert len(results) == 4
+    assert all(value == [{"id": "t1"}] for value, _ in results)
+    mock_redis.set.assert_called_once()
+    assert mock_redis.set.call_args.kwargs["nx"] is True
+
+
+# SUMMARY: Ensures a worker that loses the Redis lock polls for the value.
+# EDGE CASE: Another process computed the value → no local computation.
+def test_get_or_compute_waits_for_other_process(connected_cache, mock_redis, monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+    monkeypatch.setattr(cm_module, "CACHE_LOCK_POLL_MS", 1)
+    mock_redis.set.return_value = None  # lock held elsewhere
+    mock_redis.get.side_effect = [None, None, json.dumps(["fresh"])]
+    compute = MagicMock()
+
+    value, from_cache = connected_cache.get_or_compute("rec:k", compute, 60)
+
+    assert value == ["fresh"]
+    assert from_cache is True
+    compute.assert_not_called()
+    mock_redis.eval.assert_not_called()
+
+
+# SUMMARY: Ensures the lock holder stores the value and releases its lock.
+# EDGE CASE: Release is token-checked so an expired lock is not stolen.
+def test_get_or_compute_releases_lock(connected_cache, mock_redis):
+    mock_redis.get.return_value = None
+    mock_redis.set.return_value = True
+
+    value, from_cache = connected_cache.get_or_compute("rec:k", lambda: [1, 2], 60)
+
+    assert (value, from_cache) == ([1, 2], False)
+    mock_redis.setex.assert_called_once()
+    assert connected_cache.codec.decode(mock_redis.setex.call_args.args[2])["value"] == [1, 2]
+    token = mock_redis.set.call_args.args[1]
+    assert mock_redis.eval.call_args.args[1:] == (1, "lock:rec:k", token)
+
+
+# SUMMARY: Ensures computed values get a jittered soft TTL plus a stale window.
+# EDGE CASE: Jitter only ever lengthens the TTL, up to CACHE_TTL_JITTER.
+def test_store_applies_soft_ttl_and_jitter(connected_cache, mock_redis, monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+    monkeypatch.setattr(cm_module, "CACHE_STALE_TTL", 120)
+    monkeypatch.setattr(cm_module, "CACHE_TTL_JITTER", 0.1)
+    monkeypatch.setattr(cm_module.random, "uniform", lambda a, b: b)
+    monkeypatch.setattr(cm_module.time, "time", lambda: 1000.0)
+
+    connected_cache._store("rec:k", ["v"], 300, None)
+
+    key, ttl, payload = mock_redis.setex.call_args.args
+    assert ttl == 330 + 120
+    assert connected_cache.codec.decode(payload) == {cm_module.SOFT_EXPIRY_FIELD: 1330.0, "value": ["v"]}
+
+
+# SUMMARY: Ensures plain get() unwraps soft-TTL entries.
+# EDGE CASE: Callers outside get_or_compute never see the envelope.
+def test_get_unwraps_soft_ttl_entries(connected_cache, mock_redis):
+    from backend.Ml_model.cache_manager import SOFT_EXPIRY_FIELD
+    import time as _time
+    mock_redis.get.return_value = json.dumps({SOFT_EXPIRY_FIELD: _time.time() + 60, "value": [1]})
+
+    assert connected_cache.get("rec:k") == [1]
+
+
+# SUMMARY: Ensures a stale entry is served immediately and refreshed in the background.
+# EDGE CASE: Past soft expiry → old value returned, new value written by a worker.
+def test_get_or_compute_serves_stale_and_refreshes(connected_cache, mock_redis):
+    import threading
+    from backend.Ml_model.cache_manager import SOFT_EXPIRY_FIELD
+    import time as _time
+    mock_redis.get.return_value = json.dumps({SOFT_EXPIRY_FIELD: _time.time() - 5, "value": ["old"]})
+    mock_redis.set.return_value = True
+    refreshed = threading.Event()
+    mock_redis.setex.side_effect = lambda *args: refreshed.set()
+
+    value, from_cache = connected_cache.get_or_compute("rec:k", lambda: ["new"], 60)
+
+    assert (value, from_cache) == (["old"], True)
+    assert refreshed.wait(5)
+    assert connected_cache.codec.decode(mock_redis.setex.call_args.args[2])["value"] == ["new"]
+
+
+# SUMMARY: Ensures fresh soft-TTL entries do not trigger a refresh.
+# EDGE CASE: Before soft expiry → no lock, no recompute.
+def test_get_or_compute_fresh_entry_no_refresh(connected_cache, mock_redis):
+    from backend.Ml_model.cache_manager import SOFT_EXPIRY_FIELD
+    import time as _time
+    mock_redis.get.return_value = json.dumps({SOFT_EXPIRY_FIELD: _time.time() + 60, "value": ["ok"]})
+    compute = MagicMock()
+
+    assert connected_cache.get_or_compute("rec:k", compute, 60) == (["ok"], True)
+    compute.assert_not_called()
+    mock_redis.set.assert_not_called()
+
+
+# SUMMARY: Ensures values written by the codec are read back by get().
+# EDGE CASE: Binary payloads replace JSON text in Redis.
+def test_get_decodes_codec_payload(connected_cache, mock_redis):
+    mock_redis.get.return_value = connected_cache.codec.encode({"a": [1, 2]})
+
+    assert connected_cache.get("k") == {"a": [1, 2]}
+
+
+# SUMMARY: Ensures an undecodable value is treated as a cache miss.
+# EDGE CASE: Entry written by a newer codec version → miss, not an error.
+def test_get_unknown_codec_version_is_miss(connected_cache, mock_redis):
+    from backend.Ml_model.cache_codec import MAGIC
+    mock_redis.get.return_value = MAGIC + bytes([99]) + b"j-{}"
+
+    assert connected_cache.get("k") is None
+
+
+# SUMMARY: Ensures connect() builds an explicitly sized blocking pool.
+# EDGE CASE: Threads wait for a free connection instead of erroring.
+@patch("redis.Redis")
+def test_connect_uses_sized_pool(mock_redis_class, mock_redis, monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+    monkeypatch.setattr(cm_module, "REDIS_MAX_CONNECTIONS", 7)
+    mock_redis_class.return_value = mock_redis
+
+    with patch.object(CacheManager, "start_invalidation_listener"):
+        CacheManager()
+
+    pool = mock_redis_class.call_args.kwargs["connection_pool"]
+    assert isinstance(pool, cm_module.redis.BlockingConnectionPool)
+    assert pool.max_connections == 7
+
+
+# SUMMARY: Ensures get_many() serves L1 hits locally and MGETs the rest.
+# EDGE CASE: Missing keys are simply absent from the result.
+def test_get_many_uses_l1_and_mget(connected_cache, mock_redis):
+    connected_cache.local_cache.set("a", 1)
+    mock_redis.mget.return_value = [connected_cache.codec.encode(2), None]
+
+    assert connected_cache.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+    mock_redis.mget.assert_called_once_with(["b", "c"])
+    mock_redis.get.assert_not_called()
+
+
+# SUMMARY: Ensures set_many() writes every entry in one pipeline.
+# EDGE CASE: Per-entry TTLs and tags are preserved.
+def test_set_many_single_pipeline(connected_cache, mock_redis):
+    pipe = mock_redis.pipeline.return_value
+
+    assert connected_cache.set_many([("a", 1, 60, None), ("b", 2, 900, ["user:1"])]) is True
+
+    pipe.setex.assert_any_call("a", 60, connected_cache.codec.encode(1))
+    pipe.setex.assert_any_call("b", 900, connected_cache.codec.encode(2))
+    assert list(pipe.zadd.call_args.args[1]) == ["b"]
+    assert pipe.zadd.call_args.args[0] == "tags:user:1"
+    pipe.execute.assert_called_once()
+    assert connected_cache.local_cache.get("b") == (True, 2)
+
+
+# SUMMARY: Ensures delete_many() unlinks all keys and notifies other workers.
+# EDGE CASE: L1 copies are dropped before Redis is touched.
+def test_delete_many(connected_cache, mock_redis):
+    connected_cache.local_cache.set("a", 1)
+    pipe = mock_redis.pipeline.return_value
+
+    assert connected_cache.delete_many(["a", "b"]) is True
+
+    assert connected_cache.local_cache.get("a") == (False, None)
+    pipe.unlink.assert_called_once_with("a", "b")
+    assert json.loads(mock_redis.publish.call_args.args[1])["keys"] == ["a", "b"]
+
+
+# SUMMARY: Ensures get_or_compute_many() costs one MGET plus one pipeline.
+# EDGE CASE: Duplicate keys in a batch are computed once.
+def test_get_or_compute_many(connected_cache, mock_redis):
+    mock_redis.mget.return_value = [connected_cache.codec.encode(["hit"]), None]
+    pipe = mock_redis.pipeline.return_value
+    compute_miss = MagicMock(return_value=["computed"])
+
+    results = connected_cache.get_or_compute_many([
+        ("k1", MagicMock(), 60, None),
+        ("k2", compute_miss, 60, ["user:1"]),
+        ("k2", compute_miss, 60, ["user:1"]),
+    ])
+
+    assert results == [(["hit"], True), (["computed"], False), (["computed"], False)]
+    compute_miss.assert_called_once()
+    mock_redis.mget.assert_called_once_with(["k1", "k2"])
+    pipe.execute.assert_called_once()
+    assert connected_cache.codec.decode(pipe.setex.call_args.args[2])["value"] == ["computed"]
+
+
+# SUMMARY: Ensures the breaker opens after consecutive failures and fails fast.
+# EDGE CASE: Once open, Redis is not called at all until the reset timeout.
+def test_circuit_opens_after_consecutive_failures(connected_cache, mock_redis):
+    import redis as redis_lib
+    mock_redis.get.side_effect = redis_lib.exceptions.TimeoutError("slow")
+    connected_cache.breaker.failure_threshold = 3
+
+    for _ in range(3):
+        assert connected_cache.get("k") is None
+    assert connected_cache.breaker.state == "open"
+
+    mock_redis.get.reset_mock()
+    assert connected_cache.get("k") is None
+    assert connected_cache.set("k", 1, 60) is False
+    mock_redis.get.assert_not_called()
+    mock_redis.setex.assert_not_called()
+
+
+# SUMMARY: Ensures a half-open probe closes the circuit when Redis recovers.
+# EDGE CASE: Only one probe is let through while half-open.
+def test_circuit_half_open_probe_recovers(monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+    from backend.Ml_model.cache_manager import CircuitBreaker
+
+    now = {"t": 100.0}
+    monkeypatch.setattr(cm_module.time, "monotonic", lambda: now["t"])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+    now["t"] += 10
+    assert breaker.allow() is True      # the probe
+    assert breaker.state == "half_open"
+    assert breaker.allow() is False     # everyone else still fails fast
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() is True
+
+
+# SUMMARY: Ensures a failed half-open probe re-opens the circuit immediately.
+# EDGE CASE: One failure in half-open is enough, regardless of the threshold.
+def test_circuit_failed_probe_reopens(monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+    from backend.Ml_model.cache_manager import CircuitBreaker
+
+    now = {"t": 100.0}
+    monkeypatch.setattr(cm_module.time, "monotonic", lambda: now["t"])
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+    now["t"] += 10
+    assert breaker.allow() is True
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+
+# SUMMARY: Ensures L1 hits are still served while the circuit is open.
+# EDGE CASE: Redis outage must not disable the in-process tier.
+def test_l1_served_while_circuit_open(connected_cache, mock_redis):
+    connected_cache.local_cache.set("k", [1])
+    connected_cache.breaker.state = "open"
+    connected_cache.breaker._opened_at = float("inf")
+
+    assert connected_cache.get("k") == [1]
+    mock_redis.get.assert_not_called()
+
+
+# SUMMARY: Ensures get_or_compute degrades to uncached computation when open.
+# EDGE CASE: No lock, no write, result still returned.
+def test_get_or_compute_bypasses_open_circuit(connected_cache, mock_redis):
+    connected_cache.breaker.state = "open"
+    connected_cache.breaker._opened_at = float("inf")
+
+    assert connected_cache.get_or_compute("k", lambda: ["fresh"], 60) == (["fresh"], False)
+    mock_redis.set.assert_not_called()
+    mock_redis.setex.assert_not_called()
+
+
+# SUMMARY: Ensures a manager that started without Redis reconnects in the background.
+# EDGE CASE: Caching turns itself back on once Redis answers.
+def test_background_reconnect(mock_redis, monkeypatch):
+    from backend.Ml_model import cache_manager as cm_module
+    monkeypatch.setattr(cm_module, "CACHE_RECONNECT_SECONDS", 0.01)
+    attempts = {"n": 0}
+
+    def fake_redis(**kwargs):
+        attempts["n"] += 1
+        if attempts["n"] < 3:
+            raise ConnectionError("down")
+        return mock_redis
+
+    with patch("redis.Redis", side_effect=fake_redis), \
+            patch.object(CacheManager, "start_invalidation_listener"):
+        cm = CacheManager()
+        assert cm.enabled is False
+        cm._reconnector.join(5)
+
+    assert cm.enabled is True
+    assert cm.redis_client is mock_redis
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import subprocess
+import threading
+import time
+import pytest
+
+from backend.Ml_model.cache_metrics import CacheMetrics, key_prefix, merge_snapshots, summarize
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    return CacheMetrics(directory=tmp_path, flush_seconds=3600)
+
+
+# SUMMARY: Ensures keys are grouped by recommendation method or first segment.
+# EDGE CASE: The model version segment is skipped so prefixes survive retrains.
+def test_key_prefix():
+    assert key_prefix("rec:v=20260101T000000:hybrid:u=u1:a=None:d=100") == "rec:hybrid"
+    assert key_prefix("rec:v=unversioned:trending:days=7:d=100") == "rec:trending"
+    assert key_prefix("similar:v=v1:get_similar:a1") == "similar:get_similar"
+    assert key_prefix("plainkey") == "plainkey"
+
+
+# SUMMARY: Ensures counters and latency histograms accumulate per prefix.
+# EDGE CASE: Batch latencies are observed once per prefix, not once per key.
+def test_record_and_snapshot(metrics):
+    metrics.record_get("rec:v=1:hybrid:u=u1", True, 0.0004, nbytes=10)
+    metrics.record_get("rec:v=1:hybrid:u=u2", False, 0.003)
+    metrics.record_set("rec:v=1:hybrid:u=u2", 0.002, nbytes=25)
+    metrics.record_latency(["rec:v=1:content:a=1", "rec:v=1:content:a=2"], "get_latency_ms", 0.02)
+    metrics.record_error("rec:v=1:content:a=1")
+
+    snapshot = metrics.snapshot()
+    hybrid, content = snapshot["rec:hybrid"], snapshot["rec:content"]
+    assert (hybrid["hits"], hybrid["misses"], hybrid["sets"]) == (1, 1, 1)
+    assert (hybrid["bytes_read"], hybrid["bytes_written"]) == (10, 25)
+    assert hybrid["get_latency_ms"]["counts"][0] == 1  # <= 0.5ms bucket
+    assert sum(hybrid["get_latency_ms"]["counts"]) == 2
+    assert sum(content["get_latency_ms"]["counts"]) == 1
+    assert content["errors"] == 1
+
+
+# SUMMARY: Ensures each thread's shard is included in the snapshot.
+# EDGE CASE: Concurrent recorders never lose counts (no shared counters).
+def test_thread_shards_are_summed(metrics):
+    def worker():
+        for _ in range(1000):
+            metrics.record_get("rec:v=1:trending", True)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert metrics.snapshot()["rec:trending"]["hits"] == 4000
+
+
+def dead_pid():
+    """Pid of a process that has already exited"""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+# SUMMARY: Ensures aggregate() merges snapshots published by other workers.
+# EDGE CASE: Exited workers' counts are folded into retained totals, once, not dropped.
+def test_aggregate_across_workers(metrics, tmp_path):
+    metrics.record_get("rec:v=1:hybrid", True)
+    other = {"rec:hybrid": {"hits": 2, "misses": 3}}
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(other))
+    exited = tmp_path / f"{dead_pid()}.json"
+    exited.write_text(json.dumps({"rec:hybrid": {"hits": 100}}))
+
+    merged, workers = metrics.aggregate()
+
+    assert workers == 2
+    assert (merged["rec:hybrid"]["hits"], merged["rec:hybrid"]["misses"]) == (103, 3)
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+    assert not exited.exists()
+    assert json.loads((tmp_path / "retained.json").read_text())["rec:hybrid"]["hits"] == 100
+
+    merged, workers = metrics.aggregate()
+    assert merged["rec:hybrid"]["hits"] == 103
+
+
+# SUMMARY: Ensures snapshots are published on a timer once something was recorded.
+# EDGE CASE: An idle worker keeps refreshing its snapshot without new records.
+def test_flusher_publishes_idle_worker(tmp_path):
+    metrics = CacheMetrics(directory=tmp_path, flush_seconds=0.02)
+    assert not list(tmp_path.glob("*.json"))
+
+    metrics.record_set("rec:v=1:hybrid", 0.001)
+    path = tmp_path / f"{os.getpid()}.json"
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert json.loads(path.read_text())["rec:hybrid"]["sets"] == 1
+
+    os.utime(path, (0, 0))
+    deadline = time.monotonic() + 5
+    while path.stat().st_mtime == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert path.stat().st_mtime > 0
+    metrics.reset()
+
+
+# SUMMARY: Ensures values dropped by reset (or left by an earlier process with
+# the same pid) are retained instead of overwritten.
+# EDGE CASE: The first flush after reset folds the old snapshot into retained totals.
+def test_reset_retains_published_values(metrics, tmp_path):
+    metrics.record_get("rec:v=1:hybrid", True)
+    metrics.flush()
+    metrics.reset()
+    metrics.record_get("rec:v=1:hybrid", False)
+
+    merged, workers = metrics.aggregate()
+
+    assert workers == 1
+    assert (merged["rec:hybrid"]["hits"], merged["rec:hybrid"]["misses"]) == (1, 1)
+
+
+# SUMMARY: Ensures the report adds hit rates and latency averages.
+# EDGE CASE: Prefixes with no lookups report a 0% hit rate instead of dividing by zero.
+def test_summarize():
+    snapshot = merge_snapshots([{"rec:hybrid": {"hits": 3, "misses": 1}}, {"rec:content": {"sets": 1}}])
+
+    report = summarize(snapshot)
+
+    assert report["rec:hybrid"]["hit_rate"] == pytest.approx(75.0)
+    assert report["rec:content"]["hit_rate"] == 0.0
+    assert report["rec:hybrid"]["get_latency_ms"]["buckets"][-1] == "+Inf"
@@ -0,0 +1,96 @@
+import os
+import threading
+import pytest
+
+from backend.Ml_model.metrics import MetricsRegistry, LATENCY_BUCKETS
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return MetricsRegistry(directory=tmp_path, flush_seconds=3600)
+
+
+# SUMMARY: Ensures counters and histograms are keyed by name and labels.
+# EDGE CASE: Label order does not create a second series.
+def test_counters_and_histograms(registry):
+    registry.inc("requests_total", {"route": "/a", "status": 200})
+    registry.inc("requests_total", {"status": 200, "route": "/a"}, value=2)
+    registry.observe("latency_seconds", 0.0005, {"route": "/a"})
+    registry.observe("latency_seconds", 30, {"route": "/a"})
+
+    snapshot = registry.snapshot()
+    assert snapshot["counters"] == [["requests_total", {"route": "/a", "status": 200}, 3]]
+    [[name, labels, values]] = snapshot["histograms"]
+    assert values[0] == 1  # <= 1ms bucket
+    assert values[len(LATENCY_BUCKETS)] == 1  # +Inf bucket
+    assert values[-1] == pytest.approx(30.0005)
+
+
+# SUMMARY: Ensures values recorded from many threads are all counted.
+# EDGE CASE: Every thread records into its own shard without locking.
+def test_thread_shards_are_merged(registry):
+    def work():
+        for _ in range(500):
+            registry.inc("hits_total")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.snapshot()["counters"] == [["hits_total", {}, 2000]]
+
+
+# SUMMARY: Ensures the exposition merges snapshots published by other workers.
+# EDGE CASE: Histogram buckets are rendered cumulatively with a +Inf bucket.
+def test_render_merges_workers(registry, tmp_path):
+    (tmp_path / "999999.json").write_text(
+        '{"counters": [["newsxpress_http_requests_total", {"route": "/health"}, 5]], "histograms": []}'
+    )
+    registry.inc("newsxpress_http_requests_total", {"route": "/health"})
+    with registry.time("newsxpress_stage_duration_seconds", {"stage": "scoring"}):
+        pass
+
+    text = registry.render()
+
+    assert "# TYPE newsxpress_http_requests_total counter" in text
+    assert 'newsxpress_http_requests_total{route="/health"} 6' in text
+    assert "# TYPE newsxpress_stage_duration_seconds histogram" in text
+    assert 'newsxpress_stage_duration_seconds_bucket{stage="scoring",le="+Inf"} 1' in text
+    assert 'newsxpress_stage_duration_seconds_count{stage="scoring"} 1' in text
+
+
+# SUMMARY: Ensures counts of exited workers are still reported, so counters never go down.
+# EDGE CASE: Label values with quotes are escaped in the exposition.
+def test_exited_workers_and_label_escaping(registry, tmp_path):
+    exited = tmp_path / "999999.json"
+    exited.write_text('{"counters": [["old_total", {}, 7]], "histograms": []}')
+    os.utime(exited, (0, 0))
+    registry.inc("odd_total", {"route": 'say "hi"'})
+
+    text = registry.render()
+
+    assert "old_total 7" in text
+    assert not exited.exists() and (tmp_path / "retained.json").exists()
+    assert "old_total 7" in registry.render()
+    assert 'odd_total{route="say \\"hi\\""} 1' in text
+
+
+# SUMMARY: Ensures stage timings are also collected for the current request.
+# EDGE CASE: Repeated stages add up and nothing is collected outside the block.
+def test_collect_stages(registry, monkeypatch):
+    from backend.Ml_model import metrics as metrics_module
+    monkeypatch.setattr(metrics_module, "_metrics", registry)
+
+    with metrics_module.collect_stages() as stages:
+        with metrics_module.stage_timer("top_k"):
+            pass
+        with metrics_module.stage_timer("top_k"):
+            pass
+    with metrics_module.stage_timer("hydration"):
+        pass
+
+    assert set(stages) == {"top_k"}
+    [[_, _, values]] = [h for h in registry.snapshot()["histograms"] if h[1] == {"stage": "top_k"}]
+    assert sum(values[:-1]) == 2
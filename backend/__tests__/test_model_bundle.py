@@ -0,0 +1,91 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from backend.Ml_model.model_bundle import (
+    BundleValidationError,
+    ModelBundle,
+    describe_artifact,
+)
+
+
+def publish_version(bundle, value):
+    """Write a one-artifact version and publish it."""
+    version_dir = bundle.create_version()
+    matrix = np.full((2, 2), value)
+    with open(version_dir / "sigmoid_matrix.pkl", "wb") as f:
+        pickle.dump(matrix, f)
+    bundle.publish(version_dir, {"sigmoid_matrix.pkl": describe_artifact(matrix)}, stats={"value": value})
+    return version_dir.name
+
+
+# SUMMARY: Publishing writes a manifest and atomically points current at the version.
+# EDGE CASE: Manifest records shape, dtype, byte size and checksum.
+def test_publish_writes_manifest_and_switches_current(tmp_path):
+    bundle = ModelBundle(tmp_path)
+    version = publish_version(bundle, 1.0)
+
+    assert bundle.current_version() == version
+    manifest = json.loads((tmp_path / "current" / "manifest.json").read_text())
+    info = manifest["files"]["sigmoid_matrix.pkl"]
+    assert info["shape"] == [2, 2]
+    assert info["dtype"] == "float64"
+    assert info["bytes"] == (tmp_path / "current" / "sigmoid_matrix.pkl").stat().st_size
+    assert len(info["sha256"]) == 64
+    assert manifest["stats"] == {"value": 1.0}
+
+
+# SUMMARY: Unpublished versions are invisible to resolve().
+# EDGE CASE: A version directory being written has no manifest yet.
+def test_resolve_ignores_unpublished_versions(tmp_path):
+    bundle = ModelBundle(tmp_path)
+    version = publish_version(bundle, 1.0)
+    bundle.create_version()
+
+    version_dir, manifest = bundle.resolve()
+    assert version_dir.name == version
+    assert manifest["version"] == version
+
+
+# SUMMARY: A corrupted current version falls back to the newest valid older one.
+# EDGE CASE: File truncated after publish → size check fails.
+def test_resolve_falls_back_on_corruption(tmp_path):
+    bundle = ModelBundle(tmp_path)
+    old = publish_version(bundle, 1.0)
+    new = publish_version(bundle, 2.0)
+    (tmp_path / "versions" / new / "sigmoid_matrix.pkl").write_bytes(b"x")
+
+    with pytest.raises(BundleValidationError):
+        bundle.validate(new)
+    version_dir, _ = bundle.resolve()
+    assert version_dir.name == old
+
+
+# SUMMARY: rollback() repoints current at the previous version without retraining.
+# EDGE CASE: Rolling back with no older version raises.
+def test_rollback(tmp_path):
+    bundle = ModelBundle(tmp_path)
+    old = publish_version(bundle, 1.0)
+    with pytest.raises(ValueError):
+        bundle.rollback()
+
+    publish_version(bundle, 2.0)
+    assert bundle.rollback() == old
+    assert bundle.current_version() == old
+
+
+# SUMMARY: Only current plus `keep` previous versions survive pruning.
+# EDGE CASE: keep=1 with four publishes leaves two versions.
+def test_prune_keeps_n_previous(tmp_path):
+    bundle = ModelBundle(tmp_path, keep=1)
+    versions = [publish_version(bundle, float(i)) for i in range(4)]
+
+    assert bundle.published_versions() == [versions[3], versions[2]]
+
+
+# SUMMARY: No bundle at all resolves to (None, None) so the loader uses the legacy layout.
+# EDGE CASE: Fresh models directory.
+def test_resolve_without_bundle(tmp_path):
+    assert ModelBundle(tmp_path).resolve() == (None, None)
@@ -0,0 +1,67 @@
+import threading
+import pytest
+
+from backend.Ml_model import profiler
+from backend.Ml_model.profiler import RequestProfile, ProfilerBusy, authorized, sample_stacks
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILER_ADMIN_TOKEN", "s3cret")
+    return "s3cret"
+
+
+# SUMMARY: Ensures only the configured admin token is accepted.
+# EDGE CASE: With no token configured profiling is off for everyone.
+def test_authorized(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILER_ADMIN_TOKEN", "")
+    assert authorized("") is False
+    assert authorized(None) is False
+
+    monkeypatch.setattr(profiler, "PROFILER_ADMIN_TOKEN", "s3cret")
+    assert authorized("s3cret") is True
+    assert authorized("wrong") is False
+
+
+# SUMMARY: Ensures the sampler sees what other threads are running.
+# EDGE CASE: Stacks are rooted at the thread name and aggregated by count.
+def test_sample_stacks_collapses_other_threads(admin_token):
+    stop = threading.Event()
+
+    def busy_scoring_loop():
+        while not stop.is_set():
+            stop.wait(0.001)
+
+    worker = threading.Thread(target=busy_scoring_loop, name="scoring-test")
+    worker.start()
+    try:
+        report = sample_stacks(0.05, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = [line for line in report.splitlines() if "busy_scoring_loop" in line]
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.startswith("scoring-test;")
+    assert int(count) >= 1
+
+
+# SUMMARY: Ensures a request profile produces a pstats report.
+# EDGE CASE: While it runs, other captures are refused instead of queued.
+def test_request_profile_excludes_concurrent_captures(admin_token):
+    profile = RequestProfile()
+    assert profile.start() is True
+
+    assert RequestProfile().start() is False
+    with pytest.raises(ProfilerBusy):
+        sample_stacks(0.01)
+
+    sum(i * i for i in range(1000))
+    report = profile.stop()
+    assert "function calls" in report
+
+    # The lock is released again
+    again = RequestProfile()
+    assert again.start() is True
+    again.stop()
@@ -2,7 +2,7 @@ import builtins
 import pickle
 from io import BytesIO
 from pathlib import Path
-from unittest.mock import mock_open
+from unittest.mock import MagicMock, mock_open
 
 import numpy as np
 import pandas as pd
@@ -128,6 +128,30 @@ def test_get_similar_articles_basic(simple_sig_matrix, simple_indices, simple_ar
     assert recs[0]["id"] == "b"
 
 
+# EDGE CASE: Repeated content lookups reuse the records built on first use
+def test_get_similar_articles_reuses_metadata_records(simple_sig_matrix, simple_indices, simple_article_metadata):
+    """
+    Test Case: Content-based candidates are read from per-load records.
+    Purpose: Ensures no pandas row is materialized per candidate.
+    Importance: Cold content and hybrid misses rank RANKED_LIST_DEPTH deep.
+    """
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.sig_matrix = simple_sig_matrix
+    svc.indices = simple_indices
+    svc.article_metadata = simple_article_metadata
+
+    first = svc.get_similar_articles("a", top_n=2)
+    records = svc._metadata_records
+    svc.article_metadata = MagicMock(wraps=simple_article_metadata)
+    second = svc.get_similar_articles("a", top_n=2)
+
+    assert first == second
+    assert svc._metadata_records is records
+    assert "similarity_score" not in records[1]
+    assert not svc.article_metadata.mock_calls
+
+
 # EDGE CASE: Missing article ID → should return empty list
 def test_get_similar_articles_article_not_found(simple_sig_matrix):
     """
@@ -679,3 +703,74 @@ def test_collab_auto_load_but_models_missing(monkeypatch):
 
     result = svc.get_collaborative_recommendations("user1")
     assert result == []  # early exit branch
+
+
+# EDGE CASE: Published model bundle present → loaded from current version
+def test_load_models_from_bundle(monkeypatch, tmp_path, simple_sig_matrix, simple_indices, simple_article_metadata):
+    """
+    Test Case: load_models() reads artifacts from the current model bundle.
+    Purpose: Ensures the service picks up versioned, validated bundles.
+    Importance: Training publishes bundles instead of flat files.
+    """
+    import backend.Ml_model.Recommender_Models as rm
+    from backend.Ml_model.model_bundle import ModelBundle, describe_artifact
+
+    bundle = ModelBundle(tmp_path)
+    version_dir = bundle.create_version()
+    artifacts = {}
+    for name, obj in [("tfidf_vectorizer.pkl", {"fake": "tfv"}),
+                      ("sigmoid_matrix.pkl", simple_sig_matrix),
+                      ("article_indices.pkl", simple_indices)]:
+        with open(version_dir / name, "wb") as f:
+            pickle.dump(obj, f)
+        artifacts[name] = describe_artifact(obj)
+    simple_article_metadata.to_csv(version_dir / "article_metadata.csv", index=False)
+    artifacts["article_metadata.csv"] = describe_artifact(simple_article_metadata)
+    bundle.publish(version_dir, artifacts)
+
+    monkeypatch.setattr(rm, "MODELS_DIR", tmp_path)
+    svc = RecommendationService()
+
+    assert svc.load_models() is True
+    assert svc.model_version == version_dir.name
+    np.testing.assert_array_equal(svc.sig_matrix, simple_sig_matrix)
+    assert svc.user_sim_matrix is None
+
+
+# EDGE CASE: Compacted results rebuild identical dicts from metadata
+def test_compact_and_hydrate_roundtrip(simple_sig_matrix, simple_indices, simple_article_metadata):
+    """
+    Test Case: compact_recommendations → hydrate_recommendations.
+    Why: Caches store only id+score lists; hydration must restore what the
+    recommender originally returned, and keep unknown ids as-is.
+    """
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.sig_matrix = simple_sig_matrix
+    svc.indices = simple_indices
+    svc.article_metadata = simple_article_metadata
+
+    recs = svc.get_similar_articles("a", top_n=1)
+    compact = svc.compact_recommendations(recs)
+
+    assert compact == [{"id": "b", "similarity_score": pytest.approx(0.8)}]
+    assert svc.hydrate_recommendations(compact) == recs
+    assert svc.hydrate_recommendations([{"id": "gone", "score": 1.0}]) == [{"id": "gone", "score": 1.0}]
+
+
+# EDGE CASE: Metadata read back from CSV holds dates as strings
+def test_hydrate_parses_trending_dates(simple_article_metadata):
+    """
+    Test Case: hydrate_recommendations(parse_dates=True).
+    Why: Uncached trending results carry published_at as a Timestamp; cached
+    (compact) ones must hydrate to the same type, not the raw CSV string.
+    """
+    svc = RecommendationService()
+    svc.article_metadata = simple_article_metadata.assign(published_at="2026-01-02 03:04:05")
+
+    [plain] = svc.hydrate_recommendations([{"id": "a"}])
+    [parsed] = svc.hydrate_recommendations([{"id": "a"}], parse_dates=True)
+
+    assert plain["published_at"] == "2026-01-02 03:04:05"
+    assert parsed["published_at"] == pd.Timestamp("2026-01-02 03:04:05")
+    assert svc.article_metadata.loc[0, "published_at"] == "2026-01-02 03:04:05"
@@ -0,0 +1,102 @@
+import gzip
+
+from backend.Ml_model import response_encoding
+from backend.Ml_model.response_encoding import (
+    encode_response, etag_content, etag_matches, negotiate_encoding, strong_etag
+)
+
+BIG_BODY = b'{"recommendations": [' + b'{"id": "a"},' * 200 + b'{}]}'
+
+
+# SUMMARY: Ensures ETags change with the body, model version and cache key.
+# EDGE CASE: The same body under another model version gets a new ETag.
+def test_strong_etag():
+    etag = strong_etag("v1", "rec:k", b"body")
+    assert etag == strong_etag("v1", "rec:k", b"body")
+    assert etag != strong_etag("v1", "rec:k", b"body2")
+    assert etag != strong_etag("v2", "rec:k", b"body")
+    assert etag != strong_etag("v1", "rec:other", b"body")
+
+
+# SUMMARY: Ensures If-None-Match lists, wildcards and weak tags are understood.
+# EDGE CASE: A missing header never matches.
+def test_etag_matches():
+    assert etag_matches('"abc"', "abc")
+    assert etag_matches('"x", W/"abc"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches('"abcd"', "abc")
+    assert not etag_matches(None, "abc")
+
+
+# SUMMARY: Ensures the best supported coding is picked from Accept-Encoding.
+# EDGE CASE: q=0 refuses a coding; brotli is only offered when installed.
+def test_negotiate_encoding(monkeypatch):
+    monkeypatch.setattr(response_encoding, "brotli", None)
+    assert negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert negotiate_encoding("gzip;q=0, br") is None
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("") is None
+
+    monkeypatch.setattr(response_encoding, "brotli", object())
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+
+
+# SUMMARY: Ensures large bodies are compressed and small ones are not.
+# EDGE CASE: Compressed and identity representations carry different ETags.
+def test_encode_response_compression(monkeypatch):
+    monkeypatch.setattr(response_encoding, "brotli", None)
+
+    status, body, headers = encode_response(BIG_BODY, ("v1", "k"), None, "gzip")
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == BIG_BODY
+
+    status, body, plain_headers = encode_response(BIG_BODY, ("v1", "k"), None, None)
+    assert body == BIG_BODY
+    assert "Content-Encoding" not in plain_headers
+    assert plain_headers["ETag"] != headers["ETag"]
+
+    _, small, small_headers = encode_response(b"{}", ("v1", "k"), None, "gzip")
+    assert small == b"{}"
+    assert "Content-Encoding" not in small_headers
+
+
+# SUMMARY: Ensures a current client copy is answered with an empty 304.
+# EDGE CASE: The 304 still carries the ETag so the client keeps revalidating.
+def test_encode_response_not_modified():
+    _, _, headers = encode_response(b"{}", ("v1", "k"), None, None)
+
+    status, body, not_modified = encode_response(b"{}", ("v1", "k"), headers["ETag"], None)
+
+    assert (status, body) == (304, b"")
+    assert not_modified["ETag"] == headers["ETag"]
+
+
+# SUMMARY: Ensures MessagePack is chosen only when asked for and available.
+# EDGE CASE: Without msgpack installed every client gets JSON.
+def test_negotiate_format(monkeypatch):
+    monkeypatch.setattr(response_encoding, "msgpack", None)
+    assert response_encoding.negotiate_format("application/msgpack") == "json"
+
+    monkeypatch.setattr(response_encoding, "msgpack", object())
+    assert response_encoding.negotiate_format("application/msgpack") == "msgpack"
+    assert response_encoding.negotiate_format("application/x-msgpack, application/json") == "msgpack"
+    assert response_encoding.negotiate_format("application/json, application/msgpack;q=0.5") == "json"
+    assert response_encoding.negotiate_format("*/*") == "json"
+    assert response_encoding.negotiate_format(None) == "json"
+
+
+# SUMMARY: Ensures ETags hash the content, not per-request fields like from_cache.
+# EDGE CASE: The same content as JSON and as MessagePack still gets different ETags.
+def test_etag_content_ignores_from_cache():
+    miss = etag_content({"recommendations": [{"id": "a"}], "from_cache": False}, "application/json")
+    hit = etag_content({"recommendations": [{"id": "a"}], "from_cache": True}, "application/json")
+    packed = etag_content({"recommendations": [{"id": "a"}], "from_cache": True}, "application/msgpack")
+
+    _, _, miss_headers = encode_response(b'{"from_cache":false}', ("v1", "k", miss), None, None)
+    status, _, _ = encode_response(b'{"from_cache":true}', ("v1", "k", hit), miss_headers["ETag"], None)
+
+    assert miss == hit
+    assert packed != hit
+    assert status == 304
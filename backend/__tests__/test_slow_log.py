@@ -0,0 +1,50 @@
+import json
+import pytest
+
+from backend.Ml_model.slow_log import SlowRequestLog, read_entries
+
+
+@pytest.fixture
+def slow_log(tmp_path):
+    return SlowRequestLog(directory=tmp_path, threshold_ms=100)
+
+
+# SUMMARY: Ensures only requests over the threshold are captured.
+# EDGE CASE: A zero threshold disables the log entirely.
+def test_threshold(tmp_path, slow_log):
+    assert slow_log.record(99.9, {"method": "hybrid"}) is False
+    assert slow_log.record(100, {"method": "hybrid"}) is True
+    assert SlowRequestLog(directory=tmp_path, threshold_ms=0).record(10_000, {}) is False
+    assert slow_log.captured == 1
+
+
+# SUMMARY: Ensures entries keep replayable params, stage timings and details.
+# EDGE CASE: Unknown or empty params are dropped; the exclude size is kept.
+def test_entry_contents(tmp_path, slow_log):
+    slow_log.record(
+        250.123456,
+        {"method": "hybrid", "user_id": "u1", "exclude": ["a", "b"], "recent_articles": [], "token": "x"},
+        {"scoring": 0.2, "serialization": 0.0015},
+        route="/api/recommendations", status=200, model_version="v1", cache="miss"
+    )
+
+    [entry] = read_entries(list(tmp_path.glob("slow-*.jsonl")))
+    assert entry["params"] == {"method": "hybrid", "user_id": "u1", "exclude": ["a", "b"]}
+    assert entry["exclude_size"] == 2
+    assert entry["duration_ms"] == 250.12
+    assert entry["stages_ms"] == {"scoring": 200.0, "serialization": 1.5}
+    assert (entry["model_version"], entry["cache"], entry["status"]) == ("v1", "miss", 200)
+
+
+# SUMMARY: Ensures the log rotates by size and keeps a bounded number of files.
+# EDGE CASE: Rotated files are still readable for replay.
+def test_rotation(tmp_path):
+    slow_log = SlowRequestLog(directory=tmp_path, threshold_ms=1, max_bytes=300, backups=2)
+    for i in range(10):
+        slow_log.record(5, {"method": "content", "article_id": f"a{i}"})
+
+    files = list(tmp_path.glob("slow-*.jsonl*"))
+    assert len(files) == 3
+    entries = read_entries(files)
+    assert 0 < len(entries) < 10
+    assert all(json.dumps(e) for e in entries)
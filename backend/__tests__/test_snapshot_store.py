@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.Ml_model.snapshot_store import SnapshotStore, read_frame, write_frame
+
+
+@pytest.fixture
+def articles():
+    """Articles as returned by psycopg2: list-valued actors, tz-aware timestamps."""
+    return pd.DataFrame(
+        {
+            "id": ["a1", "a2", "a3"],
+            "summary": ["first — ünïcode", None, ""],
+            "actors": [["modi", "gandhi"], None, []],
+            "views": [1, 2, 3],
+            "published_at": pd.to_datetime(
+                ["2025-01-01 10:00", "2025-01-01 23:00", "2025-01-02 08:00"]
+            ).tz_localize("UTC"),
+        }
+    )
+
+
+# SUMMARY: write_frame/read_frame round-trip every supported column type.
+# EDGE CASE: Null strings, empty strings, null lists, empty lists and non-ASCII text.
+def test_frame_round_trip(tmp_path, articles):
+    path = tmp_path / "part.npz"
+    write_frame(path, articles)
+
+    loaded = read_frame(path)
+
+    assert list(loaded["id"]) == ["a1", "a2", "a3"]
+    assert list(loaded["summary"]) == ["first — ünïcode", None, ""]
+    assert list(loaded["actors"]) == [["modi", "gandhi"], None, []]
+    assert loaded["views"].dtype == np.int64
+    pd.testing.assert_series_equal(loaded["published_at"], articles["published_at"], check_dtype=False)
+
+
+# SUMMARY: read_frame can decode a subset of columns.
+# EDGE CASE: Used to read just the key column when deduplicating appends.
+def test_read_frame_column_subset(tmp_path, articles):
+    path = tmp_path / "part.npz"
+    write_frame(path, articles)
+
+    assert list(read_frame(path, columns=["id"]).columns) == ["id"]
+
+
+# SUMMARY: append_new partitions by date and only writes unseen keys.
+# EDGE CASE: Second append overlaps the first; date range read filters partitions.
+def test_append_new_is_incremental(tmp_path, articles):
+    store = SnapshotStore(tmp_path)
+
+    assert store.append_new("articles", articles.iloc[:2], key="id", partition_column="published_at") == 2
+    assert store.append_new("articles", articles, key="id", partition_column="published_at") == 1
+
+    assert store.partitions("articles") == ["2025-01-01", "2025-01-02"]
+    assert sorted(store.read("articles")["id"]) == ["a1", "a2", "a3"]
+    assert list(store.read("articles", start="2025-01-02")["id"]) == ["a3"]
+
+
+# SUMMARY: write_partition replaces a partition and latest_partition reads only the newest.
+# EDGE CASE: Rewriting the same day leaves exactly one part file.
+def test_write_partition_replaces_and_reads_latest(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.write_partition("users", pd.DataFrame({"user_id": ["u1"]}), partition="2025-01-01")
+    store.write_partition("users", pd.DataFrame({"user_id": ["u1", "u2"]}), partition="2025-01-02")
+    store.write_partition("users", pd.DataFrame({"user_id": ["u3"]}), partition="2025-01-02")
+
+    assert len(list((tmp_path / "users" / "date=2025-01-02").glob("part-*.npz"))) == 1
+    assert list(store.read("users", latest_partition=True)["user_id"]) == ["u3"]
+
+
+# SUMMARY: Reading a table without a snapshot returns None.
+# EDGE CASE: Fresh deployment with no data directory yet.
+def test_read_missing_table(tmp_path):
+    assert SnapshotStore(tmp_path / "missing").read("articles") is None
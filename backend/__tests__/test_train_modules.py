@@ -0,0 +1,375 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse import random as sparse_random
+from sklearn.metrics.pairwise import sigmoid_kernel
+
+import backend.Ml_model.Train_modules as train_modules
+from backend.Ml_model.Train_modules import ModelTrainer, parallel_sigmoid_kernel
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    """Redirect model artifacts into a temporary directory."""
+    monkeypatch.setattr(train_modules, "MODELS_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def sample_articles():
+    """Small article table with the columns produced by load_data_from_db()."""
+    return pd.DataFrame(
+        [
+            {"id": "a1", "title": "Election results", "summary": "vote count in delhi election",
+             "actors": "{modi,gandhi}", "place": "Delhi", "topic": "politics",
+             "published_at": "2025-01-01", "source_id": "s1"},
+            {"id": "a2", "title": "Election rally", "summary": "rally before delhi election vote",
+             "actors": "{modi}", "place": "Delhi", "topic": "politics",
+             "published_at": "2025-01-02", "source_id": "s1"},
+            {"id": "a3", "title": "Cricket final", "summary": "india wins cricket final match",
+             "actors": "{kohli}", "place": "Mumbai", "topic": "sports",
+             "published_at": "2025-01-03", "source_id": "s2"},
+            {"id": "a4", "title": "Cricket series", "summary": "india cricket series match",
+             "actors": None, "place": "Mumbai", "topic": "sports",
+             "published_at": "2025-01-04", "source_id": "s2"},
+        ]
+    )
+
+
+@pytest.fixture
+def sample_users():
+    """Small user profile table with array-valued actor preferences."""
+    return pd.DataFrame(
+        [
+            {"user_id": "u1", "auth_id": "x1", "actor": "{modi}", "place": "Delhi", "topic": "politics"},
+            {"user_id": "u2", "auth_id": "x2", "actor": ["Kohli"], "place": "Mumbai", "topic": "sports"},
+        ]
+    )
+
+
+# SUMMARY: Blockwise parallel kernel must match sklearn's sigmoid_kernel exactly.
+# EDGE CASE: Block size smaller than row count → several shared-memory blocks.
+def test_parallel_sigmoid_kernel_matches_sklearn():
+    X = sparse_random(37, 20, density=0.3, format="csr", random_state=0)
+
+    result = parallel_sigmoid_kernel(X, workers=2, block_size=8)
+
+    np.testing.assert_array_equal(result, sigmoid_kernel(X, X))
+
+
+# SUMMARY: Single worker falls back to the in-process sklearn computation.
+# EDGE CASE: workers=1 must not spin up a process pool.
+def test_parallel_sigmoid_kernel_single_worker(monkeypatch):
+    X = sparse_random(5, 4, density=0.5, format="csr", random_state=1)
+    monkeypatch.setattr(
+        train_modules, "ProcessPoolExecutor",
+        lambda *a, **k: (_ for _ in ()).throw(AssertionError("pool used")),
+    )
+
+    result = parallel_sigmoid_kernel(X, workers=1, block_size=2)
+
+    np.testing.assert_array_equal(result, sigmoid_kernel(X, X))
+
+
+# SUMMARY: Sequential stage run records success and wall time for every stage.
+# EDGE CASE: Collaborative stage fails while the others succeed.
+def test_run_stages_sequential_records_timings(monkeypatch):
+    trainer = ModelTrainer(workers=1)
+    monkeypatch.setattr(trainer, "train_content_based_model", lambda: True)
+    monkeypatch.setattr(trainer, "train_collaborative_model", lambda: False)
+    monkeypatch.setattr(trainer, "export_article_metadata", lambda: True)
+
+    results = trainer.run_stages()
+
+    assert results == {"content": True, "collaborative": False, "metadata_export": True}
+    assert set(trainer.stage_timings) == set(ModelTrainer.STAGES)
+    assert all(t >= 0 for t in trainer.stage_timings.values())
+
+
+# SUMMARY: Parallel stage run trains every model and writes all artifacts.
+# EDGE CASE: Stages execute in child processes, so results come from disk.
+def test_train_all_parallel_writes_artifacts(models_dir, sample_articles, sample_users, monkeypatch):
+    trainer = ModelTrainer(workers=3)
+    trainer.articles = sample_articles
+    trainer.users = sample_users
+    monkeypatch.setattr(ModelTrainer, "load_data_from_db", lambda self: True)
+
+    assert trainer.train_all() is True
+
+    current = models_dir / "current"
+    for name in ("tfidf_vectorizer.pkl", "sigmoid_matrix.pkl", "article_indices.pkl",
+                 "article_metadata.csv", "user_similarity_matrix.pkl", "mlb_encoder.pkl"):
+        assert (current / name).exists()
+
+    manifest = json.loads((current / "manifest.json").read_text())
+    assert manifest["files"]["sigmoid_matrix.pkl"]["shape"] == [4, 4]
+    assert manifest["stats"]["num_articles"] == 4
+
+    metadata = pd.read_csv(current / "training_metadata.csv").iloc[0]
+    assert metadata["train_workers"] == 3
+    assert "content_seconds" in metadata
+    assert "collaborative_seconds" in metadata
+
+
+class FakeNamedCursor:
+    """Mimics a psycopg2 named cursor: rows are handed out via fetchmany()."""
+
+    def __init__(self, rows, fetch_log):
+        self.rows = list(rows)
+        self.fetch_log = fetch_log
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.query = query
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.fetch_log.append(len(batch))
+        return batch
+
+
+class FakeConnection:
+    """Returns article or profile rows depending on the cursor name."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.cursor_names = []
+        self.fetch_log = []
+        self.closed = False
+
+    def cursor(self, name=None, cursor_factory=None):
+        self.cursor_names.append(name)
+        return FakeNamedCursor(self.tables[name], self.fetch_log)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def db_python(monkeypatch):
+    """Import config.db_python the way Train_modules does (backend/ on sys.path)."""
+    monkeypatch.syspath_prepend(str(train_modules.BASE_DIR))
+    import config.db_python as module
+    return module
+
+
+# SUMMARY: stream_query yields fetch_size chunks from a named server-side cursor.
+# EDGE CASE: Last chunk is partial; the connection it opened must be closed.
+def test_stream_query_yields_chunks(db_python, monkeypatch):
+    conn = FakeConnection({"c": [{"n": i} for i in range(5)]})
+    monkeypatch.setattr(db_python, "get_db_connection", lambda: conn)
+
+    chunks = list(db_python.stream_query("SELECT 1", fetch_size=2, cursor_name="c"))
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert conn.cursor_names == ["c"]
+    assert conn.closed is True
+
+
+# SUMMARY: Streaming load fits TF-IDF chunk by chunk with the same result as a bulk load.
+# EDGE CASE: Summaries are dropped from the in-memory frame but kept in the snapshot.
+def test_load_data_streaming_matches_bulk_fit(db_python, monkeypatch, tmp_path, sample_articles, sample_users):
+    conn = FakeConnection({
+        "train_articles": sample_articles.to_dict("records"),
+        "train_profiles": sample_users.to_dict("records"),
+    })
+    monkeypatch.setattr(db_python, "get_db_connection", lambda: conn)
+    monkeypatch.setattr(train_modules, "DATA_DIR", tmp_path)
+
+    trainer = ModelTrainer(workers=1, fetch_size=3)
+    assert trainer.load_data_from_db() is True
+
+    assert conn.fetch_log[:3] == [3, 1, 0]
+    assert "summary" not in trainer.articles.columns
+    assert list(trainer.articles["id"]) == list(sample_articles["id"])
+    assert len(trainer.users) == 2
+    assert len(trainer.snapshots.read("articles")) == 4
+    assert len(trainer.snapshots.read("users", latest_partition=True)) == 2
+
+    bulk = train_modules.build_tfidf_vectorizer()
+    expected = bulk.fit_transform(train_modules.combined_article_text(sample_articles))
+    assert trainer.tfv.vocabulary_ == bulk.vocabulary_
+    np.testing.assert_allclose(trainer.tfv_matrix.toarray(), expected.toarray())
+
+
+# SUMMARY: A database error while streaming falls back to the columnar snapshot.
+# EDGE CASE: Snapshot rows come back newest-first, like the articles query.
+def test_load_data_streaming_falls_back_to_snapshot(db_python, monkeypatch, tmp_path, sample_articles, sample_users):
+    monkeypatch.setattr(train_modules, "DATA_DIR", tmp_path)
+    seeded = ModelTrainer(workers=1)
+    seeded.snapshots.append_new("articles", sample_articles, key="id", partition_column="published_at")
+    seeded.snapshots.write_partition("users", sample_users)
+    monkeypatch.setattr(db_python, "get_db_connection", lambda: (_ for _ in ()).throw(RuntimeError("db down")))
+
+    trainer = ModelTrainer(workers=1, fetch_size=2)
+    assert trainer.load_data_from_db() is True
+
+    assert trainer.tfv_matrix is None
+    assert "summary" in trainer.articles.columns
+    assert list(trainer.articles["id"]) == ["a4", "a3", "a2", "a1"]
+    assert list(trainer.users["user_id"]) == ["u1", "u2"]
+
+
+# SUMMARY: Without any snapshot the legacy CSV exports are still used.
+# EDGE CASE: Deployments upgraded from the CSV-export version.
+def test_load_data_from_snapshot_uses_legacy_csv(monkeypatch, tmp_path, sample_articles):
+    sample_articles.to_csv(tmp_path / "articles_export.csv", index=False)
+    monkeypatch.setattr(train_modules, "DATA_DIR", tmp_path)
+
+    trainer = ModelTrainer(workers=1)
+    assert trainer.load_data_from_snapshot() is True
+    assert len(trainer.articles) == 4
+
+
+def legacy_clean_array_column(col):
+    """Reference copy of the per-row parser that preference_label_pairs replaced."""
+    if col is None or (isinstance(col, float) and pd.isna(col)):
+        return []
+    if isinstance(col, list):
+        return [str(item).strip().lower() for item in col if str(item).strip()]
+    if hasattr(col, '__iter__') and not isinstance(col, str):
+        return [str(item).strip().lower() for item in col if str(item).strip()]
+    if isinstance(col, str):
+        col = col.strip('{}[]"')
+        if not col:
+            return []
+        return [item.strip().lower() for item in col.split(',') if item.strip()]
+    return []
+
+
+def legacy_scalar(x):
+    return [str(x).strip().lower()] if pd.notna(x) and str(x).strip() else []
+
+
+@pytest.fixture
+def messy_profiles():
+    """Every value shape the actor/place/topic columns are known to contain."""
+    return pd.DataFrame(
+        {
+            "actor": [
+                "{Modi,Gandhi}", '{"Modi"}', "{}", "", None, float("nan"),
+                ["  Kohli ", "", "Dhoni"], np.array(["A", "b "]), [], [None],
+                "[x, y ,]", "{ spaced , MIXED Case }", ("t1", "t2"),
+            ],
+            "place": ["Delhi", " ", None, "Mumbai", np.nan, "  Pune ", "X", "", "Y", "Z", None, "A", "B"],
+            "topic": ["Politics", None, "Sports", "", "Tech", None, " ", "Biz", None, "Art", "Sci", None, "C"],
+        },
+        index=list(range(100, 113)),
+    )
+
+
+# SUMMARY: Vectorized label pairs reproduce the old per-row combined preference lists.
+# EDGE CASE: Brace/bracket strings, quotes, blanks, NaN/None, ndarrays, tuples, [None].
+def test_preference_label_pairs_matches_legacy(messy_profiles):
+    pairs = train_modules.preference_label_pairs(
+        messy_profiles, array_columns=["actor"], scalar_columns=["place", "topic"]
+    )
+
+    got = [list(pairs.loc[pairs["row"] == i, "label"]) for i in range(len(messy_profiles))]
+    expected = [
+        legacy_clean_array_column(a) + legacy_scalar(p) + legacy_scalar(t)
+        for a, p, t in zip(messy_profiles["actor"], messy_profiles["place"], messy_profiles["topic"])
+    ]
+    assert got == expected
+
+
+# SUMMARY: Sparse indicator matrix equals MultiLabelBinarizer output.
+# EDGE CASE: Duplicate labels in a row and labels unknown to the encoder.
+def test_label_indicator_matrix_matches_mlb():
+    from sklearn.preprocessing import MultiLabelBinarizer
+
+    mlb = MultiLabelBinarizer().fit([["a", "b", "c"]])
+    matrix = train_modules.label_indicator_matrix(
+        [0, 0, 0, 2, 2], ["b", "b", "a", "c", "zzz"], 3, mlb.classes_
+    )
+
+    np.testing.assert_array_equal(matrix.toarray(), [[1, 1, 0], [0, 0, 0], [0, 0, 1]])
+
+
+# SUMMARY: Collaborative training produces the same feature matrices as the list-based encoder.
+# EDGE CASE: Users without any preference are dropped from the user matrix.
+def test_train_collaborative_model_matches_mlb(models_dir, sample_articles, sample_users):
+    from sklearn.preprocessing import MultiLabelBinarizer
+
+    users = pd.concat(
+        [sample_users, pd.DataFrame([{"user_id": "u3", "auth_id": "x3", "actor": "{}", "place": None, "topic": ""}])],
+        ignore_index=True,
+    )
+    trainer = ModelTrainer(workers=1)
+    trainer.articles = sample_articles.copy()
+    trainer.users = users
+
+    assert trainer.train_collaborative_model() is True
+
+    user_lists = [
+        legacy_clean_array_column(a) + legacy_scalar(p) + legacy_scalar(t)
+        for a, p, t in zip(users["actor"], users["place"], users["topic"])
+    ]
+    mlb = MultiLabelBinarizer()
+    expected_users = mlb.fit_transform([l for l in user_lists if l])
+    article_lists = [
+        legacy_clean_array_column(a) + legacy_scalar(p) + legacy_scalar(t)
+        for a, p, t in zip(sample_articles["actors"], sample_articles["place"], sample_articles["topic"])
+    ]
+
+    user_features = pd.read_pickle(models_dir / "user_features.pkl")
+    article_features = pd.read_pickle(models_dir / "article_features.pkl")
+    assert list(user_features.index) == ["u1", "u2"]
+    assert list(user_features.columns) == list(mlb.classes_)
+    np.testing.assert_array_equal(user_features.to_numpy(), expected_users)
+    np.testing.assert_array_equal(article_features.to_numpy(), mlb.transform(article_lists))
+
+
+# SUMMARY: A failed stage keeps serving the previous version's artifacts for that model.
+# EDGE CASE: Collaborative training fails on the second run → its artifacts are carried forward.
+def test_train_all_carries_forward_failed_stage(models_dir, sample_articles, sample_users, monkeypatch):
+    monkeypatch.setattr(ModelTrainer, "load_data_from_db", lambda self: True)
+    first = ModelTrainer(workers=1)
+    first.articles, first.users = sample_articles.copy(), sample_users
+    assert first.train_all() is True
+    first_version = first.output_dir.name
+
+    second = ModelTrainer(workers=1)
+    second.articles, second.users = sample_articles.copy(), None
+    assert second.train_all() is True
+
+    manifest = json.loads((models_dir / "current" / "manifest.json").read_text())
+    assert manifest["version"] != first_version
+    assert "user_similarity_matrix.pkl" in manifest["files"]
+    assert manifest["stats"]["carried_forward"] == sorted(ModelTrainer.COLLABORATIVE_ARTIFACTS)
+
+
+# SUMMARY: A run where every stage fails publishes nothing.
+# EDGE CASE: The unpublished version directory is removed.
+def test_train_all_failure_discards_version(models_dir, monkeypatch):
+    monkeypatch.setattr(ModelTrainer, "load_data_from_db", lambda self: True)
+    trainer = ModelTrainer(workers=1)
+    trainer.articles = pd.DataFrame({"id": []})
+    trainer.users = None
+
+    assert trainer.train_all() is False
+    assert not (models_dir / "current").exists()
+    assert list((models_dir / "versions").iterdir()) == []
+
+
+# SUMMARY: An array column with no values at all yields no labels instead of failing.
+# EDGE CASE: An all-NaN column (e.g. from the CSV fallback) is float dtype, not object.
+def test_preference_label_pairs_all_null_array_column(models_dir, sample_articles, sample_users):
+    frame = pd.DataFrame({"actor": [np.nan, np.nan], "place": ["Delhi", None]})
+
+    pairs = train_modules.preference_label_pairs(frame, array_columns=["actor"], scalar_columns=["place"])
+
+    assert pairs.to_dict("records") == [{"row": 0, "label": "delhi"}]
+
+    trainer = ModelTrainer(workers=1)
+    trainer.articles = sample_articles.assign(actors=np.nan)
+    trainer.users = sample_users.assign(actor=np.nan)
+    assert trainer.train_collaborative_model() is True
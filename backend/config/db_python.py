@@ -2,7 +2,10 @@
 Database connection helper for Python ML scripts
 """
 import os
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 from urllib.parse import urlparse
@@ -10,49 +13,88 @@ from urllib.parse import urlparse
 # Load environment variables
 load_dotenv()
 
-def get_db_connection():
+# Connections kept by the shared pool (see get_db_pool)
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 5))
+
+
+def get_connection_params():
     """
-    Create and return a PostgreSQL database connection
+    Connection keyword arguments for psycopg2
     Supports both DATABASE_URL and individual credentials
     Uses SSL for Supabase in production
     """
-    try:
-        # First try DATABASE_URL (Supabase/Heroku style)
-        database_url = os.getenv('DATABASE_URL')
-        
-        if database_url:
-            # Parse the DATABASE_URL
-            result = urlparse(database_url)
-            
-            # Supabase requires SSL in production
-            ssl_config = None
-            if os.getenv('NODE_ENV') == 'production':
-                ssl_config = {'sslmode': 'require'}
-            
-            connection = psycopg2.connect(
-                host=result.hostname,
-                port=result.port or 5432,
-                database=result.path[1:],  # Remove leading slash
-                user=result.username,
-                password=result.password,
-                sslmode='require' if os.getenv('NODE_ENV') == 'production' else 'prefer'
-            )
-        else:
-            # Fall back to individual environment variables
-            connection = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'localhost'),
-                port=os.getenv('DB_PORT', '5432'),
-                database=os.getenv('DB_NAME'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD'),
-                sslmode='prefer'
-            )
+    # First try DATABASE_URL (Supabase/Heroku style)
+    database_url = os.getenv('DATABASE_URL')
+    
+    if database_url:
+        # Parse the DATABASE_URL
+        result = urlparse(database_url)
         
-        return connection
+        # Supabase requires SSL in production
+        return dict(
+            host=result.hostname,
+            port=result.port or 5432,
+            database=result.path[1:],  # Remove leading slash
+            user=result.username,
+            password=result.password,
+            sslmode='require' if os.getenv('NODE_ENV') == 'production' else 'prefer'
+        )
+    
+    # Fall back to individual environment variables
+    return dict(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432'),
+        database=os.getenv('DB_NAME'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        sslmode='prefer'
+    )
+
+
+def get_db_connection():
+    """
+    Create and return a PostgreSQL database connection
+    """
+    try:
+        return psycopg2.connect(**get_connection_params())
     except Exception as e:
         print(f"Error connecting to database: {e}")
         raise
 
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_db_pool():
+    """
+    Shared thread-safe connection pool for long-running processes
+    (created on first use, DB_POOL_MIN..DB_POOL_MAX connections)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **get_connection_params())
+        return _pool
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a connection from the shared pool
+    Connections that raised are discarded instead of being returned
+    """
+    pool = get_db_pool()
+    connection = pool.getconn()
+    try:
+        yield connection
+    except Exception:
+        pool.putconn(connection, close=True)
+        raise
+    else:
+        pool.putconn(connection)
+
 def get_db_cursor(connection, dict_cursor=True):
     """
     Get a cursor from the connection
@@ -60,3 +102,30 @@ def get_db_cursor(connection, dict_cursor=True):
     if dict_cursor:
         return connection.cursor(cursor_factory=RealDictCursor)
     return connection.cursor()
+
+
+def stream_query(query, params=None, fetch_size=2000, cursor_name='stream_cursor', connection=None):
+    """
+    Stream query results in chunks using a named (server-side) cursor
+    Rows stay on the server until fetched, so client memory is bounded
+    by fetch_size instead of the result size
+
+    Yields:
+        Lists of up to fetch_size row dicts
+    """
+    owns_connection = connection is None
+    if owns_connection:
+        connection = get_db_connection()
+
+    try:
+        with connection.cursor(name=cursor_name, cursor_factory=RealDictCursor) as cursor:
+            cursor.itersize = fetch_size
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield rows
+    finally:
+        if owns_connection:
+            connection.close()